@@ -1,24 +1,36 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, g, redirect, request, jsonify, send_file
 from flask_cors import CORS
-from pinterest_dl import PinterestDL
 import os
 import json
+import hashlib
+import re
 import shutil
+import time
 from datetime import datetime
 import zipfile
 from werkzeug.utils import secure_filename
-import requests
-import yt_dlp
 
-from services.pinterest_service import download_pinterest_video
-from services.twitter_service import (
-    scrape_twitter_metadata,
-    download_twitter_video,
-)
-from services.tiktok_service import (
-    scrape_tiktok_metadata,
-    download_tiktok_video,
-)
+from services.media_downloader import extract_video_info
+from services.batch import HostRateLimiter, iter_batch, run_batch
+from services.client_pool import ClientPool
+from services.download_cache import DownloadCache
+from services.download_profiles import load_download_profiles, profile_options
+from services.ffmpeg_governor import governor as ffmpeg_governor
+from services.file_serving import FileServer
+from services.http_session import connection_stats, get_session
+from services.job_queue import JobQueue, MemoryJobStore, QueueFullError, SQLiteJobStore
+from services.media_fetch import MediaFetcher
+from services.media_proxy import PROXY_CHUNK_SIZE, iter_upstream, open_upstream, passthrough_headers
+from services.metadata_cache import build_metadata_cache
+from services.metrics import count_bytes, count_stream, metrics, span
+from services.pinterest_service import canonical_pin_url, iter_pin_entries, resolve_pin_media
+from services.profiling import ProfilingMiddleware, list_profiles, token_matches
+from services.platforms import PLATFORMS, describe_video, scrape_metadata
+from services.zip_stream import iter_file, stream_archive, write_archive
+from services.url_resolver import UrlResolver
+from services.retention import RetentionManager
+from services.storage import build_storage
+from services.ydl_pool import ydl_pool_stats
 
 app = Flask(__name__)
 # Enable CORS for all routes with explicit configuration
@@ -26,7 +38,8 @@ CORS(app, resources={
     r"/api/*": {
         "origins": ["http://localhost:3000", "http://localhost:8080", "http://192.168.1.103:3000", "https://yttmp3.com"],
         "methods": ["GET", "POST", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type"],
+        "allow_headers": ["Content-Type", "X-Progress-Id", "Range", "If-Range", "If-None-Match", "If-Modified-Since"],
+        "expose_headers": ["Content-Length", "Content-Range", "Content-Disposition", "Accept-Ranges", "ETag", "Last-Modified"],
         "supports_credentials": True
     }
 })
@@ -36,6 +49,228 @@ DOWNLOAD_FOLDER = 'downloads'
 COOKIES_FILE = 'cookies.json'
 os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
 
+# Metadata cache shared by the scrape and download routes.
+# METADATA_CACHE_BACKEND: memory (per worker), sqlite (shared on this host) or redis.
+metadata_cache = build_metadata_cache(
+    backend=os.environ.get('METADATA_CACHE_BACKEND', 'memory'),
+    max_entries=int(os.environ.get('METADATA_CACHE_SIZE', 512)),
+    sqlite_path=os.environ.get(
+        'METADATA_CACHE_PATH',
+        os.path.join(DOWNLOAD_FOLDER, '.metadata_cache.sqlite3'),
+    ),
+    redis_url=os.environ.get('METADATA_CACHE_URL'),
+    ttls={
+        'pinterest': int(os.environ.get('METADATA_CACHE_TTL_PINTEREST', 900)),
+        'twitter': int(os.environ.get('METADATA_CACHE_TTL_TWITTER', 600)),
+        'tiktok': int(os.environ.get('METADATA_CACHE_TTL_TIKTOK', 300)),
+    },
+)
+
+# Content-addressed cache of finished video files (set DOWNLOAD_CACHE_MAX_BYTES=0 to disable)
+DOWNLOAD_CACHE_MAX_BYTES = int(os.environ.get('DOWNLOAD_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+download_cache = DownloadCache(
+    os.environ.get('DOWNLOAD_CACHE_DIR', os.path.join(DOWNLOAD_FOLDER, '.cache')),
+    max_bytes=DOWNLOAD_CACHE_MAX_BYTES,
+    ttl=int(os.environ.get('DOWNLOAD_CACHE_TTL', 86400)),
+) if DOWNLOAD_CACHE_MAX_BYTES > 0 else None
+
+# Streaming proxy for single media files; PROXY_TEE_CACHE also keeps a copy in the download cache
+PROXY_CHUNK_SIZE = int(os.environ.get('PROXY_CHUNK_SIZE', PROXY_CHUNK_SIZE))
+PROXY_TEE_CACHE = os.environ.get('PROXY_TEE_CACHE', '0').lower() in ('1', 'true', 'yes')
+
+# Where produced files are published so any replica can serve them.
+# STORAGE_BACKEND: local (this replica only), shared (a volume every replica
+# mounts at STORAGE_PATH) or s3 (an S3-compatible bucket). A file this
+# replica does not have on disk is sent as a redirect to a presigned URL
+# (STORAGE_SERVE=redirect) or streamed through the app (STORAGE_SERVE=proxy).
+storage = build_storage(
+    backend=os.environ.get('STORAGE_BACKEND', 'local'),
+    working_folder=DOWNLOAD_FOLDER,
+    shared_path=os.environ.get('STORAGE_PATH'),
+    s3_options={
+        'endpoint': os.environ.get('S3_ENDPOINT', ''),
+        'bucket': os.environ.get('S3_BUCKET', ''),
+        'access_key': os.environ.get('S3_ACCESS_KEY', ''),
+        'secret_key': os.environ.get('S3_SECRET_KEY', ''),
+        'region': os.environ.get('S3_REGION', 'us-east-1'),
+        'prefix': os.environ.get('S3_PREFIX', ''),
+        'presign_ttl': int(os.environ.get('S3_PRESIGN_TTL', 3600)),
+    },
+)
+STORAGE_SERVE = os.environ.get('STORAGE_SERVE', 'redirect')
+
+# Cleanup of produced files: served files expire RETENTION_SERVED_TTL (default
+# RETENTION_TTL) after their last response closed, so a dropped download can
+# resume with a Range request whatever the hand-off mode; anything else after
+# RETENTION_TTL, oldest first above the quota.
+# Files being streamed are referenced in a host-wide SQLite file, so no worker
+# on the host removes a file another worker is still sending. A shared volume
+# is swept by every replica with the same limits; S3 objects are left to a
+# bucket lifecycle rule.
+retention_limits = dict(
+    ttl=int(os.environ.get('RETENTION_TTL', 3600)),
+    served_ttl=int(os.environ['RETENTION_SERVED_TTL']) if os.environ.get('RETENTION_SERVED_TTL') else None,
+    max_bytes=int(os.environ.get('RETENTION_MAX_BYTES', 5 * 1024 ** 3)),
+    interval=int(os.environ.get('RETENTION_INTERVAL', 60)),
+    refs_path=os.environ.get('RETENTION_REFS_PATH', os.path.join(DOWNLOAD_FOLDER, '.retention_refs.sqlite3')),
+)
+retention = RetentionManager(DOWNLOAD_FOLDER, **retention_limits)
+storage_retention = (
+    RetentionManager(storage.root, **retention_limits) if storage.root != DOWNLOAD_FOLDER else None
+)
+
+# Concurrent fetch stage of the bulk Pinterest zip routes, shared by every
+# request in this worker so the per-host cap holds across requests.
+media_fetcher = MediaFetcher(
+    max_workers=int(os.environ.get('BULK_FETCH_WORKERS', 8)),
+    per_host=int(os.environ.get('BULK_FETCH_PER_HOST', 8)),
+    retries=int(os.environ.get('BULK_FETCH_RETRIES', 2)),
+)
+
+# Multi-URL batch downloads: worker threads per batch and per-platform origin limits
+BATCH_MAX_URLS = int(os.environ.get('BATCH_MAX_URLS', 50))
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 4))
+batch_limiter = HostRateLimiter(
+    concurrency={
+        'pinterest': int(os.environ.get('BATCH_LIMIT_PINTEREST', 3)),
+        'twitter': int(os.environ.get('BATCH_LIMIT_TWITTER', 2)),
+        'tiktok': int(os.environ.get('BATCH_LIMIT_TIKTOK', 2)),
+    },
+    min_interval={
+        'pinterest': float(os.environ.get('BATCH_INTERVAL_PINTEREST', 0.2)),
+        'twitter': float(os.environ.get('BATCH_INTERVAL_TWITTER', 0.5)),
+        'tiktok': float(os.environ.get('BATCH_INTERVAL_TIKTOK', 0.5)),
+    },
+)
+
+# Per-platform yt-dlp network profiles (concurrent fragments, chunk and buffer
+# sizes, optional external downloader); see services/download_profiles.py.
+DOWNLOAD_PROFILES = {
+    platform: profile_options(profile)
+    for platform, profile in load_download_profiles().items()
+}
+
+# Serving of produced files. FILE_HANDOFF=x-accel lets nginx stream the bytes
+# from FILE_ACCEL_PREFIX (an internal alias of the folder files are published
+# to: the downloads folder, or STORAGE_PATH for shared storage).
+file_server = FileServer(
+    storage.root,
+    mode=os.environ.get('FILE_HANDOFF', ''),
+    accel_prefix=os.environ.get('FILE_ACCEL_PREFIX', '/_protected_downloads/'),
+)
+
+# Short link resolution cache, shared across workers through SQLite by default.
+url_resolver = UrlResolver(
+    build_metadata_cache(
+        backend=os.environ.get('RESOLVER_CACHE_BACKEND', 'sqlite'),
+        max_entries=int(os.environ.get('RESOLVER_CACHE_SIZE', 4096)),
+        sqlite_path=os.environ.get(
+            'RESOLVER_CACHE_PATH',
+            os.path.join(DOWNLOAD_FOLDER, '.resolver_cache.sqlite3'),
+        ),
+        redis_url=os.environ.get('METADATA_CACHE_URL'),
+    ),
+    shortlink_ttl=int(os.environ.get('RESOLVER_TTL', 86400)),
+    failure_ttl=int(os.environ.get('RESOLVER_FAILURE_TTL', 60)),
+)
+
+# Background download jobs; the download routes queue by default. The job
+# store is shared through SQLite by default so any gunicorn worker can answer
+# GET /api/jobs/<id>, and JOB_QUEUE_SIZE and the JOB_LIMIT_* caps then apply
+# to the whole host rather than to each worker.
+job_queue = JobQueue(
+    store=(
+        MemoryJobStore()
+        if os.environ.get('JOB_STORE', 'sqlite') == 'memory'
+        else SQLiteJobStore(os.environ.get('JOB_STORE_PATH', os.path.join(DOWNLOAD_FOLDER, '.jobs.sqlite3')))
+    ),
+    max_workers=int(os.environ.get('JOB_WORKERS', 2)),
+    max_queue=int(os.environ.get('JOB_QUEUE_SIZE', 32)),
+    platform_limits={
+        'pinterest': int(os.environ.get('JOB_LIMIT_PINTEREST', 2)),
+        'twitter': int(os.environ.get('JOB_LIMIT_TWITTER', 1)),
+        'tiktok': int(os.environ.get('JOB_LIMIT_TIKTOK', 1)),
+    },
+)
+
+# Progress of tracked downloads. A request repeating an in-flight download
+# waits up to JOB_ATTACH_TIMEOUT for it. /api/progress streams poll the job
+# store, send a keep-alive comment while idle and end after
+# PROGRESS_STREAM_TIMEOUT; a client-chosen id may appear a little later than
+# the stream is opened.
+JOB_ATTACH_TIMEOUT = float(os.environ.get('JOB_ATTACH_TIMEOUT', 280))
+PROGRESS_STREAM_TIMEOUT = float(os.environ.get('PROGRESS_STREAM_TIMEOUT', 900))
+PROGRESS_POLL_INTERVAL = 0.5
+PROGRESS_KEEPALIVE = 15
+PROGRESS_JOB_GRACE = 10
+PROGRESS_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{8,64}')
+
+# Prometheus metrics, aggregated across workers through a shared SQLite file
+# (METRICS_STORE=memory reports each worker separately).
+if os.environ.get('METRICS_STORE', 'sqlite') != 'memory':
+    metrics.configure(
+        os.environ.get('METRICS_PATH', os.path.join(DOWNLOAD_FOLDER, '.metrics.sqlite3')),
+        flush_interval=float(os.environ.get('METRICS_FLUSH_INTERVAL', 5)),
+    )
+# ffmpeg concurrency across all workers on this host: FFMPEG_SLOTS runs at a
+# time (default half the CPUs), FFMPEG_THREADS threads each; excess merges
+# queue in arrival order. FFMPEG_GOVERNOR=memory limits each worker separately.
+if os.environ.get('FFMPEG_GOVERNOR', 'sqlite') != 'memory':
+    ffmpeg_governor.configure(
+        os.environ.get('FFMPEG_GOVERNOR_PATH', os.path.join(DOWNLOAD_FOLDER, '.ffmpeg_slots.sqlite3')),
+        slots=int(os.environ.get('FFMPEG_SLOTS', 0)) or None,
+        threads=int(os.environ.get('FFMPEG_THREADS', 0)) or None,
+    )
+metrics.counter('app_cache_lookups_total', 'Cache lookups by cache and result.')
+metrics.register_ratio('app_cache_hit_ratio', 'Share of cache lookups that hit.', 'app_cache_lookups_total', 'result', 'hit')
+metrics.gauge('app_job_queue_depth', 'Download jobs waiting in the queue.')
+metrics.gauge('app_jobs_running', 'Download jobs currently running.')
+metrics.counter('app_outbound_requests_total', 'Requests sent through the pooled HTTP session.')
+metrics.counter('app_outbound_connections_total', 'Sockets opened by the pooled HTTP session.')
+metrics.counter('app_retention_removed_bytes_total', 'Bytes removed by the retention sweeper.')
+
+
+def collect_metrics():
+    """Read the existing per-worker stats into metric samples on each flush."""
+    caches = [('metadata', metadata_cache.stats()), ('shortlink', url_resolver.cache.stats())]
+    if download_cache:
+        caches.append(('download', download_cache.stats()))
+    for name, stats in caches:
+        yield 'app_cache_lookups_total', {'cache': name, 'result': 'hit'}, stats['hits']
+        yield 'app_cache_lookups_total', {'cache': name, 'result': 'miss'}, stats['misses']
+
+    jobs = job_queue.stats()
+    yield 'app_job_queue_depth', {}, jobs['queued']
+    for platform, running in jobs['running'].items():
+        yield 'app_jobs_running', {'platform': platform}, running
+
+    http = connection_stats()
+    yield 'app_outbound_requests_total', {}, http['requests']
+    yield 'app_outbound_connections_total', {}, http['connections']
+    removed_bytes = retention.stats()['removed_bytes']
+    if storage_retention:
+        removed_bytes += storage_retention.stats()['removed_bytes']
+    yield 'app_retention_removed_bytes_total', {}, removed_bytes
+
+
+metrics.register_collector(collect_metrics)
+
+# On-demand request profiling. Only installed when PROFILING_TOKEN is set, so
+# the default deployment runs without the extra WSGI layer.
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')
+PROFILES_FOLDER = os.environ.get('PROFILES_PATH', os.path.join(DOWNLOAD_FOLDER, '.profiles'))
+# Prometheus metrics expose per-platform job, cache and byte counters, so
+# /api/metrics answers only when METRICS_TOKEN is set, to that Bearer token.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+if PROFILING_TOKEN:
+    app.wsgi_app = ProfilingMiddleware(
+        app.wsgi_app,
+        PROFILING_TOKEN,
+        PROFILES_FOLDER,
+        keep=int(os.environ.get('PROFILES_KEEP', 50)),
+    )
+
+
 def parse_min_resolution(value):
     """Parse min_resolution input into a tuple[int, int] or None."""
     if not value:
@@ -62,45 +297,552 @@ def parse_min_resolution(value):
     return None
 
 
-def build_downloader():
+def build_downloader(cookies=None):
     """Create PinterestDL client with optional cookies."""
+    # Imported on first use; pinterest_dl is heavy and most routes never need it
+    from pinterest_dl import PinterestDL
+
     downloader = PinterestDL.with_api(timeout=5, verbose=False)
-    if os.path.exists(COOKIES_FILE):
-        try:
-            with open(COOKIES_FILE, 'r') as f:
-                cookies = json.load(f)
-            downloader = downloader.with_cookies(cookies)
-        except (json.JSONDecodeError, OSError):
-            pass
+    if cookies:
+        downloader = downloader.with_cookies(cookies)
     return downloader
 
 
+# Warm PinterestDL clients, rebuilt only when cookies.json changes.
+pinterest_clients = ClientPool(
+    build_downloader,
+    COOKIES_FILE,
+    size=int(os.environ.get('PINTEREST_CLIENT_POOL_SIZE', 4)),
+    checkout_timeout=float(os.environ.get('PINTEREST_CLIENT_TIMEOUT', 30)),
+)
+
+
 def normalize_url(raw_url):
-    """Resolve Pinterest short links (pin.it) to their final destination."""
-    if not raw_url:
-        return raw_url
+    """Resolve short links (pin.it, t.co, vm.tiktok.com) to their final destination."""
+    with span('normalize_url'):
+        return url_resolver.resolve(raw_url)
 
-    url = raw_url.strip()
-    if not url:
-        return url
 
-    if not url.startswith(('http://', 'https://')):
-        url = f'https://{url}'
+def get_video_info(platform, url, cache_url=None, raise_errors=False):
+    """Return the yt-dlp info dict for url, served from the metadata cache when possible."""
+    def load():
+        with span('extract', platform):
+            return extract_video_info(url, raise_errors=raise_errors)
 
-    try:
-        response = requests.head(url, allow_redirects=True, timeout=10)
-        if response.url:
-            return response.url
-    except requests.RequestException:
+    return metadata_cache.get_or_set(platform, cache_url or url, load)
+
+
+def scrape_pins(downloader, url, num, min_resolution=None):
+    """Scrape a Pinterest URL with PinterestDL, caching the resulting media dicts."""
+    variant = f"scrape:{num}:{'x'.join(map(str, min_resolution)) if min_resolution else ''}"
+
+    def load():
+        scrape_kwargs = {
+            'url': url,
+            'num': num,
+        }
+
+        if min_resolution:
+            scrape_kwargs['min_resolution'] = min_resolution
+
+        with span('scrape', 'pinterest'):
+            return [media.to_dict() for media in downloader.scrape(**scrape_kwargs)]
+
+    return metadata_cache.get_or_set('pinterest', url, load, variant=variant)
+
+
+def run_video_download(platform, url, format_id):
+    """Download a video with the platform service and build the API response payload.
+
+    Finished files are kept in the content-addressed download cache, so a
+    repeat request for the same video and format skips yt-dlp and ffmpeg.
+    """
+    # Pinterest routes pass an already-normalized URL
+    cache_url = url if platform == 'pinterest' else normalize_url(url)
+
+    # The URL alias lets a repeat request skip extraction as well as the download.
+    # It is looked up before extraction, so it can only carry the requested format;
+    # it always points at the same object as the info key below.
+    cache_keys = [download_cache.make_key('url', cache_url, f'{platform}:{format_id}')] if download_cache else []
+    cached_result = serve_cached_video(platform, cache_keys)
+    if cached_result:
+        return cached_result
+
+    info = get_video_info(platform, url, cache_url=cache_url)
+
+    if download_cache and info:
+        # Keyed on the format yt-dlp will pick, so 'best' and the explicit id it
+        # resolves to share one entry
+        resolved = PLATFORMS[platform].resolve_format(info, format_id)
+        info_key = download_cache.make_key(
+            info.get('extractor_key') or info.get('extractor'),
+            info.get('id'),
+            f'{platform}:{resolved}',
+        ) if resolved else None
+        if info_key:
+            cache_keys.append(info_key)
+            cached_result = serve_cached_video(platform, [info_key], alias_keys=cache_keys[:1])
+            if cached_result:
+                return cached_result
+
+    with span('download', platform):
+        download_result = PLATFORMS[platform].download(
+            url,
+            format_id,
+            DOWNLOAD_FOLDER,
+            info=info,
+            ydl_options=DOWNLOAD_PROFILES.get(platform),
+        )
+    count_bytes('downloaded', os.path.getsize(download_result['file_path']), platform)
+
+    digest = download_cache.store(cache_keys, download_result['file_path'], {
+        'audio_merged': download_result['audio_merged'],
+        'warning': download_result['warning'],
+        'remux': download_result.get('remux'),
+    }) if download_cache else None
+
+    filename = storage.publish(download_result['file_path'])
+    if digest:
+        file_server.remember(os.path.join(storage.root, filename), digest)
+
+    return build_video_response(download_result)
+
+
+def serve_cached_video(platform, cache_keys, alias_keys=()):
+    """Hardlink a cached video into the downloads folder and return its response, or None."""
+    for cache_key in cache_keys:
+        entry = download_cache.lookup(cache_key)
+        if not entry:
+            continue
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        ext = os.path.splitext(entry['path'])[1]
+        filename = f'{PLATFORMS[platform].file_prefix}_{timestamp}{ext}'
+        file_path = os.path.join(DOWNLOAD_FOLDER, filename)
         try:
-            response = requests.get(url, allow_redirects=True, timeout=10, stream=True)
-            if response.url:
-                return response.url
-        except requests.RequestException:
-            pass
+            download_cache.materialize(entry, file_path)
+        except OSError:
+            # Evicted between lookup and link; treat as a miss
+            continue
+
+        # Same object under another key: an index insert, no re-hash
+        download_cache.store(alias_keys, file_path, entry['meta'], digest=entry['digest'])
+
+        storage.publish(file_path)
+        file_server.remember(os.path.join(storage.root, filename), entry['digest'])
+
+        return build_video_response(dict(entry['meta'], filename=filename, cached=True))
+    return None
+
+
+def build_video_response(download_result):
+    """Build the JSON payload for a finished video download."""
+    response_data = {
+        'success': True,
+        'download_url': f"/api/download-video-file/{download_result['filename']}",
+        'filename': download_result['filename'],
+        'audio_merged': download_result['audio_merged']
+    }
+
+    if download_result.get('warning'):
+        response_data['warning'] = download_result['warning']
+    if download_result.get('remux'):
+        response_data['remux'] = download_result['remux']
+    if (download_result.get('ffmpeg') or {}).get('runs'):
+        response_data['ffmpeg'] = download_result['ffmpeg']
+    if download_result.get('format_plan'):
+        response_data['debug'] = {'format_plan': download_result['format_plan']}
+    if download_result.get('cached'):
+        response_data['cached'] = True
+
+    return response_data
+
+
+def serve_download(file_path, filename, mimetype=None):
+    """Send a produced file with validators and range support, then hand it to retention.
+
+    Every response (200, 206, or a proxy hand-off) schedules the same
+    expiry, so an interrupted download can resume within the retention TTL.
+    """
+    with span('serve'):
+        response = file_server.serve(request.environ, file_path, filename, mimetype)
+    if response.status_code == 200:
+        count_bytes('served', os.path.getsize(file_path))
+    elif response.status_code == 206:
+        count_bytes('served', response.content_length or 0)
+    response.headers.add('Access-Control-Allow-Origin', 'http://localhost:3000')
+    return retention.track_response(response, file_path)
+
+
+def serve_stored(filename, mimetype=None):
+    """Serve a published file from disk, or from storage when another replica produced it."""
+    name = secure_filename(filename)
+    file_path = storage.find(name)
+    if file_path:
+        # Removed by the retention sweeper once the response has been sent
+        return serve_download(file_path, filename, mimetype)
+
+    remote_url = storage.remote_url(name, filename, mimetype)
+    if not remote_url:
+        return jsonify({'error': 'File not found'}), 404
+    if STORAGE_SERVE != 'proxy':
+        response = redirect(remote_url)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    import requests
+
+    try:
+        upstream = open_upstream(remote_url, request.headers)
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return jsonify({'error': 'File not found'}), 404
+        raise
+    response_headers = passthrough_headers(upstream)
+    if upstream.status_code == 304:
+        upstream.close()
+        return Response(status=304, headers=response_headers)
+    response_headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response_headers['Access-Control-Allow-Origin'] = 'http://localhost:3000'
+    return Response(
+        iter_upstream(upstream, chunk_size=PROXY_CHUNK_SIZE),
+        status=upstream.status_code,
+        mimetype=mimetype or upstream.headers.get('content-type', 'application/octet-stream'),
+        headers=response_headers,
+    )
+
+
+def wants_async(data, default=True):
+    """Return True when the download should run as a queued job.
+
+    Download routes queue by default and answer 202 with the job URLs;
+    ``"async": false`` runs the download inside the request instead.
+    """
+    if 'respond-async' in request.headers.get('Prefer', ''):
+        return True
+    return bool(data.get('async', default))
+
+
+def job_key(platform, func, args):
+    """Identify a download by its function and arguments, so duplicates can join it."""
+    payload = json.dumps([platform, func.__name__, args], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def requested_progress_id():
+    """Job id chosen by the client (X-Progress-Id) so it can open /api/progress first."""
+    value = request.headers.get('X-Progress-Id') or (request.get_json(silent=True) or {}).get('progress_id')
+    if value and PROGRESS_ID_PATTERN.fullmatch(str(value)):
+        return str(value)
+    return None
+
+
+def enqueue_download(platform, func, *args):
+    """Queue a download job and return the 202 response pointing at its status URL.
+
+    A retry of a download that is still queued or running gets the existing job.
+    """
+    try:
+        job_id = job_queue.submit(platform, func, *args, dedupe_key=job_key(platform, func, args))
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+
+    job = job_queue.get(job_id)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'state': job['state'] if job else 'queued',
+        'status_url': f'/api/jobs/{job_id}',
+        'progress_url': f'/api/progress/{job_id}'
+    }), 202
+
+
+def run_tracked(platform, func, *args):
+    """Run a download in this request as a tracked job and return its result.
+
+    Progress can be followed on /api/progress/<X-Progress-Id>. If the same
+    download is already in flight (typically a client retry), its result is
+    awaited instead of downloading twice.
+    """
+    key = job_key(platform, func, args)
+    existing = job_queue.find_active(key)
+    if existing:
+        job = job_queue.wait(existing, timeout=JOB_ATTACH_TIMEOUT)
+        if job and job['state'] == 'succeeded':
+            return job['result']
+        if job and job['state'] == 'failed':
+            raise RuntimeError(job['error'])
+    return job_queue.run_inline(platform, func, *args, dedupe_key=key, job_id=requested_progress_id())
+
+
+def collect_pins(downloader, url, query, num, min_resolution):
+    """Scrape a board/pin URL or run a search and return media dicts."""
+    if url:
+        return scrape_pins(downloader, url, num, min_resolution)
+    return [
+        media.to_dict()
+        for media in downloader.search(query=query, num=num, min_resolution=min_resolution or (0, 0))
+    ]
+
+
+def batch_handlers(format_id):
+    """Per-platform download functions for run_batch / iter_batch."""
+
+    def handler(platform):
+        def download(url):
+            if platform == 'pinterest':
+                url = normalize_url(url)
+            return run_video_download(platform, url, format_id)
+        return download
+
+    return {platform: handler(platform) for platform in PLATFORMS}
+
+
+def batch_manifest(items):
+    """Summarise batch items (in input order) as the manifest payload."""
+    succeeded = sum(1 for item in items if item.get('success'))
+    return {
+        'success': succeeded > 0,
+        'count': len(items),
+        'succeeded': succeeded,
+        'failed': len(items) - succeeded,
+        'items': items
+    }
+
+
+def run_batch_download(urls, format_id):
+    """Download a list of mixed-platform video URLs concurrently and report per item."""
+    items = run_batch(
+        urls,
+        batch_handlers(format_id),
+        max_workers=BATCH_WORKERS,
+        limiter=batch_limiter,
+    )
+    return batch_manifest(items)
+
+
+def stream_batch_zip(urls, format_id):
+    """Stream a batch as one zip, adding each video as soon as its download finishes.
+
+    Videos are written in completion order while later URLs are still
+    downloading; manifest.json is appended once every URL has been handled.
+    """
+    def discard(item):
+        # Finished after the client went away; never zipped
+        if item.get('success'):
+            storage.delete(secure_filename(item['filename']))
+
+    def entries():
+        items = []
+        for item in iter_batch(
+            urls,
+            batch_handlers(format_id),
+            max_workers=BATCH_WORKERS,
+            limiter=batch_limiter,
+            discard=discard,
+        ):
+            items.append(item)
+            if not item.get('success'):
+                continue
+            name = secure_filename(item['filename'])
+            file_path = storage.find(name)
+            if not file_path:
+                continue
+            try:
+                yield item['filename'], iter_file(file_path)
+            finally:
+                storage.delete(name)
+        items.sort(key=lambda item: item['index'])
+        yield 'manifest.json', [json.dumps(batch_manifest(items), indent=4).encode('utf-8')]
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return Response(
+        count_stream(stream_archive(entries()), 'zipped'),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename="batch_{timestamp}.zip"',
+            'X-Accel-Buffering': 'no',
+        }
+    )
+
+
+def run_bulk_download(url, query, num, min_resolution, download_video, caption):
+    """Download a board, pin or search result with PinterestDL and zip it.
+
+    Media are written into the archive as they are fetched; only the
+    'metadata' caption mode still needs a staging directory.
+    """
+    if url:
+        url = normalize_url(url)
+
+    with pinterest_clients.checkout() as downloader:
+        if caption == 'metadata':
+            return run_staged_bulk_download(downloader, url, query, num, min_resolution, download_video, caption)
+
+        medias = collect_pins(downloader, url, query, num, min_resolution)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    zip_filename = f'pinterest_{timestamp}.zip'
+    zip_path = os.path.join(DOWNLOAD_FOLDER, zip_filename)
+
+    # Written under a '.part' name so retention never evicts a half-built archive
+    partial_path = zip_path + '.part'
+    stats = {}
+    try:
+        with span('zip', 'pinterest'), open(partial_path, 'wb') as f:
+            entries = iter_pin_entries(
+                medias, download_video, caption, DOWNLOAD_FOLDER, stats,
+                fetcher=media_fetcher,
+            )
+            write_archive(entries, f)
+        os.replace(partial_path, zip_path)
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    count_bytes('zipped', os.path.getsize(zip_path), 'pinterest')
+    storage.publish(zip_path)
+
+    return {
+        'success': True,
+        'count': stats['count'],
+        'failed': stats['failed'],
+        'download_url': f'/api/download/{zip_filename}'
+    }
+
+
+def stream_bulk_download(url, query, num, min_resolution, download_video, caption):
+    """Scrape up front, then stream the zip straight to the client with chunked transfer."""
+    if url:
+        url = normalize_url(url)
+    with pinterest_clients.checkout() as downloader:
+        medias = collect_pins(downloader, url, query, num, min_resolution)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    entries = iter_pin_entries(medias, download_video, caption, DOWNLOAD_FOLDER, {}, fetcher=media_fetcher)
+    return Response(
+        count_stream(stream_archive(entries), 'zipped', 'pinterest'),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename="pinterest_{timestamp}.zip"',
+            'X-Accel-Buffering': 'no',
+        }
+    )
+
+
+def run_staged_bulk_download(downloader, url, query, num, min_resolution, download_video, caption):
+    """Download through a staging directory (needed for EXIF metadata captions) and zip it."""
+    # Create unique output directory
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    output_dir = os.path.join(DOWNLOAD_FOLDER, f'pinterest_{timestamp}')
+    os.makedirs(output_dir, exist_ok=True)
+    
+    download_kwargs = {
+        'output_dir': output_dir,
+        'num': num,
+        'download_streams': download_video,
+        'caption': caption,
+    }
+
+    if min_resolution:
+        download_kwargs['min_resolution'] = min_resolution
+    
+    # Download based on URL or query
+    if url:
+        images = downloader.scrape_and_download(url=url, **download_kwargs)
+    else:
+        images = downloader.search_and_download(query=query, **download_kwargs)
+
+    if images is None:
+        images = []
+    
+    # Create zip file
+    zip_filename = f'pinterest_{timestamp}.zip'
+    zip_path = os.path.join(DOWNLOAD_FOLDER, zip_filename)
+    
+    partial_path = zip_path + '.part'
+    with zipfile.ZipFile(partial_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for root, dirs, files in os.walk(output_dir):
+            for file in files:
+                file_path = os.path.join(root, file)
+                arcname = os.path.relpath(file_path, output_dir)
+                zipf.write(file_path, arcname)
+    os.replace(partial_path, zip_path)
+    
+    # Clean up output directory
+    shutil.rmtree(output_dir)
+    storage.publish(zip_path)
+    
+    return {
+        'success': True,
+        'count': len(images),
+        'download_url': f'/api/download/{zip_filename}'
+    }
+
+
+@app.before_request
+def start_retention_sweeper():
+    """Make sure this worker's retention sweeper threads are running"""
+    retention.start()
+    if storage_retention:
+        storage_retention.start()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None and request.endpoint != 'metrics_endpoint':
+        metrics.observe(
+            'app_request_duration_seconds',
+            time.perf_counter() - started,
+            endpoint=request.endpoint or 'unknown',
+            method=request.method,
+            status=response.status_code,
+        )
+    return response
+
+def bearer_authorized(expected):
+    # A Bearer token rather than X-Profile-Token, so listing does not profile itself
+    auth = request.headers.get('Authorization', '')
+    supplied = auth[len('Bearer '):] if auth.startswith('Bearer ') else request.args.get('token')
+    return token_matches(expected, supplied)
+
+def profiling_authorized():
+    return bearer_authorized(PROFILING_TOKEN)
 
-    return url
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics for every worker on this host (needs METRICS_TOKEN)"""
+    if not METRICS_TOKEN:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    if not bearer_authorized(METRICS_TOKEN):
+        return jsonify({'error': 'Forbidden'}), 403
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_request_profiles():
+    """List the most recent request profiles"""
+    if not PROFILING_TOKEN:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    if not profiling_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({'profiles': list_profiles(PROFILES_FOLDER, limit=limit)})
+
+@app.route('/api/admin/profiles/<filename>', methods=['GET'])
+def download_request_profile(filename):
+    """Download one stored profile (.pstats or .folded)"""
+    if not PROFILING_TOKEN:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    if not profiling_authorized():
+        return jsonify({'error': 'Forbidden'}), 403
+    file_path = os.path.join(PROFILES_FOLDER, secure_filename(filename))
+    if not os.path.isfile(file_path):
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(os.path.abspath(file_path), as_attachment=True, download_name=os.path.basename(file_path))
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -121,20 +863,8 @@ def scrape_pinterest():
         
         # Normalize short links (pin.it) and initialize PinterestDL
         url = normalize_url(url)
-        downloader = build_downloader()
-
-        scrape_kwargs = {
-            'url': url,
-            'num': num,
-        }
-
-        if min_resolution:
-            scrape_kwargs['min_resolution'] = min_resolution
-
-        scraped_medias = downloader.scrape(**scrape_kwargs)
-        
-        # Convert to dictionary
-        media_data = [media.to_dict() for media in scraped_medias]
+        with pinterest_clients.checkout() as downloader:
+            media_data = scrape_pins(downloader, url, num, min_resolution)
         
         return jsonify({
             'success': True,
@@ -159,8 +889,6 @@ def search_pinterest():
         
         # Parse min_resolution if provided
         # Initialize PinterestDL and search
-        downloader = build_downloader()
-
         search_kwargs = {
             'query': query,
             'num': num,
@@ -169,7 +897,8 @@ def search_pinterest():
         if min_resolution:
             search_kwargs['min_resolution'] = min_resolution
 
-        scraped_medias = downloader.search(**search_kwargs)
+        with pinterest_clients.checkout() as downloader:
+            scraped_medias = downloader.search(**search_kwargs)
         
         # Convert to dictionary
         media_data = [media.to_dict() for media in scraped_medias]
@@ -198,61 +927,65 @@ def download_media():
         if not url and not query:
             return jsonify({'error': 'URL or query is required'}), 400
         
-        # Parse min_resolution if provided
-        # Create unique output directory
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_dir = os.path.join(DOWNLOAD_FOLDER, f'pinterest_{timestamp}')
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Initialize PinterestDL
-        downloader = build_downloader()
+        if data.get('stream'):
+            if caption == 'metadata':
+                return jsonify({'error': "caption 'metadata' is not supported when streaming"}), 400
+            return stream_bulk_download(url, query, num, min_resolution, download_video, caption)
 
-        download_kwargs = {
-            'output_dir': output_dir,
-            'num': num,
-            'download_streams': download_video,
-            'caption': caption,
-        }
+        if wants_async(data):
+            return enqueue_download(
+                'pinterest', run_bulk_download,
+                url, query, num, min_resolution, download_video, caption,
+            )
 
-        if min_resolution:
-            download_kwargs['min_resolution'] = min_resolution
+        return jsonify(run_tracked(
+            'pinterest', run_bulk_download,
+            url, query, num, min_resolution, download_video, caption,
+        ))
         
-        # Download based on URL or query
-        if url:
-            url = normalize_url(url)
-            images = downloader.scrape_and_download(url=url, **download_kwargs)
-        else:
-            images = downloader.search_and_download(query=query, **download_kwargs)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/batch', methods=['POST'])
+def batch_download():
+    """Download a list of Pinterest/Twitter/TikTok video URLs in one request"""
+    try:
+        data = request.json
+        urls = data.get('urls')
+        format_id = data.get('format_id', 'best')
+        output = data.get('output', 'manifest')
+
+        if not isinstance(urls, list):
+            return jsonify({'error': 'A list of URLs is required'}), 400
+
+        urls = [str(url).strip() for url in urls if url and str(url).strip()]
+        if not urls:
+            return jsonify({'error': 'A list of URLs is required'}), 400
+        if len(urls) > BATCH_MAX_URLS:
+            return jsonify({'error': f'At most {BATCH_MAX_URLS} URLs per batch'}), 400
+
+        if output == 'zip':
+            return stream_batch_zip(urls, format_id)
+
+        # A batch answers with its manifest unless the client asks for a job
+        if wants_async(data, default=False):
+            return enqueue_download('batch', run_batch_download, urls, format_id)
+
+        return jsonify(run_batch_download(urls, format_id))
 
-        if images is None:
-            images = []
-        
-        # Create zip file
-        zip_filename = f'pinterest_{timestamp}.zip'
-        zip_path = os.path.join(DOWNLOAD_FOLDER, zip_filename)
-        
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(output_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, output_dir)
-                    zipf.write(file_path, arcname)
-        
-        # Clean up output directory
-        shutil.rmtree(output_dir)
-        
-        return jsonify({
-            'success': True,
-            'count': len(images),
-            'download_url': f'/api/download/{zip_filename}'
-        })
-        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/download-single', methods=['POST'])
 def download_single_pinterest():
-    """Download a single Pinterest pin in original format (not ZIP)"""
+    """Download a single Pinterest pin in original format (not ZIP).
+
+    The pin is looked up with PinterestDL's single-pin scrape (its pin API
+    request, or the pin page when that fails), cached under the canonical
+    pin URL, and its media URL is read with ``resolve_pin_media``. With
+    ``stream`` the media is proxied as it arrives; otherwise it is saved
+    to the downloads folder first and served from there.
+    """
     try:
         data = request.json
         url = data.get('url')
@@ -260,37 +993,38 @@ def download_single_pinterest():
         download_video = data.get('download_video', False)
         caption = data.get('caption', 'none')
         
+        stream = bool(data.get('stream'))
+
         # Handle direct media URL download
         if media_url:
-            return download_media_url_direct(media_url)
+            return download_media_url_direct(media_url, stream=stream)
         
         # Handle Pinterest URL scraping and download
         if not url:
             return jsonify({'error': 'URL or media_url is required'}), 400
         
-        # Scrape Pinterest URL to get media
+        # Scrape Pinterest URL to get media; pin links are cached under their canonical form
         url = normalize_url(url)
-        downloader = build_downloader()
-        
-        scraped_medias = downloader.scrape(url=url, num=1)
+        url = canonical_pin_url(url) or url
+        with pinterest_clients.checkout() as downloader:
+            scraped_medias = scrape_pins(downloader, url, 1)
         
         if not scraped_medias:
             return jsonify({'error': 'No media found for this Pinterest URL'}), 404
 
-        # Convert to dict and attempt to locate a media URL
-        media = scraped_medias[0]
-        media_dict = media.to_dict()
-        target_url = extract_media_url(media_dict, prefer_video=download_video)
-
-        if not target_url:
-            # Retry without forcing video in case image is available
-            target_url = extract_media_url(media_dict, prefer_video=False)
+        # Known pin shapes resolve through fixed key paths; anything else is searched
+        media_dict = scraped_medias[0]
+        target_url = (
+            resolve_pin_media(media_dict, prefer_video=download_video)
+            or extract_media_url(media_dict, prefer_video=download_video)
+            or extract_media_url(media_dict, prefer_video=False)
+        )
 
         if not target_url:
             return jsonify({'error': 'No downloadable media found'}), 404
 
         # Download the media file
-        return download_media_url_direct(target_url)
+        return download_media_url_direct(target_url, stream=stream)
         
     except Exception as e:
         return jsonify({'error': f'Failed to download Pinterest media: {str(e)}'}), 500
@@ -347,12 +1081,94 @@ def extract_media_url(media_dict, prefer_video=False):
     # Final fallback: scan entire dictionary
     return find_url(media_dict)
 
-def download_media_url_direct(media_url):
-    """Helper function to download a media URL directly"""
+def direct_download_name(media_url, content_type):
+    """Build an attachment filename from the media URL, adding an extension if missing."""
+    url_parts = media_url.split('/')
+    original_filename = url_parts[-1] if url_parts else 'media'
+    if '?' in original_filename:
+        original_filename = original_filename.split('?')[0]
+
+    # Ensure proper extension
+    if not any(original_filename.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp4', '.mov', '.avi']):
+        # Add extension based on content type
+        if 'image' in content_type.lower():
+            if 'png' in content_type:
+                original_filename += '.png'
+            elif 'gif' in content_type:
+                original_filename += '.gif'
+            else:
+                original_filename += '.jpg'
+        elif 'video' in content_type.lower():
+            original_filename += '.mp4'
+        else:
+            original_filename += '.jpg'
+
+    return original_filename
+
+
+def proxy_media(media_url, headers=None):
+    """Stream a media URL straight to the client without touching the downloads folder.
+
+    Range and conditional request headers are forwarded upstream, and
+    Content-Length, Content-Range and ETag come back unchanged. A copy kept
+    in the download cache (PROXY_TEE_CACHE) is served locally next time.
+    """
+    cache_key = download_cache.make_key('url', media_url, 'media') if download_cache else None
+    # werkzeug only honours Range on GET, so ranged POSTs keep going upstream
+    use_cache = cache_key and (request.method == 'GET' or 'Range' not in request.headers)
+    entry = download_cache.lookup(cache_key) if use_cache else None
+    if entry:
+        content_type = entry['meta'].get('content_type', 'application/octet-stream')
+        return send_file(
+            os.path.abspath(entry['path']),
+            mimetype=content_type,
+            as_attachment=True,
+            download_name=entry['meta'].get('filename') or direct_download_name(media_url, content_type),
+            etag=entry['digest'],
+            conditional=True,
+        )
+
+    upstream = open_upstream(media_url, request.headers)
+    content_type = upstream.headers.get('content-type', 'application/octet-stream')
+    filename = direct_download_name(media_url, content_type)
+    response_headers = passthrough_headers(upstream)
+
+    if upstream.status_code == 304:
+        upstream.close()
+        return Response(status=304, headers=response_headers)
+
+    on_complete = None
+    if cache_key and PROXY_TEE_CACHE:
+        def on_complete(path):
+            download_cache.store([cache_key], path, {'content_type': content_type, 'filename': filename})
+
+    response_headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return Response(
+        iter_upstream(
+            upstream,
+            chunk_size=PROXY_CHUNK_SIZE,
+            tee_dir=download_cache.root if on_complete else None,
+            tee_suffix=os.path.splitext(filename)[1],
+            on_complete=on_complete,
+        ),
+        status=upstream.status_code,
+        mimetype=content_type,
+        headers=response_headers,
+    )
+
+
+def download_media_url_direct(media_url, stream=False):
+    """Helper function to download a media URL directly.
+
+    With ``stream`` the media bytes are proxied in the response body instead
+    of being saved for a follow-up GET.
+    """
     try:
+        if stream:
+            return proxy_media(media_url)
+
         # Download the single media file to memory
-        import requests
-        response = requests.get(media_url, stream=True, timeout=30)
+        response = get_session().get(media_url, stream=True, timeout=30)
         response.raise_for_status()
         
         # Determine file extension from URL or Content-Type
@@ -392,15 +1208,17 @@ def download_media_url_direct(media_url):
         if not extension:
             extension = '.jpg'
         
-        # Create filename with timestamp to avoid conflicts
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        # Create filename with timestamp to avoid conflicts (microseconds, so
+        # concurrent requests in the same second do not share a file)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
         filename = f"pinterest_media_{timestamp}{extension}"
         
         # Save file temporarily
         temp_path = os.path.join(DOWNLOAD_FOLDER, filename)
-        with open(temp_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
+        with response, open(temp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=PROXY_CHUNK_SIZE):
                 f.write(chunk)
+        storage.publish(temp_path)
         
         return jsonify({
             'success': True,
@@ -431,51 +1249,12 @@ def download_direct():
         if not media_url:
             return jsonify({'error': 'Media URL is required'}), 400
         
-        # Download the media file
-        import requests
-        response = requests.get(media_url, stream=True, timeout=30)
-        response.raise_for_status()
-        
-        # Determine MIME type and filename
-        content_type = response.headers.get('content-type', 'application/octet-stream')
-        
-        # Generate filename
-        url_parts = media_url.split('/')
-        original_filename = url_parts[-1] if url_parts else 'media'
-        if '?' in original_filename:
-            original_filename = original_filename.split('?')[0]
-        
-        # Ensure proper extension
-        if not any(original_filename.lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp4', '.mov', '.avi']):
-            # Add extension based on content type
-            if 'image' in content_type.lower():
-                if 'png' in content_type:
-                    original_filename += '.png'
-                elif 'gif' in content_type:
-                    original_filename += '.gif'
-                else:
-                    original_filename += '.jpg'
-            elif 'video' in content_type.lower():
-                original_filename += '.mp4'
-            else:
-                original_filename += '.jpg'
-        
-        from flask import Response
-        def generate():
-            for chunk in response.iter_content(chunk_size=8192):
-                yield chunk
-        
-        # Create response with explicit CORS headers
-        flask_response = Response(
-            generate(),
-            mimetype=content_type,
-            headers={
-                'Content-Disposition': f'attachment; filename="{original_filename}"',
-                'Access-Control-Allow-Origin': 'http://localhost:3000',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-            }
-        )
+        flask_response = proxy_media(media_url)
+
+        # Explicit CORS headers
+        flask_response.headers['Access-Control-Allow-Origin'] = 'http://localhost:3000'
+        flask_response.headers['Access-Control-Allow-Methods'] = 'POST, OPTIONS'
+        flask_response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
         
         return flask_response
         
@@ -486,36 +1265,21 @@ def download_direct():
 def download_direct_file(filename):
     """Download file directly in original format"""
     try:
-        file_path = os.path.join(DOWNLOAD_FOLDER, secure_filename(filename))
-        if os.path.exists(file_path):
-            # Determine MIME type based on file extension
-            mime_types = {
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg', 
-                '.png': 'image/png',
-                '.gif': 'image/gif',
-                '.webp': 'image/webp',
-                '.mp4': 'video/mp4',
-                '.mov': 'video/quicktime',
-                '.avi': 'video/x-msvideo'
-            }
-            
-            file_ext = os.path.splitext(filename)[1].lower()
-            mimetype = mime_types.get(file_ext, 'application/octet-stream')
-            
-            def cleanup_after_send():
-                try:
-                    os.remove(file_path)
-                except:
-                    pass
-            
-            # Schedule file cleanup after sending
-            import threading
-            threading.Timer(2.0, cleanup_after_send).start()
-            
-            return send_file(file_path, as_attachment=True, download_name=filename, mimetype=mimetype)
-        else:
-            return jsonify({'error': 'File not found'}), 404
+        # Determine MIME type based on file extension
+        mime_types = {
+            '.jpg': 'image/jpeg',
+            '.jpeg': 'image/jpeg', 
+            '.png': 'image/png',
+            '.gif': 'image/gif',
+            '.webp': 'image/webp',
+            '.mp4': 'video/mp4',
+            '.mov': 'video/quicktime',
+            '.avi': 'video/x-msvideo'
+        }
+        
+        file_ext = os.path.splitext(filename)[1].lower()
+        mimetype = mime_types.get(file_ext, 'application/octet-stream')
+        return serve_stored(filename, mimetype)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -523,14 +1287,7 @@ def download_direct_file(filename):
 def download_file(filename):
     """Download the zip file"""
     try:
-        file_path = os.path.join(DOWNLOAD_FOLDER, secure_filename(filename))
-        if os.path.exists(file_path):
-            response = send_file(file_path, as_attachment=True, download_name=filename)
-            # Add CORS headers
-            response.headers.add('Access-Control-Allow-Origin', 'http://localhost:3000')
-            return response
-        else:
-            return jsonify({'error': 'File not found'}), 404
+        return serve_stored(filename)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -546,6 +1303,8 @@ def login_pinterest():
             return jsonify({'error': 'Email and password are required'}), 400
         
         # Initialize browser and login
+        from pinterest_dl import PinterestDL
+
         cookies = PinterestDL.with_browser(
             browser_type="chrome",
             headless=True,
@@ -554,6 +1313,7 @@ def login_pinterest():
         # Save cookies to file
         with open(COOKIES_FILE, 'w') as f:
             json.dump(cookies, f, indent=4)
+        pinterest_clients.invalidate()
         
         return jsonify({
             'success': True,
@@ -563,6 +1323,112 @@ def login_pinterest():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs', methods=['GET'])
+def jobs_status():
+    """Report queue depth and running jobs for this worker, with host-wide totals"""
+    return jsonify(job_queue.stats())
+
+def describe_job(job):
+    """Build the public status payload of a job record."""
+    response_data = {
+        'job_id': job['id'],
+        'platform': job['platform'],
+        'state': job['state'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+    }
+    if 'position' in job:
+        response_data['position'] = job['position']
+    if job['result']:
+        response_data.update(job['result'])
+    if job['error']:
+        response_data['error'] = job['error']
+    if job.get('progress') and job['state'] == 'running':
+        response_data['progress'] = job['progress']
+    return response_data
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Report the state of a queued download job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    return jsonify(describe_job(job))
+
+def sse_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+@app.route('/api/progress/<job_id>', methods=['GET'])
+def job_progress(job_id):
+    """Stream a job's stage, bytes, speed and ETA as Server-Sent Events"""
+    if not PROGRESS_ID_PATTERN.fullmatch(job_id):
+        return jsonify({'error': 'Job not found'}), 404
+
+    def events():
+        started = time.monotonic()
+        last_payload = None
+        last_sent = started
+        while True:
+            job = job_queue.get(job_id)
+            now = time.monotonic()
+            if job is None:
+                if now - started > PROGRESS_JOB_GRACE:
+                    yield sse_event('error', {'error': 'Job not found'})
+                    return
+            else:
+                payload = describe_job(job)
+                if job['state'] in ('succeeded', 'failed', 'cancelled'):
+                    yield sse_event('done', payload)
+                    return
+                if payload != last_payload:
+                    yield sse_event('progress', payload)
+                    last_payload, last_sent = payload, now
+            if now - last_sent >= PROGRESS_KEEPALIVE:
+                yield ': keep-alive\n\n'
+                last_sent = now
+            if now - started > PROGRESS_STREAM_TIMEOUT:
+                yield sse_event('timeout', {'job_id': job_id})
+                return
+            time.sleep(PROGRESS_POLL_INTERVAL)
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running download job"""
+    state = job_queue.cancel(job_id)
+    if not state:
+        return jsonify({'error': 'Job not found or already finished'}), 404
+    return jsonify({'success': True, 'job_id': job_id, 'state': state})
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Report metadata cache hit/miss counters for this worker"""
+    stats = metadata_cache.stats()
+    if download_cache:
+        stats['download_cache'] = download_cache.stats()
+    stats['retention'] = retention.stats()
+    if storage_retention:
+        stats['storage_retention'] = storage_retention.stats()
+    stats['storage'] = storage.stats()
+    stats['file_server'] = file_server.stats()
+    return jsonify(stats)
+
+@app.route('/api/http/stats', methods=['GET'])
+def http_stats():
+    """Report outbound connection pool reuse for this worker"""
+    return jsonify(dict(
+        connection_stats(),
+        resolver=url_resolver.stats(),
+        pinterest_clients=pinterest_clients.stats(),
+        youtube_dl=ydl_pool_stats(),
+    ))
+
 @app.route('/api/cookies/status', methods=['GET'])
 def cookies_status():
     """Check if cookies file exists"""
@@ -584,80 +1450,8 @@ def scrape_video():
         # Normalize URL
         url = normalize_url(url)
         
-        # Configure yt-dlp options
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': False,
-            'ignoreerrors': True,
-        }
-        
-        videos = []
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            try:
-                info = ydl.extract_info(url, download=False)
-                
-                if info:
-                    # Extract video information
-                    video_data = {
-                        'id': info.get('id', ''),
-                        'title': info.get('title', 'Pinterest Video'),
-                        'description': info.get('description', ''),
-                        'thumbnail': info.get('thumbnail', ''),
-                        'duration': info.get('duration', 0),
-                        'url': url,
-                        'formats': []
-                    }
-                    
-                    # Get available formats
-                    formats = info.get('formats', [])
-                    seen_resolutions = set()
-                    
-                    # Collect video formats with their heights
-                    for fmt in formats:
-                        vcodec = fmt.get('vcodec', 'none')
-                        
-                        if vcodec != 'none':  # Only video formats
-                            height = fmt.get('height', 0)
-                            width = fmt.get('width', 0)
-                            format_id = fmt.get('format_id', '')
-                            ext = fmt.get('ext', 'mp4')
-                            filesize = fmt.get('filesize', 0)
-                            
-                            if height and width and height >= 144:  # Skip very low quality
-                                resolution_key = f"{width}x{height}"
-                                if resolution_key not in seen_resolutions:
-                                    seen_resolutions.add(resolution_key)
-                                    video_data['formats'].append({
-                                        'format_id': format_id,
-                                        'ext': ext,
-                                        'width': width,
-                                        'height': height,
-                                        'filesize': filesize,
-                                        'resolution': resolution_key,
-                                        'quality': f"{height}p"
-                                    })
-                    
-                    # Sort formats by height (quality) descending
-                    video_data['formats'].sort(key=lambda x: x['height'], reverse=True)
-                    
-                    # Add a "Best Quality" option at the beginning
-                    if video_data['formats']:
-                        video_data['formats'].insert(0, {
-                            'format_id': 'best',
-                            'ext': 'mp4',
-                            'width': 0,
-                            'height': 0,
-                            'filesize': 0,
-                            'resolution': 'Best Available',
-                            'quality': 'Best Quality (with audio)'
-                        })
-                    
-                    videos.append(video_data)
-            
-            except Exception as e:
-                return jsonify({'error': f'Failed to extract video info: {str(e)}'}), 500
+        info = get_video_info('pinterest', url)
+        videos = [describe_video(info, PLATFORMS['pinterest'], url)] if info else []
         
         return jsonify({
             'success': True,
@@ -682,23 +1476,10 @@ def download_video():
         # Normalize URL
         url = normalize_url(url)
         
-        download_result = download_pinterest_video(
-            url,
-            format_id,
-            DOWNLOAD_FOLDER,
-        )
+        if wants_async(data):
+            return enqueue_download('pinterest', run_video_download, 'pinterest', url, format_id)
 
-        response_data = {
-            'success': True,
-            'download_url': f"/api/download-video-file/{download_result['filename']}",
-            'filename': download_result['filename'],
-            'audio_merged': download_result['audio_merged']
-        }
-
-        if download_result['warning']:
-            response_data['warning'] = download_result['warning']
-        
-        return jsonify(response_data)
+        return jsonify(run_tracked('pinterest', run_video_download, 'pinterest', url, format_id))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -707,35 +1488,18 @@ def download_video():
 def download_video_file(filename):
     """Serve downloaded video file"""
     try:
-        file_path = os.path.join(DOWNLOAD_FOLDER, secure_filename(filename))
-        if os.path.exists(file_path):
-            # Determine MIME type
-            mime_types = {
-                '.mp4': 'video/mp4',
-                '.webm': 'video/webm',
-                '.mkv': 'video/x-matroska',
-                '.mov': 'video/quicktime',
-                '.avi': 'video/x-msvideo'
-            }
-            
-            file_ext = os.path.splitext(filename)[1].lower()
-            mimetype = mime_types.get(file_ext, 'video/mp4')
-            
-            def cleanup_after_send():
-                try:
-                    os.remove(file_path)
-                except:
-                    pass
-            
-            # Schedule file cleanup after sending
-            import threading
-            threading.Timer(5.0, cleanup_after_send).start()
-            
-            response = send_file(file_path, as_attachment=True, download_name=filename, mimetype=mimetype)
-            response.headers.add('Access-Control-Allow-Origin', 'http://localhost:3000')
-            return response
-        else:
-            return jsonify({'error': 'File not found'}), 404
+        # Determine MIME type
+        mime_types = {
+            '.mp4': 'video/mp4',
+            '.webm': 'video/webm',
+            '.mkv': 'video/x-matroska',
+            '.mov': 'video/quicktime',
+            '.avi': 'video/x-msvideo'
+        }
+        
+        file_ext = os.path.splitext(filename)[1].lower()
+        mimetype = mime_types.get(file_ext, 'video/mp4')
+        return serve_stored(filename, mimetype)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -749,7 +1513,8 @@ def scrape_twitter():
         if not url:
             return jsonify({'error': 'URL is required'}), 400
         
-        result = scrape_twitter_metadata(url)
+        info = get_video_info('twitter', url, cache_url=normalize_url(url), raise_errors=True)
+        result = scrape_metadata('twitter', url, info=info)
         return jsonify(result)
             
     except Exception as e:
@@ -766,23 +1531,10 @@ def download_twitter():
         if not url:
             return jsonify({'error': 'URL is required'}), 400
         
-        download_result = download_twitter_video(
-            url,
-            format_id,
-            DOWNLOAD_FOLDER,
-        )
-
-        response_data = {
-            'success': True,
-            'download_url': f"/api/download-video-file/{download_result['filename']}",
-            'filename': download_result['filename'],
-            'audio_merged': download_result['audio_merged']
-        }
+        if wants_async(data):
+            return enqueue_download('twitter', run_video_download, 'twitter', url, format_id)
 
-        if download_result['warning']:
-            response_data['warning'] = download_result['warning']
-        
-        return jsonify(response_data)
+        return jsonify(run_tracked('twitter', run_video_download, 'twitter', url, format_id))
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -797,7 +1549,8 @@ def scrape_tiktok():
         if not url:
             return jsonify({'error': 'URL is required'}), 400
         
-        result = scrape_tiktok_metadata(url)
+        info = get_video_info('tiktok', url, cache_url=normalize_url(url), raise_errors=True)
+        result = scrape_metadata('tiktok', url, info=info)
         return jsonify(result)
             
     except Exception as e:
@@ -814,23 +1567,10 @@ def download_tiktok():
         if not url:
             return jsonify({'error': 'URL is required'}), 400
         
-        download_result = download_tiktok_video(
-            url,
-            format_id,
-            DOWNLOAD_FOLDER,
-        )
+        if wants_async(data):
+            return enqueue_download('tiktok', run_video_download, 'tiktok', url, format_id)
 
-        response_data = {
-            'success': True,
-            'download_url': f"/api/download-video-file/{download_result['filename']}",
-            'filename': download_result['filename'],
-            'audio_merged': download_result['audio_merged']
-        }
-
-        if download_result['warning']:
-            response_data['warning'] = download_result['warning']
-        
-        return jsonify(response_data)
+        return jsonify(run_tracked('tiktok', run_video_download, 'tiktok', url, format_id))
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
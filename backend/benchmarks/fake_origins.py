@@ -0,0 +1,246 @@
+"""Local stand-ins for the Pinterest, Twitter and TikTok origins.
+
+``FakeOrigin`` is a small threaded HTTP server that also works as a plain
+HTTP forward proxy: a process started with ``HTTP_PROXY`` pointing at it
+sends every ``http://`` request (requests and yt-dlp both honour the
+variable) here, and the handler answers by Host header. URLs therefore keep
+their real host names, so short-link resolution, batch platform detection
+and the extractor allow-list behave as in production:
+
+- ``pin.it/<id>``, ``t.co/<id>``, ``vm.tiktok.com/<id>``: redirect to an
+  HLS master playlist ``<id>.m3u8`` on the platform's CDN host (the id
+  becomes the extractor's video id, so download-cache keys stay distinct)
+- ``.../<id>.m3u8``: 360p and 720p muxed (avc1 + mp4a) variants, each
+  ``segments`` segments long; every segment waits ``latency`` seconds
+- ``.../<id>.jpg`` and ``.../<id>.mp4``: random blobs of the given sizes,
+  after ``media_latency`` seconds
+- ``www.pinterest.com/...?num=N``: a JSON page of N pins, read by
+  ``FakePinterestDL`` in place of the Pinterest API client
+
+Nothing here talks to the network.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SHORTLINK_TARGETS = {
+    'pin.it': 'http://v1.pinimg.com/videos/hls/{id}.m3u8',
+    't.co': 'http://video.twimg.com/ext_tw_video/{id}.m3u8',
+    'vm.tiktok.com': 'http://v16-webapp.tiktokcdn.com/video/{id}.m3u8',
+}
+VARIANTS = (
+    ('360p', 640, 360, 800000),
+    ('720p', 1280, 720, 2500000),
+)
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping pooled keep-alive connections are expected here
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class FakeOrigin:
+    """Serve synthetic pages, playlists and media blobs on a local port."""
+
+    def __init__(
+        self,
+        image_kb: int = 200,
+        video_kb: int = 2048,
+        segments: int = 4,
+        segment_kb: int = 128,
+        latency: float = 0.01,
+        media_latency: float = 0.0,
+        host: str = '127.0.0.1',
+        port: int = 0,
+    ) -> None:
+        self.image = os.urandom(image_kb * 1024)
+        self.video = os.urandom(video_kb * 1024)
+        self.segment = os.urandom(segment_kb * 1024)
+        self.segments = segments
+        self.latency = latency
+        self.media_latency = media_latency
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self.server = _QuietServer((host, port), self._handler())
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fake-origin', daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeOrigin':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, size: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += size
+
+    def master_playlist(self) -> bytes:
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+        for name, width, height, bandwidth in VARIANTS:
+            lines.append(
+                f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={width}x{height},'
+                'CODECS="avc1.64001f,mp4a.40.2"'
+            )
+            lines.append(f'{name}/index.m3u8')
+        return ('\n'.join(lines) + '\n').encode()
+
+    def media_playlist(self) -> bytes:
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:2', '#EXT-X-MEDIA-SEQUENCE:0']
+        for index in range(self.segments):
+            lines += ['#EXTINF:2.0,', f'seg{index}.ts']
+        lines.append('#EXT-X-ENDLIST')
+        return ('\n'.join(lines) + '\n').encode()
+
+    def pins_page(self, origin_url: str, prefix: str, num: int) -> bytes:
+        pins = []
+        for index in range(num):
+            media_id = f'{prefix}{index}'
+            pins.append({
+                'id': media_id,
+                'src': f'http://i.pinimg.com/originals/{media_id}.jpg',
+                'alt': f'Benchmark pin {media_id}',
+                'origin': origin_url,
+                'resolution': {'x': 1200, 'y': 1600},
+                'media_stream': {
+                    'video': {
+                        'url': f'http://v1.pinimg.com/videos/mc/720p/{media_id}.mp4',
+                        'resolution': [1280, 720],
+                        'duration': 10,
+                    },
+                },
+            })
+        return json.dumps({'pins': pins}).encode()
+
+    def route(self, host: str, path: str, query: str):
+        """Return ``(status, headers, body)`` for one request."""
+        media_id = path.rstrip('/').rsplit('/', 1)[-1]
+        if host in SHORTLINK_TARGETS:
+            return 301, {'Location': SHORTLINK_TARGETS[host].format(id=media_id)}, b''
+        if path.endswith('index.m3u8'):
+            return 200, {'Content-Type': 'application/vnd.apple.mpegurl'}, self.media_playlist()
+        if path.endswith('.m3u8'):
+            return 200, {'Content-Type': 'application/vnd.apple.mpegurl'}, self.master_playlist()
+        if path.endswith('.ts'):
+            time.sleep(self.latency)
+            return 200, {'Content-Type': 'video/mp2t'}, self.segment
+        if path.endswith(('.jpg', '.mp4')):
+            time.sleep(self.media_latency)
+        if path.endswith('.jpg'):
+            return 200, {'Content-Type': 'image/jpeg'}, self.image
+        if path.endswith('.mp4'):
+            return 200, {'Content-Type': 'video/mp4'}, self.video
+        if host.endswith('pinterest.com'):
+            params = parse_qs(query)
+            num = int((params.get('num') or ['1'])[0])
+            prefix = (params.get('prefix') or [media_id or 'pin'])[0]
+            return 200, {'Content-Type': 'application/json'}, self.pins_page(f'http://{host}{path}', prefix, num)
+        return 404, {'Content-Type': 'text/plain'}, b'not found'
+
+    def _handler(self):
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _respond(self, send_body: bool) -> None:
+                # Proxied requests carry an absolute URL; direct ones use Host
+                parts = urlsplit(self.path)
+                host = (parts.hostname or self.headers.get('Host', '').split(':')[0]).lower()
+                status, headers, body = origin.route(host, parts.path, parts.query)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+                origin._count(len(body) if send_body else 0)
+
+            def do_GET(self):
+                self._respond(True)
+
+            def do_HEAD(self):
+                self._respond(False)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class FakeMedia:
+    """Mimics the ``to_dict()`` interface of PinterestDL's scraped media."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def to_dict(self):
+        return dict(self.data)
+
+
+class FakePinterestDL:
+    """Drop-in for the PinterestDL API client used by the Pinterest routes.
+
+    Board, pin and search pages come from the fake origin through the
+    pooled HTTP session, so scraping costs a real round-trip.
+    """
+
+    def __init__(self, timeout: float = 5) -> None:
+        self.timeout = timeout
+
+    def _fetch(self, url, num, prefix=None):
+        from services.http_session import get_session
+
+        params = {'num': num}
+        if prefix:
+            params['prefix'] = prefix
+        response = get_session().get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return [FakeMedia(pin) for pin in response.json()['pins']]
+
+    def with_cookies(self, cookies):
+        return self
+
+    def scrape(self, url, num, min_resolution=None):
+        return self._fetch(url, num)
+
+    def search(self, query, num, min_resolution=None):
+        prefix = ''.join(ch for ch in query if ch.isalnum()) or 'search'
+        return self._fetch('http://www.pinterest.com/search/pins/', num, prefix=prefix)
+
+    def _download(self, medias, output_dir, download_streams):
+        from services.http_session import get_session
+
+        for media in medias:
+            data = media.to_dict()
+            url = data['media_stream']['video']['url'] if download_streams else data['src']
+            with get_session().get(url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                path = os.path.join(output_dir, f"{data['id']}{os.path.splitext(url)[1]}")
+                with open(path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+        return medias
+
+    def scrape_and_download(self, url, output_dir, num, download_streams=False, caption='none', min_resolution=None):
+        return self._download(self.scrape(url, num), output_dir, download_streams)
+
+    def search_and_download(self, query, output_dir, num, download_streams=False, caption='none', min_resolution=None):
+        return self._download(self.search(query, num), output_dir, download_streams)
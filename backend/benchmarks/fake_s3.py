@@ -0,0 +1,289 @@
+"""Local stand-in for an S3-compatible object store (MinIO, AWS S3).
+
+``FakeS3`` is a small threaded HTTP server that keeps objects as files
+under a directory and answers path-style requests (``/<bucket>/<key>``):
+
+- PUT stores the body, GET and HEAD return it (single byte ranges
+  included), DELETE removes it; every object gets an MD5 ETag
+- every request must carry a SigV4 presigned query that verifies against
+  the configured credentials and has not expired, else 403
+- ``response-content-type`` and ``response-content-disposition`` override
+  the stored headers on GET, as S3 does for presigned downloads
+
+It is enough for ``STORAGE_BACKEND=s3`` in the load benchmark and for
+trying several replicas on one machine:
+
+    python -m benchmarks.fake_s3 --port 9000 --root /tmp/fake-s3
+
+Nothing here talks to the network.
+"""
+import argparse
+import hashlib
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qsl, quote, unquote, urlsplit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fake_origins import _QuietServer  # noqa: E402
+from services.storage import sigv4_signature  # noqa: E402
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class FakeS3:
+    """Serve a presigned-URL-only S3 API from files under ``root``."""
+
+    def __init__(
+        self,
+        root: str,
+        access_key: str = 'benchmark',
+        secret_key: str = 'benchmark-secret',
+        region: str = 'us-east-1',
+        host: str = '127.0.0.1',
+        port: int = 0,
+    ) -> None:
+        self.root = root
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.requests = 0
+        self.rejected = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.server = _QuietServer((host, port), self._handler())
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fake-s3', daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeS3':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def env(self, bucket: str = 'downloads') -> dict:
+        """App environment that points ``STORAGE_BACKEND=s3`` at this server."""
+        return {
+            'STORAGE_BACKEND': 's3',
+            'S3_ENDPOINT': self.url,
+            'S3_BUCKET': bucket,
+            'S3_ACCESS_KEY': self.access_key,
+            'S3_SECRET_KEY': self.secret_key,
+            'S3_REGION': self.region,
+        }
+
+    def _count(self, received: int = 0, sent: int = 0, rejected: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes_in += received
+            self.bytes_out += sent
+            self.rejected += rejected
+
+    def object_path(self, raw_path: str) -> str:
+        """Map ``/<bucket>/<key>`` onto a file below ``root``; the key is flattened."""
+        bucket, _, key = unquote(raw_path).lstrip('/').partition('/')
+        if not bucket or not key or '..' in bucket:
+            return ''
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, bucket, digest)
+
+    def authorized(self, method: str, host: str, raw_path: str, raw_query: str) -> bool:
+        """Check the SigV4 presigned query the same way S3 does for ``host`` + payload unsigned."""
+        params = dict(parse_qsl(raw_query, keep_blank_values=True))
+        signature = params.pop('X-Amz-Signature', '')
+        credential = params.get('X-Amz-Credential', '')
+        amz_date = params.get('X-Amz-Date', '')
+        if not signature or credential.split('/', 1)[0] != self.access_key:
+            return False
+        try:
+            signed_at = datetime.strptime(amz_date, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+            expires = int(params.get('X-Amz-Expires', '0'))
+        except ValueError:
+            return False
+        if time.time() > signed_at.timestamp() + expires:
+            return False
+        canonical_query = '&'.join(
+            f"{quote(key, safe='-_.~')}={quote(value, safe='-_.~')}" for key, value in sorted(params.items())
+        )
+        expected = sigv4_signature(method, host, raw_path, canonical_query, self.secret_key, self.region, amz_date)
+        return hmac.compare_digest(expected, signature)
+
+    def _handler(self):
+        store = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _reply(self, status: int, headers=None, body: bytes = b'', send_body: bool = True) -> None:
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                if 'Content-Length' not in (headers or {}):
+                    self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if send_body and body:
+                    self.wfile.write(body)
+
+            def _target(self):
+                parts = urlsplit(self.path)
+                host = self.headers.get('Host', '')
+                if not store.authorized(self.command, host, parts.path, parts.query):
+                    length = int(self.headers.get('Content-Length') or 0)
+                    if length:
+                        self.rfile.read(length)
+                    store._count(rejected=True)
+                    self._reply(403, {'Content-Type': 'application/xml'}, b'<Error><Code>AccessDenied</Code></Error>')
+                    return None, None
+                path = store.object_path(parts.path)
+                if not path:
+                    store._count()
+                    self._reply(400, {'Content-Type': 'application/xml'}, b'<Error><Code>InvalidURI</Code></Error>')
+                    return None, None
+                return path, dict(parse_qsl(parts.query))
+
+            def do_PUT(self):
+                path, _ = self._target()
+                if path is None:
+                    return
+                length = int(self.headers.get('Content-Length') or 0)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                partial = f'{path}.{uuid.uuid4().hex[:8]}.part'
+                md5 = hashlib.md5()
+                with open(partial, 'wb') as f:
+                    remaining = length
+                    while remaining:
+                        chunk = self.rfile.read(min(COPY_CHUNK_SIZE, remaining))
+                        if not chunk:
+                            break
+                        md5.update(chunk)
+                        f.write(chunk)
+                        remaining -= len(chunk)
+                if remaining:
+                    os.remove(partial)
+                    store._count(length - remaining)
+                    self._reply(400, {'Content-Type': 'application/xml'}, b'<Error><Code>IncompleteBody</Code></Error>')
+                    return
+                os.replace(partial, path)
+                with open(path + '.etag', 'w') as f:
+                    f.write(md5.hexdigest())
+                store._count(length)
+                self._reply(200, {'ETag': f'"{md5.hexdigest()}"'})
+
+            def _send_object(self, send_body: bool) -> None:
+                path, params = self._target()
+                if path is None:
+                    return
+                if not os.path.isfile(path):
+                    store._count()
+                    self._reply(404, {'Content-Type': 'application/xml'}, b'<Error><Code>NoSuchKey</Code></Error>', send_body)
+                    return
+                size = os.path.getsize(path)
+                try:
+                    with open(path + '.etag') as f:
+                        etag = f'"{f.read()}"'
+                except OSError:
+                    etag = '"0"'
+                headers = {
+                    'Content-Type': params.get('response-content-type', 'application/octet-stream'),
+                    'Accept-Ranges': 'bytes',
+                    'ETag': etag,
+                }
+                if 'response-content-disposition' in params:
+                    headers['Content-Disposition'] = params['response-content-disposition']
+                if self.headers.get('If-None-Match') == etag:
+                    store._count()
+                    self._reply(304, {'ETag': etag}, send_body=False)
+                    return
+
+                status, start, end = 200, 0, size - 1
+                match = RANGE_PATTERN.match(self.headers.get('Range', ''))
+                if match and (match.group(1) or match.group(2)):
+                    if match.group(1):
+                        start = int(match.group(1))
+                        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+                    else:
+                        start = max(0, size - int(match.group(2)))
+                    if start > end:
+                        store._count()
+                        self._reply(416, {'Content-Range': f'bytes */{size}'}, send_body=send_body)
+                        return
+                    status = 206
+                    headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+                length = end - start + 1 if size else 0
+                headers['Content-Length'] = str(length)
+                self._reply(status, headers, send_body=False)
+                sent = 0
+                if send_body and length:
+                    with open(path, 'rb') as f:
+                        f.seek(start)
+                        while sent < length:
+                            chunk = f.read(min(COPY_CHUNK_SIZE, length - sent))
+                            if not chunk:
+                                break
+                            self.wfile.write(chunk)
+                            sent += len(chunk)
+                store._count(sent=sent)
+
+            def do_GET(self):
+                self._send_object(True)
+
+            def do_HEAD(self):
+                self._send_object(False)
+
+            def do_DELETE(self):
+                path, _ = self._target()
+                if path is None:
+                    return
+                for name in (path, path + '.etag'):
+                    try:
+                        os.remove(name)
+                    except OSError:
+                        pass
+                store._count()
+                self._reply(204)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--root', required=True, help='directory the objects are kept in')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--access-key', default='benchmark')
+    parser.add_argument('--secret-key', default='benchmark-secret')
+    parser.add_argument('--region', default='us-east-1')
+    args = parser.parse_args()
+
+    store = FakeS3(args.root, args.access_key, args.secret_key, args.region, port=args.port)
+    for key, value in store.env().items():
+        print(f'{key}={value}')
+    try:
+        store.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
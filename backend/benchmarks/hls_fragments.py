@@ -0,0 +1,117 @@
+"""Throughput of yt-dlp HLS downloads with and without a download profile.
+
+Serves a synthetic HLS playlist from a local server that adds a fixed
+latency to every segment (standing in for CDN round-trips), then downloads
+it once with yt-dlp's defaults and once per requested profile.
+
+    python -m benchmarks.hls_fragments --segments 60 --segment-kb 256 --latency 0.05
+
+Run from the backend/ directory.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yt_dlp  # noqa: E402
+
+from services.download_profiles import load_download_profiles, profile_options  # noqa: E402
+
+
+def make_handler(segments, segment_bytes, latency):
+    payload = os.urandom(segment_bytes)
+    playlist = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:2', '#EXT-X-MEDIA-SEQUENCE:0']
+    for index in range(segments):
+        playlist += ['#EXTINF:2.0,', f'seg{index}.ts']
+    playlist.append('#EXT-X-ENDLIST')
+    playlist_body = ('\n'.join(playlist) + '\n').encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            if self.path.endswith('.m3u8'):
+                body, content_type = playlist_body, 'application/vnd.apple.mpegurl'
+            elif self.path.endswith('.ts'):
+                time.sleep(latency)
+                body, content_type = payload, 'video/mp2t'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def run_once(url, options, workdir):
+    outdir = tempfile.mkdtemp(dir=workdir)
+    opts = {
+        **options,
+        'outtmpl': os.path.join(outdir, 'out.%(ext)s'),
+        'quiet': True,
+        'no_warnings': True,
+        'noprogress': True,
+        'hls_prefer_native': True,
+    }
+    started = time.perf_counter()
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        ydl.download([url])
+    elapsed = time.perf_counter() - started
+    size = sum(os.path.getsize(os.path.join(outdir, name)) for name in os.listdir(outdir))
+    shutil.rmtree(outdir, ignore_errors=True)
+    return elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, default=60)
+    parser.add_argument('--segment-kb', type=int, default=256)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added per segment')
+    parser.add_argument('--platforms', default='twitter,pinterest')
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        ('127.0.0.1', 0),
+        make_handler(args.segments, args.segment_kb * 1024, args.latency),
+    )
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/video.m3u8'
+
+    profiles = load_download_profiles()
+    runs = [('baseline', {})]
+    for platform in args.platforms.split(','):
+        runs.append((platform, profile_options(profiles.get(platform))))
+
+    workdir = tempfile.mkdtemp()
+    try:
+        print(f'{args.segments} segments x {args.segment_kb} KB, {args.latency * 1000:.0f} ms per segment')
+        print(f'{"profile":<12} {"fragments":>9} {"seconds":>8} {"MB/s":>8}')
+        for name, options in runs:
+            best = None
+            for _ in range(args.repeat):
+                elapsed, size = run_once(url, options, workdir)
+                best = elapsed if best is None else min(best, elapsed)
+            fragments = options.get('concurrent_fragment_downloads', 1)
+            print(f'{name:<12} {fragments:>9} {best:>8.2f} {size / best / 1024 ** 2:>8.1f}')
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,494 @@
+"""Load test of the /api/* routes against local fake origins.
+
+Starts ``FakeOrigin`` (see fake_origins.py) and the Flask app in a child
+process whose outbound HTTP is routed to it, then drives each scenario at
+the given concurrency. Per scenario it reports p50/p95/p99 latency,
+throughput, the app process's peak RSS and its disk reads/writes (from
+/proc, so Linux only; other columns work everywhere).
+
+    python -m benchmarks.load --concurrency 8 --requests 40
+    python -m benchmarks.load --scenarios download-zip,download-stream --pins 50
+    python -m benchmarks.load --save baseline.json
+    python -m benchmarks.load --compare baseline.json --tolerance 0.25
+
+Every request uses fresh URLs so caches miss; ``--repeat-urls N`` cycles
+through N URLs per scenario instead to measure the cached path. Extra
+``--env KEY=VALUE`` pairs go to the app process (e.g. PROXY_TEE_CACHE=1).
+``--compare`` exits with status 1 when a scenario's p95 or throughput is
+worse than the baseline by more than the tolerance. ``--storage shared``
+publishes produced files to a second folder and ``--storage s3`` uploads
+them to ``FakeS3`` (see fake_s3.py) as a multi-replica deployment would.
+
+Not covered: /api/login (drives a real browser login) and the admin
+profile routes (only present with PROFILING_TOKEN). The app runs on
+werkzeug's threaded server, not gunicorn, so the numbers are per process.
+
+Run from the backend/ directory.
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import requests  # noqa: E402
+
+from benchmarks.fake_origins import FakeOrigin, FakePinterestDL  # noqa: E402
+from benchmarks.fake_s3 import FakeS3  # noqa: E402
+from services.ydl_pool import DEFAULT_ALLOWED_EXTRACTORS  # noqa: E402
+
+STATUS_PATHS = ('/api/jobs', '/api/cache/stats', '/api/http/stats', '/api/cookies/status', '/api/metrics')
+METRICS_TOKEN = 'benchmark'
+JOB_TIMEOUT = 120
+
+
+class Client:
+    """One requests session per load thread, plus the helpers scenarios share."""
+
+    def __init__(self, base, pins):
+        self.base = base
+        self.pins = pins
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+            self._local.session.trust_env = False
+        return self._local.session
+
+    def call(self, method, path, **kwargs):
+        """Send one request, read the whole body and return its size."""
+        with self.session.request(method, self.base + path, stream=True, timeout=JOB_TIMEOUT, **kwargs) as response:
+            if response.status_code >= 400:
+                raise RuntimeError(f'{method} {path} -> {response.status_code}')
+            return sum(len(chunk) for chunk in response.iter_content(chunk_size=256 * 1024))
+
+    def post_json(self, path, body):
+        response = self.session.post(self.base + path, json=body, timeout=JOB_TIMEOUT)
+        size = len(response.content)
+        if response.status_code >= 400:
+            raise RuntimeError(f'POST {path} -> {response.status_code}: {response.text[:200]}')
+        return response.json(), size
+
+    def await_job(self, payload):
+        """Poll a queued job (a 202 answer) until it finishes; return its final record."""
+        deadline = time.monotonic() + JOB_TIMEOUT
+        while time.monotonic() < deadline:
+            job = self.session.get(self.base + payload['status_url'], timeout=JOB_TIMEOUT).json()
+            if job['state'] == 'succeeded':
+                return job
+            if job['state'] in ('failed', 'cancelled'):
+                raise RuntimeError(f"job {job['job_id']} {job['state']}: {job.get('error')}")
+            time.sleep(0.05)
+        raise RuntimeError('job timed out')
+
+    def post_and_fetch(self, path, body):
+        """POST, wait for the job if the route queued one, then GET ``download_url``."""
+        payload, size = self.post_json(path, body)
+        if 'status_url' in payload:
+            payload = self.await_job(payload)
+        return size + self.call('GET', payload['download_url'])
+
+
+def scenario_health(client, n):
+    return client.call('GET', '/api/health')
+
+
+def scenario_status(client, n):
+    path = STATUS_PATHS[n % len(STATUS_PATHS)]
+    headers = {'Authorization': f'Bearer {METRICS_TOKEN}'} if path == '/api/metrics' else {}
+    return client.call('GET', path, headers=headers)
+
+
+def scenario_scrape(client, n):
+    return client.post_json('/api/scrape', {'url': f'http://www.pinterest.com/bench/board{n}/', 'num': client.pins})[1]
+
+
+def scenario_search(client, n):
+    return client.post_json('/api/search', {'query': f'bench {n}', 'num': client.pins})[1]
+
+
+def scenario_download_zip(client, n):
+    return client.post_and_fetch('/api/download', {'url': f'http://www.pinterest.com/bench/zip{n}/', 'num': client.pins})
+
+
+def scenario_download_stream(client, n):
+    body = {'url': f'http://www.pinterest.com/bench/stream{n}/', 'num': client.pins, 'stream': True}
+    return client.call('POST', '/api/download', json=body)
+
+
+def scenario_download_single(client, n):
+    return client.post_and_fetch('/api/download-single', {'url': f'http://www.pinterest.com/pin/{n}/'})
+
+
+def scenario_download_single_stream(client, n):
+    body = {'url': f'http://www.pinterest.com/pin/s{n}/', 'stream': True}
+    return client.call('POST', '/api/download-single', json=body)
+
+
+def scenario_download_direct(client, n):
+    body = {'media_url': f'http://i.pinimg.com/originals/direct{n}.jpg'}
+    return client.call('POST', '/api/download-direct', json=body)
+
+
+def scenario_scrape_video(client, n):
+    return client.post_json('/api/scrape-video', {'url': f'http://pin.it/scrape{n}'})[1]
+
+
+def scenario_download_video(client, n):
+    return client.post_and_fetch('/api/download-video', {'url': f'http://pin.it/video{n}'})
+
+
+def scenario_scrape_twitter(client, n):
+    return client.post_json('/api/scrape-twitter', {'url': f'http://t.co/scrape{n}'})[1]
+
+
+def scenario_download_twitter(client, n):
+    return client.post_and_fetch('/api/download-twitter', {'url': f'http://t.co/video{n}'})
+
+
+def scenario_scrape_tiktok(client, n):
+    return client.post_json('/api/scrape-tiktok', {'url': f'http://vm.tiktok.com/scrape{n}'})[1]
+
+
+def scenario_download_tiktok(client, n):
+    return client.post_and_fetch('/api/download-tiktok', {'url': f'http://vm.tiktok.com/video{n}'})
+
+
+def batch_urls(n):
+    return [f'http://pin.it/batch{n}', f'http://t.co/batch{n}', f'http://vm.tiktok.com/batch{n}']
+
+
+def scenario_batch(client, n):
+    payload, size = client.post_json('/api/batch', {'urls': batch_urls(n)})
+    if payload['failed']:
+        raise RuntimeError(f"batch: {payload['failed']} of {payload['count']} items failed")
+    for item in payload['items']:
+        size += client.call('GET', item['download_url'])
+    return size
+
+
+def scenario_batch_zip(client, n):
+    return client.call('POST', '/api/batch', json={'urls': batch_urls(f'zip{n}'), 'output': 'zip'})
+
+
+def scenario_sync_download(client, n):
+    return client.post_and_fetch('/api/download-twitter', {'url': f'http://t.co/sync{n}', 'async': False})
+
+
+SCENARIOS = {
+    'health': scenario_health,
+    'status': scenario_status,
+    'scrape': scenario_scrape,
+    'search': scenario_search,
+    'download-zip': scenario_download_zip,
+    'download-stream': scenario_download_stream,
+    'download-single': scenario_download_single,
+    'download-single-stream': scenario_download_single_stream,
+    'download-direct': scenario_download_direct,
+    'scrape-video': scenario_scrape_video,
+    'download-video': scenario_download_video,
+    'scrape-twitter': scenario_scrape_twitter,
+    'download-twitter': scenario_download_twitter,
+    'scrape-tiktok': scenario_scrape_tiktok,
+    'download-tiktok': scenario_download_tiktok,
+    'batch': scenario_batch,
+    'batch-zip': scenario_batch_zip,
+    'sync-download': scenario_sync_download,
+}
+
+
+# App process
+
+def serve(port):
+    """Child process entry point: run the app with PinterestDL replaced by the fake."""
+    from werkzeug.serving import make_server
+
+    import app as backend
+
+    backend.pinterest_clients.factory = lambda cookies=None: FakePinterestDL()
+    backend.pinterest_clients.invalidate()
+    make_server('127.0.0.1', port, backend.app, threaded=True).serve_forever()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_app(origin, workdir, extra_env):
+    port = free_port()
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': BACKEND_DIR + os.pathsep + env.get('PYTHONPATH', ''),
+        'HTTP_PROXY': origin.url,
+        'http_proxy': origin.url,
+        'NO_PROXY': '127.0.0.1,localhost',
+        'no_proxy': '127.0.0.1,localhost',
+        'YTDLP_ALLOWED_EXTRACTORS': ','.join(DEFAULT_ALLOWED_EXTRACTORS + ('generic',)),
+        'METRICS_TOKEN': METRICS_TOKEN,
+    })
+    env.update(extra_env)
+    log = open(os.path.join(workdir, 'app.log'), 'wb')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.load', '--serve', str(port)],
+        cwd=workdir,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    base = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'app exited during startup, see {log.name}')
+        try:
+            requests.get(base + '/api/health', timeout=1)
+            return process, base
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'app did not start, see {log.name}')
+
+
+class ProcessProbe:
+    """Peak RSS (sampled) and disk I/O counters of one process, from /proc."""
+
+    def __init__(self, pid, interval=0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def rss(self):
+        try:
+            with open(f'/proc/{self.pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
+
+    def io(self):
+        counters = {}
+        try:
+            with open(f'/proc/{self.pid}/io') as f:
+                for line in f:
+                    key, value = line.split(':')
+                    counters[key] = int(value)
+        except OSError:
+            pass
+        return counters
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, self.rss())
+
+    def __enter__(self):
+        self.peak_rss = self.rss()
+        self._io = self.io()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        io = self.io()
+        self.disk_read = io.get('read_bytes', 0) - self._io.get('read_bytes', 0) if io else None
+        self.disk_write = io.get('write_bytes', 0) - self._io.get('write_bytes', 0) if io else None
+
+
+# Driver
+
+def percentile(values, pct):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
+
+
+def run_scenario(name, client, probe, origin, args):
+    func = SCENARIOS[name]
+    counter = itertools.count()
+    cycle = args.repeat_urls
+
+    def one(_):
+        n = next(counter)
+        started = time.perf_counter()
+        try:
+            size = func(client, n % cycle if cycle else n)
+            return time.perf_counter() - started, size, None
+        except Exception as e:
+            return time.perf_counter() - started, 0, str(e)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, range(args.warmup)))
+        origin_before = origin.bytes_sent
+        started = time.perf_counter()
+        with probe:
+            results = list(pool.map(one, range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _, error in results if error is None)
+    errors = [error for _, _, error in results if error is not None]
+    received = sum(size for _, size, _ in results)
+    row = {
+        'requests': len(results),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'mb_per_s': received / elapsed / 1e6 if elapsed else 0.0,
+        'upstream_mb': (origin.bytes_sent - origin_before) / 1e6,
+        'peak_rss_mb': probe.peak_rss / 1e6,
+        'disk_read_mb': probe.disk_read / 1e6 if probe.disk_read is not None else None,
+        'disk_write_mb': probe.disk_write / 1e6 if probe.disk_write is not None else None,
+    }
+    for pct in (50, 95, 99):
+        row[f'p{pct}_ms'] = percentile(latencies, pct) * 1000 if latencies else None
+    return row
+
+
+COLUMNS = (
+    ('requests', 'reqs', '{:.0f}'),
+    ('errors', 'err', '{:.0f}'),
+    ('p50_ms', 'p50 ms', '{:.1f}'),
+    ('p95_ms', 'p95 ms', '{:.1f}'),
+    ('p99_ms', 'p99 ms', '{:.1f}'),
+    ('throughput', 'req/s', '{:.1f}'),
+    ('mb_per_s', 'MB/s', '{:.1f}'),
+    ('upstream_mb', 'up MB', '{:.1f}'),
+    ('peak_rss_mb', 'RSS MB', '{:.0f}'),
+    ('disk_read_mb', 'rd MB', '{:.1f}'),
+    ('disk_write_mb', 'wr MB', '{:.1f}'),
+)
+
+
+def print_row(name, row):
+    cells = []
+    for key, _, fmt in COLUMNS:
+        value = row.get(key)
+        cells.append(f'{fmt.format(value) if value is not None else "-":>9}')
+    print(f'{name:<24}' + ''.join(cells), flush=True)
+
+
+def compare(results, baseline, tolerance):
+    """Return human-readable regressions of ``results`` against ``baseline``."""
+    regressions = []
+    for name, row in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if row['p95_ms'] and base.get('p95_ms') and row['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']:.1f} -> {row['p95_ms']:.1f} ms")
+        if base.get('throughput') and row['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['throughput']:.1f} -> {row['throughput']:.1f} req/s")
+        if row['errors'] > base.get('errors', 0):
+            regressions.append(f"{name}: errors {base.get('errors', 0)} -> {row['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated, default all')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=20, help='measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=2, help='unmeasured requests per scenario')
+    parser.add_argument('--repeat-urls', type=int, default=0)
+    parser.add_argument('--pins', type=int, default=10, help='pins per board/search page')
+    parser.add_argument('--image-kb', type=int, default=200)
+    parser.add_argument('--video-kb', type=int, default=2048)
+    parser.add_argument('--segments', type=int, default=4)
+    parser.add_argument('--segment-kb', type=int, default=128)
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds added to every HLS segment')
+    parser.add_argument('--media-latency', type=float, default=0.0, help='seconds added to every image/MP4')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE')
+    parser.add_argument('--storage', choices=('local', 'shared', 's3'), default='local')
+    parser.add_argument('--save', metavar='PATH')
+    parser.add_argument('--compare', metavar='PATH')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--keep', action='store_true', help='keep the work directory and app.log')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(unknown)}')
+    extra_env = dict(pair.split('=', 1) for pair in args.env)
+
+    origin = FakeOrigin(
+        image_kb=args.image_kb,
+        video_kb=args.video_kb,
+        segments=args.segments,
+        segment_kb=args.segment_kb,
+        latency=args.latency,
+        media_latency=args.media_latency,
+    ).start()
+    workdir = tempfile.mkdtemp(prefix='bench-load-')
+    object_store = None
+    if args.storage == 's3':
+        object_store = FakeS3(os.path.join(workdir, 's3')).start()
+        extra_env = {**object_store.env(), **extra_env}
+    elif args.storage == 'shared':
+        extra_env = {'STORAGE_BACKEND': 'shared', 'STORAGE_PATH': os.path.join(workdir, 'shared'), **extra_env}
+    process, base = start_app(origin, workdir, extra_env)
+    client = Client(base, args.pins)
+    probe = ProcessProbe(process.pid)
+
+    results = {}
+    try:
+        print(f'concurrency {args.concurrency}, {args.requests} requests per scenario, app pid {process.pid}')
+        print(f'{"scenario":<24}' + ''.join(f'{title:>9}' for _, title, _ in COLUMNS))
+        for name in names:
+            results[name] = run_scenario(name, client, probe, origin, args)
+            print_row(name, results[name])
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        origin.stop()
+        if object_store:
+            object_store.stop()
+        if args.keep:
+            print(f'work directory: {workdir}')
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, row in results.items():
+        if row['first_error']:
+            print(f'{name}: first error: {row["first_error"]}')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
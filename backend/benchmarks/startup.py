@@ -0,0 +1,100 @@
+"""Worker startup cost: cold import of app.py and first-request latency.
+
+Each measurement runs in a fresh interpreter, the same as a new gunicorn
+worker (or one recycled by --max-requests). Three scenarios are compared:
+
+- lazy: plain ``import app``; heavy modules load on the first route using them
+- preloaded: heavy modules imported first, as the gunicorn master does with
+  preload_app, so only the app's own setup is left for the worker
+- all-extractors: lazy, but yt-dlp instantiates every extractor
+
+    python -m benchmarks.startup --repeat 5
+
+Run from the backend/ directory.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, sys, time
+preload = sys.argv[1] == '1'
+timings = {}
+if preload:
+    from services.warmup import preload_modules
+    started = time.perf_counter()
+    preload_modules()
+    timings['preload'] = time.perf_counter() - started
+
+started = time.perf_counter()
+import app
+timings['import_app'] = time.perf_counter() - started
+
+client = app.app.test_client()
+started = time.perf_counter()
+client.get('/api/health')
+timings['first_health'] = time.perf_counter() - started
+
+# First extraction-bound request: a pooled YoutubeDL has to be built
+from services.ydl_pool import get_ydl_pool
+started = time.perf_counter()
+with get_ydl_pool().checkout('metadata'):
+    pass
+timings['first_ydl'] = time.perf_counter() - started
+
+# First Pinterest-bound request: a PinterestDL API client has to be built
+started = time.perf_counter()
+app.build_downloader()
+timings['first_pinterest'] = time.perf_counter() - started
+
+print(json.dumps(timings))
+'''
+
+SCENARIOS = (
+    ('lazy', '0', {}),
+    ('preloaded', '1', {}),
+    ('all-extractors', '0', {'YTDLP_ALLOWED_EXTRACTORS': 'all'}),
+)
+COLUMNS = ('preload', 'import_app', 'first_health', 'first_ydl', 'first_pinterest')
+
+
+def run_probe(preload, extra_env, workdir):
+    env = dict(os.environ, **extra_env)
+    env['PYTHONPATH'] = BACKEND_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, preload],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # Separate downloads/ so the probe does not touch the real one
+    workdir = tempfile.mkdtemp()
+    print(f'median of {args.repeat} fresh interpreters, milliseconds')
+    print(f'{"scenario":<16}' + ''.join(f'{name:>16}' for name in COLUMNS))
+    for name, preload, extra_env in SCENARIOS:
+        runs = [run_probe(preload, extra_env, workdir) for _ in range(args.repeat)]
+        row = []
+        for column in COLUMNS:
+            values = [run[column] for run in runs if column in run]
+            row.append(f'{statistics.median(values) * 1000:>16.1f}' if values else f'{"-":>16}')
+        print(f'{name:<16}' + ''.join(row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+# Threaded (gthread) workers, so long-lived /api/progress streams and slow
+# downloads do not each pin a whole worker process.
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+# Load the app once in the master and fork workers from it. Background
+# threads, HTTP sessions and client pools are created lazily per worker, so
+# nothing stateful is shared across the fork.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+
+def on_starting(server):
+    # Route-level imports (yt-dlp, pinterest_dl, requests) are lazy; with
+    # preload they are pulled into the master so workers start warm.
+    if not preload_app:
+        return
+    from services.warmup import preload_modules
+
+    timings = preload_modules()
+    server.log.info('Preloaded %s in %.2fs', ', '.join(timings), sum(timings.values()))
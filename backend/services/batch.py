@@ -0,0 +1,186 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+from urllib.parse import urlsplit
+
+DEFAULT_HOST_CONCURRENCY = 2
+DEFAULT_HOST_INTERVAL = 0.25
+
+_PLATFORM_HOSTS = (
+    ('pinterest', ('pinterest.', 'pin.it', 'pinimg.com')),
+    ('twitter', ('twitter.com', 'x.com', 't.co')),
+    ('tiktok', ('tiktok.com',)),
+)
+
+
+def detect_platform(url: str) -> Optional[str]:
+    """Map a URL to 'pinterest', 'twitter' or 'tiktok' by host, or None."""
+    if not url.startswith(('http://', 'https://')):
+        url = f'https://{url}'
+    host = (urlsplit(url).hostname or '').lower()
+    for platform, markers in _PLATFORM_HOSTS:
+        for marker in markers:
+            if marker.endswith('.'):
+                if host.startswith(marker) or f'.{marker}' in host:
+                    return platform
+            elif host == marker or host.endswith('.' + marker):
+                return platform
+    return None
+
+
+class HostRateLimiter:
+    """Per-host concurrency cap plus a minimum spacing between request starts."""
+
+    def __init__(
+        self,
+        concurrency: Optional[Dict[str, int]] = None,
+        min_interval: Optional[Dict[str, float]] = None,
+        default_concurrency: int = DEFAULT_HOST_CONCURRENCY,
+        default_interval: float = DEFAULT_HOST_INTERVAL,
+    ) -> None:
+        self.concurrency = concurrency or {}
+        self.min_interval = min_interval or {}
+        self.default_concurrency = default_concurrency
+        self.default_interval = default_interval
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                limit = self.concurrency.get(host, self.default_concurrency)
+                self._semaphores[host] = threading.BoundedSemaphore(max(1, limit))
+            return self._semaphores[host]
+
+    def _wait_turn(self, host: str) -> None:
+        interval = self.min_interval.get(host, self.default_interval)
+        if interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + interval
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def run(self, host: str, func: Callable[..., Any], *args: Any) -> Any:
+        semaphore = self._semaphore(host)
+        with semaphore:
+            self._wait_turn(host)
+            return func(*args)
+
+
+def abandon(
+    executor: ThreadPoolExecutor,
+    futures: Iterable[Future],
+    discard: Optional[Callable[[Any], Any]] = None,
+) -> None:
+    """Shut ``executor`` down without waiting for the work still running.
+
+    Queued work is cancelled. Results of ``futures`` that are finished but
+    unconsumed, or still running, go to ``discard`` as they complete, so a
+    consumer that went away (a dropped streamed response) is not held up.
+    """
+    executor.shutdown(wait=False, cancel_futures=True)
+    if discard is None:
+        return
+
+    def on_done(future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        try:
+            discard(future.result())
+        except Exception:
+            pass
+
+    for future in futures:
+        future.add_done_callback(on_done)
+
+
+def _process(
+    index: int,
+    url: str,
+    handlers: Dict[str, Callable[[str], Dict[str, Any]]],
+    limiter: HostRateLimiter,
+) -> Dict[str, Any]:
+    item: Dict[str, Any] = {'index': index, 'url': url}
+    platform = detect_platform(url)
+    item['platform'] = platform
+    if platform not in handlers:
+        item.update(success=False, error='Unsupported URL')
+        return item
+
+    try:
+        result = limiter.run(platform, handlers[platform], url)
+    except Exception as exc:
+        item.update(success=False, error=str(exc))
+    else:
+        item.update(result)
+        item.setdefault('success', True)
+    return item
+
+
+def iter_batch(
+    urls: List[str],
+    handlers: Dict[str, Callable[[str], Dict[str, Any]]],
+    max_workers: int = 4,
+    limiter: Optional[HostRateLimiter] = None,
+    discard: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Run ``handlers[platform](url)`` for every URL and yield items as they finish.
+
+    Items come in completion order and carry their input ``index``. No more
+    than ``2 * max_workers`` URLs are in flight or finished but not yet
+    consumed, so a slow consumer holds back new downloads. Failures are
+    reported on their own item (``success: False`` plus ``error``). If the
+    consumer stops early it is not held until running downloads finish;
+    items that were never yielded are passed to ``discard`` (e.g. to remove
+    their files) as they complete.
+    """
+    limiter = limiter or HostRateLimiter()
+    if not urls:
+        return
+
+    workers = max(1, min(max_workers, len(urls)))
+    window = workers * 2
+    iterator = iter(enumerate(urls))
+    pending: Set[Future] = set()
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch')
+
+    def fill() -> None:
+        while len(pending) < window:
+            try:
+                index, url = next(iterator)
+            except StopIteration:
+                return
+            pending.add(executor.submit(_process, index, url, handlers, limiter))
+
+    try:
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                fill()
+                yield future.result()
+    finally:
+        abandon(executor, pending, discard)
+
+
+def run_batch(
+    urls: List[str],
+    handlers: Dict[str, Callable[[str], Dict[str, Any]]],
+    max_workers: int = 4,
+    limiter: Optional[HostRateLimiter] = None,
+) -> List[Dict[str, Any]]:
+    """Run ``handlers[platform](url)`` for every URL with bounded concurrency.
+
+    Returns one result per input URL, in input order. Failures are reported
+    on their own item (``success: False`` plus ``error``) instead of aborting
+    the batch.
+    """
+    items = list(iter_batch(urls, handlers, max_workers=max_workers, limiter=limiter))
+    return sorted(items, key=lambda item: item['index'])
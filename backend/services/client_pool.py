@@ -0,0 +1,144 @@
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+CookieSignature = Optional[Tuple[int, int]]
+
+
+class ClientPool:
+    """Bounded pool of warm API clients sharing one parsed cookies file.
+
+    Clients are built by ``factory(cookies)`` and handed out with
+    ``checkout()``. The cookies file is stat'ed on checkout; when its mtime or
+    size changes (or ``invalidate()`` is called) the pool starts a new
+    generation and clients from the old one are dropped as they come back.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[Optional[List[dict]]], Any],
+        cookies_file: str,
+        size: int = 4,
+        checkout_timeout: float = 30,
+    ) -> None:
+        self.factory = factory
+        self.cookies_file = cookies_file
+        self.size = max(1, size)
+        self.checkout_timeout = checkout_timeout
+        self.created = 0
+        self.reused = 0
+        self._idle: 'queue.LifoQueue[Tuple[int, Any]]' = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._signature: CookieSignature = None
+        self._cookies: Optional[List[dict]] = None
+        self._live = 0
+        self._loaded = False
+
+    def _cookies_signature(self) -> CookieSignature:
+        try:
+            stat = os.stat(self.cookies_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_cookies(self) -> Optional[List[dict]]:
+        try:
+            with open(self.cookies_file, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return None
+
+    def _refresh(self) -> None:
+        """Start a new generation when the cookies file changed. Caller holds the lock."""
+        signature = self._cookies_signature()
+        if self._loaded and signature == self._signature:
+            return
+        self._signature = signature
+        self._cookies = self._load_cookies() if signature else None
+        self._loaded = True
+        self._generation += 1
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._live -= 1
+
+    def invalidate(self) -> None:
+        """Force the next checkout to re-read cookies and build fresh clients."""
+        with self._lock:
+            self._loaded = False
+            self._refresh()
+
+    def _acquire(self) -> Tuple[int, Any]:
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            with self._lock:
+                self._refresh()
+                generation = self._generation
+                try:
+                    entry = self._idle.get_nowait()
+                except queue.Empty:
+                    entry = None
+                if entry is not None:
+                    self.reused += 1
+                    return entry
+                build = self._live < self.size
+                if build:
+                    self._live += 1
+                    self.created += 1
+                    cookies = self._cookies
+
+            if build:
+                try:
+                    return generation, self.factory(cookies)
+                except Exception:
+                    with self._lock:
+                        self._live -= 1
+                    raise
+
+            # Pool exhausted: wait for a client to come back, re-checking the
+            # generation so a cookies change does not leave us waiting forever
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RuntimeError('All API clients are busy, please retry shortly')
+            try:
+                entry = self._idle.get(timeout=min(remaining, 1.0))
+            except queue.Empty:
+                continue
+            with self._lock:
+                if entry[0] == self._generation:
+                    self.reused += 1
+                    return entry
+                self._live -= 1
+
+    def _release(self, generation: int, client: Any) -> None:
+        with self._lock:
+            if generation == self._generation:
+                self._idle.put((generation, client))
+            else:
+                self._live -= 1
+
+    @contextmanager
+    def checkout(self) -> Iterator[Any]:
+        generation, client = self._acquire()
+        try:
+            yield client
+        finally:
+            self._release(generation, client)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': self.size,
+                'live': self._live,
+                'idle': self._idle.qsize(),
+                'created': self.created,
+                'reused': self.reused,
+                'generation': self._generation,
+            }
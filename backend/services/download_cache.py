@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Optional
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_TTL = 86400
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _link_or_copy(source: str, destination: str) -> None:
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+class DownloadCache:
+    """Content-addressed store for finished downloads.
+
+    Entries are keyed by (extractor, video id, format variant) and point at an
+    object named by the file's SHA-256, so identical outputs are stored once.
+    The SQLite index is shared by every worker on the host; eviction is LRU
+    once ``max_bytes`` is exceeded, and entries expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES, ttl: int = DEFAULT_TTL) -> None:
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.index_path = os.path.join(root, 'index.sqlite3')
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, digest TEXT NOT NULL, ext TEXT NOT NULL, '
+                'size INTEGER NOT NULL, meta TEXT, '
+                'created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)')
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.index_path, timeout=10)
+
+    @staticmethod
+    def make_key(extractor: Optional[str], video_id: Optional[str], variant: str) -> Optional[str]:
+        if not extractor or not video_id:
+            return None
+        return f'{extractor.lower()}:{video_id}:{variant}'
+
+    def _object_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest + ext)
+
+    def lookup(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return ``{'path', 'digest', 'size', 'meta'}`` for a live entry, or None."""
+        if not key:
+            return None
+
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT digest, ext, size, meta, created_at FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None:
+                digest, ext, size, meta, created_at = row
+                path = self._object_path(digest, ext)
+                if created_at + self.ttl > now and os.path.exists(path):
+                    conn.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+                    with self._lock:
+                        self.hits += 1
+                    return {
+                        'path': path,
+                        'digest': digest,
+                        'size': size,
+                        'meta': json.loads(meta) if meta else {},
+                    }
+                conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self._remove_orphan(conn, digest, ext)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(
+        self,
+        keys: Iterable[Optional[str]],
+        file_path: str,
+        meta: Optional[Dict[str, Any]] = None,
+        digest: Optional[str] = None,
+    ) -> Optional[str]:
+        """Add a finished file under every key in ``keys``. Returns its digest, or None if not cached.
+
+        The file is hashed once for all keys; pass ``digest`` when it is
+        already known (e.g. a file materialized from this cache) to skip
+        hashing entirely.
+        """
+        keys = [key for key in keys if key]
+        if not keys or not os.path.exists(file_path):
+            return None
+
+        size = os.path.getsize(file_path)
+        if size > self.max_bytes:
+            return None
+
+        digest = digest or file_digest(file_path)
+        ext = os.path.splitext(file_path)[1].lower()
+        object_path = self._object_path(digest, ext)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            tmp_path = f'{object_path}.{uuid.uuid4().hex}.tmp'
+            _link_or_copy(file_path, tmp_path)
+            os.replace(tmp_path, object_path)
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO entries (key, digest, ext, size, meta, created_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(key, digest, ext, size, json.dumps(meta or {}), now, now) for key in keys],
+            )
+            self._evict(conn, now)
+        return digest
+
+    def materialize(self, entry: Dict[str, Any], destination: str) -> str:
+        """Hardlink (or copy) a cached object to ``destination`` and return the path."""
+        _link_or_copy(entry['path'], destination)
+        return destination
+
+    def _remove_orphan(self, conn: sqlite3.Connection, digest: str, ext: str) -> None:
+        still_used = conn.execute(
+            'SELECT 1 FROM entries WHERE digest = ? AND ext = ? LIMIT 1', (digest, ext)
+        ).fetchone()
+        if still_used is None:
+            try:
+                os.remove(self._object_path(digest, ext))
+            except OSError:
+                pass
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        for key, digest, ext in conn.execute(
+            'SELECT key, digest, ext FROM entries WHERE created_at + ? <= ?', (self.ttl, now)
+        ).fetchall():
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            self._remove_orphan(conn, digest, ext)
+
+        total = conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, ext, size FROM entries)'
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, digest, ext, size in conn.execute(
+            'SELECT key, digest, ext, size FROM entries ORDER BY accessed_at ASC'
+        ).fetchall():
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            still_used = conn.execute(
+                'SELECT 1 FROM entries WHERE digest = ? AND ext = ? LIMIT 1', (digest, ext)
+            ).fetchone()
+            if still_used is None:
+                self._remove_orphan(conn, digest, ext)
+                total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            entries, objects, total = conn.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT digest), '
+                '(SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, ext, size FROM entries)) '
+                'FROM entries'
+            ).fetchone()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'entries': entries,
+            'objects': objects,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+        }
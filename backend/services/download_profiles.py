@@ -0,0 +1,105 @@
+import copy
+import json
+import os
+import shutil
+from typing import Any, Dict, Mapping, Optional
+
+MB = 1024 * 1024
+
+# Network knobs applied to every yt-dlp download for a platform. Twitter and
+# Pinterest serve HLS, so fragments are fetched in parallel; TikTok serves a
+# progressive mp4 where chunked range requests avoid per-connection throttling.
+DEFAULT_PROFILES: Dict[str, Dict[str, Any]] = {
+    'pinterest': {
+        'concurrent_fragment_downloads': 8,
+        'http_chunk_size': 10 * MB,
+        'buffersize': 64 * 1024,
+        'external_downloader': None,
+    },
+    'twitter': {
+        'concurrent_fragment_downloads': 8,
+        'http_chunk_size': 10 * MB,
+        'buffersize': 64 * 1024,
+        'external_downloader': None,
+    },
+    'tiktok': {
+        'concurrent_fragment_downloads': 4,
+        'http_chunk_size': 10 * MB,
+        'buffersize': 64 * 1024,
+        'external_downloader': None,
+    },
+}
+
+# Default arguments for external downloaders we know how to drive
+EXTERNAL_DOWNLOADER_ARGS = {
+    'aria2c': ['-x', '8', '-s', '8', '-k', '1M', '--file-allocation=none'],
+}
+
+_ENV_FIELDS = (
+    ('FRAGMENTS', 'concurrent_fragment_downloads', int),
+    ('CHUNK_SIZE', 'http_chunk_size', int),
+    ('BUFFER_SIZE', 'buffersize', int),
+    ('EXTERNAL_DOWNLOADER', 'external_downloader', str),
+)
+
+
+def load_download_profiles(
+    environ: Mapping[str, str] = os.environ,
+    path: Optional[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Build per-platform download profiles.
+
+    Defaults are overlaid with a JSON file (``{"twitter": {"http_chunk_size":
+    0}, ...}``, path from ``YTDLP_PROFILES_FILE``) and then with env vars such
+    as ``YTDLP_TWITTER_FRAGMENTS``, ``YTDLP_TIKTOK_CHUNK_SIZE``,
+    ``YTDLP_PINTEREST_BUFFER_SIZE`` or ``YTDLP_TWITTER_EXTERNAL_DOWNLOADER``.
+    """
+    profiles = copy.deepcopy(DEFAULT_PROFILES)
+
+    path = path or environ.get('YTDLP_PROFILES_FILE')
+    if path and os.path.exists(path):
+        with open(path, 'r') as f:
+            for platform, overrides in json.load(f).items():
+                profiles.setdefault(platform, {}).update(overrides)
+
+    for platform, profile in profiles.items():
+        for suffix, key, cast in _ENV_FIELDS:
+            value = environ.get(f'YTDLP_{platform.upper()}_{suffix}')
+            if value is None:
+                continue
+            try:
+                profile[key] = cast(value) if value != '' else None
+            except ValueError:
+                continue
+
+    return profiles
+
+
+def profile_options(profile: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Translate a download profile into yt-dlp ``YoutubeDL`` params.
+
+    An external downloader is only used when its binary is on PATH; otherwise
+    yt-dlp's native downloader (with concurrent fragments) stands in for it.
+    """
+    if not profile:
+        return {}
+
+    options: Dict[str, Any] = {}
+    fragments = profile.get('concurrent_fragment_downloads')
+    if fragments and fragments > 1:
+        options['concurrent_fragment_downloads'] = fragments
+    chunk_size = profile.get('http_chunk_size')
+    if chunk_size:
+        options['http_chunk_size'] = chunk_size
+    buffersize = profile.get('buffersize')
+    if buffersize:
+        options['buffersize'] = buffersize
+
+    downloader = profile.get('external_downloader')
+    if downloader and shutil.which(downloader):
+        options['external_downloader'] = {'default': downloader}
+        args = profile.get('external_downloader_args', EXTERNAL_DOWNLOADER_ARGS.get(downloader))
+        if args:
+            options['external_downloader_args'] = {downloader: list(args)}
+
+    return options
@@ -0,0 +1,274 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from . import progress
+from .metrics import metrics
+
+DEFAULT_POLL_INTERVAL = 0.05
+
+metrics.histogram('app_ffmpeg_wait_seconds', 'Time ffmpeg runs queued for a governor slot.')
+metrics.counter('app_ffmpeg_runs_total', 'ffmpeg runs admitted by the governor.')
+
+_ffmpeg_pp_names: Optional[FrozenSet[str]] = None
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_limits(cpus: int) -> Tuple[int, int]:
+    """Split ``cpus`` into ``(slots, threads per ffmpeg run)``.
+
+    Half the cores may run ffmpeg at once, leaving the rest for the web
+    workers and downloads; each run gets an equal share of threads.
+    """
+    slots = max(1, cpus // 2)
+    return slots, max(1, cpus // slots)
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _ffmpeg_postprocessors() -> FrozenSet[str]:
+    """Names yt-dlp reports in postprocessor hooks for its ffmpeg-based postprocessors."""
+    global _ffmpeg_pp_names
+    if _ffmpeg_pp_names is None:
+        from yt_dlp.postprocessor.ffmpeg import FFmpegPostProcessor
+
+        names, pending = set(), [FFmpegPostProcessor]
+        while pending:
+            cls = pending.pop()
+            pending.extend(cls.__subclasses__())
+            names.add(cls.pp_key())
+        _ffmpeg_pp_names = frozenset(names)
+    return _ffmpeg_pp_names
+
+
+class FFmpegGovernor:
+    """Host-wide cap on concurrent ffmpeg runs, admitted in arrival order.
+
+    With ``path`` the queue lives in a SQLite file, so every gunicorn worker
+    on the host shares the same ``slots``; entries left behind by a process
+    that died are dropped on the next admission check. Without it the cap
+    applies to this process only. Every admitted run is given ``threads``
+    ffmpeg threads, so slots × threads stays within the CPUs by default.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        slots: Optional[int] = None,
+        threads: Optional[int] = None,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ) -> None:
+        default_slots, default_threads = default_limits(available_cpus())
+        self.path: Optional[str] = None
+        self.slots = max(1, slots or default_slots)
+        self.threads = max(1, threads or default_threads)
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._queue: Deque[int] = deque()
+        self._running = 0
+        self._next_ticket = 0
+        if path:
+            self.configure(path, slots, threads)
+
+    def configure(self, path: str, slots: Optional[int] = None, threads: Optional[int] = None) -> None:
+        """Share the queue through the SQLite file at ``path``."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        if slots:
+            self.slots = max(1, slots)
+        if threads:
+            self.threads = max(1, threads)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS ffmpeg_queue ('
+                'ticket INTEGER PRIMARY KEY AUTOINCREMENT, pid INTEGER NOT NULL, label TEXT, '
+                'running INTEGER NOT NULL DEFAULT 0, enqueued_at REAL NOT NULL)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    def ffmpeg_args(self) -> List[str]:
+        return ['-threads', str(self.threads)]
+
+    def session(self) -> 'FFmpegSession':
+        return FFmpegSession(self)
+
+    # Admission
+
+    def acquire(self, label: str = '') -> Tuple[int, float]:
+        """Block until a slot is free; return ``(ticket, seconds waited)``."""
+        started = time.perf_counter()
+        ticket = self._acquire_shared(label) if self.path else self._acquire_local()
+        waited = time.perf_counter() - started
+        metrics.observe('app_ffmpeg_wait_seconds', waited)
+        metrics.inc('app_ffmpeg_runs_total')
+        return ticket, waited
+
+    def release(self, ticket: int) -> None:
+        if self.path:
+            with self._connect() as conn:
+                conn.execute('DELETE FROM ffmpeg_queue WHERE ticket = ?', (ticket,))
+        else:
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, label: str = '') -> Iterator[float]:
+        """Hold a slot for the block; yields the seconds spent queueing."""
+        ticket, waited = self.acquire(label)
+        try:
+            yield waited
+        finally:
+            self.release(ticket)
+
+    def _acquire_local(self) -> int:
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._queue.append(ticket)
+            position = 0
+            try:
+                while self._queue[0] != ticket or self._running >= self.slots:
+                    ahead = self._queue.index(ticket) + 1
+                    if ahead != position:
+                        position = ahead
+                        progress.report(stage='ffmpeg_queue', queue_position=position)
+                    self._cond.wait()
+            except BaseException:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+                raise
+            self._queue.popleft()
+            self._running += 1
+            # The next ticket may fit into another free slot
+            self._cond.notify_all()
+            return ticket
+
+    def _acquire_shared(self, label: str) -> int:
+        with self._connect() as conn:
+            ticket = conn.execute(
+                'INSERT INTO ffmpeg_queue (pid, label, enqueued_at) VALUES (?, ?, ?)',
+                (os.getpid(), label, time.time()),
+            ).lastrowid
+        position = 0
+        try:
+            while True:
+                admitted, ahead = self._try_admit(ticket)
+                if admitted:
+                    return ticket
+                if ahead != position:
+                    position = ahead
+                    progress.report(stage='ffmpeg_queue', queue_position=position)
+                time.sleep(self.poll_interval)
+        except BaseException:
+            self.release(ticket)
+            raise
+
+    def _try_admit(self, ticket: int) -> Tuple[bool, int]:
+        """Start ``ticket`` if it is first in line and a slot is free.
+
+        Returns ``(admitted, queue position)``.
+        """
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for (pid,) in conn.execute('SELECT DISTINCT pid FROM ffmpeg_queue').fetchall():
+                if not pid_alive(pid):
+                    conn.execute('DELETE FROM ffmpeg_queue WHERE pid = ?', (pid,))
+            running = conn.execute('SELECT COUNT(*) FROM ffmpeg_queue WHERE running = 1').fetchone()[0]
+            ahead = conn.execute(
+                'SELECT COUNT(*) FROM ffmpeg_queue WHERE running = 0 AND ticket < ?', (ticket,)
+            ).fetchone()[0]
+            admitted = ahead == 0 and running < self.slots
+            if admitted:
+                conn.execute('UPDATE ffmpeg_queue SET running = 1 WHERE ticket = ?', (ticket,))
+            conn.execute('COMMIT')
+            return admitted, ahead + 1
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+
+class FFmpegSession:
+    """Governor slots taken for the ffmpeg runs of one download.
+
+    ``apply(ydl_opts)`` makes yt-dlp wait for a slot before each ffmpeg
+    postprocessor (merge, fixups, conversion) and free it afterwards, and
+    limits ffmpeg to the governor's thread share. ``slot()`` covers ffmpeg
+    runs made outside yt-dlp. ``report()`` totals the queueing.
+    """
+
+    def __init__(self, governor: FFmpegGovernor) -> None:
+        self.governor = governor
+        self.runs = 0
+        self.waited = 0.0
+        self._ticket: Optional[int] = None
+
+    def _admitted(self, waited: float) -> None:
+        self.runs += 1
+        self.waited += waited
+
+    @contextmanager
+    def slot(self, label: str = '') -> Iterator[None]:
+        with self.governor.slot(label) as waited:
+            self._admitted(waited)
+            yield
+
+    def _hook(self, status: Dict[str, Any]) -> None:
+        name = status.get('postprocessor')
+        if name not in _ffmpeg_postprocessors():
+            return
+        if status.get('status') == 'started' and self._ticket is None:
+            self._ticket, waited = self.governor.acquire(name)
+            self._admitted(waited)
+        elif status.get('status') == 'finished':
+            self.close()
+
+    def apply(self, ydl_opts: Dict[str, Any]) -> Dict[str, Any]:
+        """Return ``ydl_opts`` with the slot hook and ``-threads`` limit added."""
+        return {
+            **ydl_opts,
+            'postprocessor_hooks': [self._hook, *ydl_opts.get('postprocessor_hooks', ())],
+            'postprocessor_args': ydl_opts.get('postprocessor_args') or {'default': self.governor.ffmpeg_args()},
+        }
+
+    def close(self) -> None:
+        """Free a slot still held, e.g. when a postprocessor raised."""
+        ticket, self._ticket = self._ticket, None
+        if ticket is not None:
+            self.governor.release(ticket)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'runs': self.runs,
+            'wait_ms': round(self.waited * 1000, 1),
+            'threads': self.governor.threads,
+            'slots': self.governor.slots,
+        }
+
+
+governor = FFmpegGovernor()
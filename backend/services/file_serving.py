@@ -0,0 +1,146 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import quote
+
+from werkzeug.http import is_resource_modified
+from werkzeug.utils import send_file
+from werkzeug.wrappers import Response
+
+from .download_cache import file_digest
+
+HANDOFF_MODES = ('x-accel', 'x-sendfile')
+DEFAULT_ACCEL_PREFIX = '/_protected_downloads/'
+
+FileSignature = Tuple[int, int]
+
+
+class FileServer:
+    """Serve produced files with strong validators and optional front-end hand-off.
+
+    ETags are the SHA-256 of the file contents, memoised per (path, mtime,
+    size) so each file is hashed at most once per worker. Without a hand-off
+    mode werkzeug answers Range, If-Range, If-None-Match and
+    If-Modified-Since itself. With ``mode='x-accel'`` (nginx) or
+    ``mode='x-sendfile'`` (Apache/lighttpd) only the validators are checked
+    here and the body is left to the front end, ranges included.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        mode: str = '',
+        accel_prefix: str = DEFAULT_ACCEL_PREFIX,
+        max_digests: int = 1024,
+    ) -> None:
+        mode = (mode or '').lower()
+        if mode and mode not in HANDOFF_MODES:
+            raise ValueError(f'Unknown file hand-off mode: {mode}')
+        self.root = os.path.abspath(root)
+        self.mode = mode
+        self.accel_prefix = '/' + accel_prefix.strip('/') + '/'
+        self.max_digests = max_digests
+        self.hashed = 0
+        self.not_modified = 0
+        self.handed_off = 0
+        self._digests: 'OrderedDict[str, Tuple[FileSignature, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(stat: os.stat_result) -> FileSignature:
+        return stat.st_mtime_ns, stat.st_size
+
+    def remember(self, path: str, digest: str) -> None:
+        """Record a digest that is already known (e.g. from the download cache)."""
+        path = os.path.abspath(path)
+        try:
+            signature = self._signature(os.stat(path))
+        except OSError:
+            return
+        self._store(path, signature, digest)
+
+    def _store(self, path: str, signature: FileSignature, digest: str) -> None:
+        with self._lock:
+            self._digests[path] = (signature, digest)
+            self._digests.move_to_end(path)
+            while len(self._digests) > self.max_digests:
+                self._digests.popitem(last=False)
+
+    def etag_for(self, path: str, stat: Optional[os.stat_result] = None) -> str:
+        path = os.path.abspath(path)
+        signature = self._signature(stat or os.stat(path))
+        with self._lock:
+            cached = self._digests.get(path)
+            if cached and cached[0] == signature:
+                self._digests.move_to_end(path)
+                return cached[1]
+
+        digest = file_digest(path)
+        with self._lock:
+            self.hashed += 1
+        self._store(path, signature, digest)
+        return digest
+
+    def serve(
+        self,
+        environ: Dict[str, Any],
+        path: str,
+        download_name: str,
+        mimetype: Optional[str] = None,
+    ) -> Response:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        etag = self.etag_for(path, stat)
+        last_modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+
+        if not self.mode:
+            response = send_file(
+                path,
+                environ,
+                mimetype=mimetype,
+                as_attachment=True,
+                download_name=download_name,
+                conditional=True,
+                etag=etag,
+                last_modified=last_modified,
+            )
+            if response.status_code == 304:
+                with self._lock:
+                    self.not_modified += 1
+            return response
+
+        # Hand-off: answer validators here, let the front end stream the bytes
+        # (and any Range) straight from disk. Range is ignored so a stale
+        # If-Range does not turn a 304 check into a partial response.
+        if not is_resource_modified(environ, etag=etag, last_modified=last_modified, ignore_if_range=True):
+            with self._lock:
+                self.not_modified += 1
+            response = Response(status=304)
+        else:
+            response = Response(mimetype=mimetype or 'application/octet-stream')
+            response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+            response.headers['Accept-Ranges'] = 'bytes'
+            if self.mode == 'x-accel':
+                relative = os.path.relpath(path, self.root).replace(os.sep, '/')
+                response.headers['X-Accel-Redirect'] = self.accel_prefix + quote(relative)
+            else:
+                response.headers['X-Sendfile'] = path
+            with self._lock:
+                self.handed_off += 1
+
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'mode': self.mode or 'inline',
+                'hashed': self.hashed,
+                'not_modified': self.not_modified,
+                'handed_off': self.handed_off,
+                'digests': len(self._digests),
+            }
@@ -0,0 +1,131 @@
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session: Optional['requests.Session'] = None
+_session_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def build_session(
+    pool_connections: int = 16,
+    pool_maxsize: int = 32,
+    retries: int = 3,
+    backoff_factor: float = 0.5,
+    keep_alive: bool = True,
+) -> 'requests.Session':
+    """Create a ``requests.Session`` with a pooled, retrying ``HTTPAdapter``.
+
+    ``pool_connections`` is the number of hosts kept in the pool and
+    ``pool_maxsize`` the number of sockets kept per host. Idempotent requests
+    are retried with exponential backoff on connection errors and on
+    429/5xx responses, honouring ``Retry-After``.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({'HEAD', 'GET', 'OPTIONS'}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+        pool_block=False,
+    )
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+def get_session() -> 'requests.Session':
+    """Return the process-wide session, rebuilding it after a fork."""
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _lock:
+        if _session is None or _session_pid != pid:
+            _session = build_session(
+                pool_connections=_env_int('HTTP_POOL_CONNECTIONS', 16),
+                pool_maxsize=_env_int('HTTP_POOL_MAXSIZE', 32),
+                retries=_env_int('HTTP_RETRIES', 3),
+                backoff_factor=float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.5)),
+                keep_alive=os.environ.get('HTTP_KEEP_ALIVE', '1') != '0',
+            )
+            _session_pid = pid
+    return _session
+
+
+def _idle_connections(pool: Any) -> int:
+    # The pool queue is pre-filled with None placeholders for unopened slots.
+    queue = getattr(pool.pool, 'queue', None) or []
+    return sum(1 for conn in list(queue) if conn is not None)
+
+
+def connection_stats() -> Dict[str, Any]:
+    """Summarise connection reuse across the pooled hosts of this process.
+
+    ``requests`` is the number of requests sent through each host pool and
+    ``connections`` the number of sockets that had to be opened for them.
+    """
+    hosts: Dict[str, Dict[str, int]] = {}
+    total_requests = 0
+    total_connections = 0
+
+    session = _session if _session_pid == os.getpid() else None
+    if session is not None:
+        seen = set()
+        for adapter in session.adapters.values():
+            if id(adapter) in seen:
+                continue
+            seen.add(id(adapter))
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                num_requests = getattr(pool, 'num_requests', 0)
+                num_connections = getattr(pool, 'num_connections', 0)
+                hosts[f'{key.key_scheme}://{key.key_host}:{key.key_port}'] = {
+                    'requests': num_requests,
+                    'connections': num_connections,
+                    'idle': _idle_connections(pool),
+                }
+                total_requests += num_requests
+                total_connections += num_connections
+
+    reused = max(total_requests - total_connections, 0)
+    return {
+        'requests': total_requests,
+        'connections': total_connections,
+        'reuse_ratio': round(reused / total_requests, 4) if total_requests else 0.0,
+        'hosts': hosts,
+    }
@@ -0,0 +1,661 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+from . import progress
+from .ffmpeg_governor import pid_alive
+
+QUEUED = 'queued'
+RUNNING = 'running'
+# Cancelled while running: keeps its platform slot until the job's thread returns
+CANCELLING = 'cancelling'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+ACTIVE_STATES = {QUEUED, RUNNING}
+SLOT_STATES = {RUNNING, CANCELLING}
+LIVE_STATES = ACTIVE_STATES | SLOT_STATES
+
+DEFAULT_RETENTION = 3600
+DEFAULT_POLL_INTERVAL = 0.25
+MAX_POLL_INTERVAL = 2.0
+PROGRESS_INTERVAL = 0.5
+# Active records older than this are assumed orphaned by a dead worker and
+# are no longer joined by duplicate requests.
+ACTIVE_JOB_MAX_AGE = 1800
+
+
+class QueueFullError(Exception):
+    """Raised when the pending job limit has been reached."""
+
+
+class JobCancelled(BaseException):
+    """Raised from a running job's progress reports once it has been cancelled.
+
+    A BaseException, so the download fallbacks' ``except Exception`` handlers
+    do not retry a cancelled job.
+    """
+
+
+class MemoryJobStore:
+    """Job records kept in this process only."""
+
+    def __init__(self) -> None:
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job: Dict[str, Any], max_queued: Optional[int] = None) -> None:
+        """Add ``job``; a queued job is refused once ``max_queued`` jobs are waiting."""
+        with self._lock:
+            if max_queued is not None and job['state'] == QUEUED:
+                queued = sum(1 for record in self._jobs.values() if record['state'] == QUEUED)
+                if queued >= max_queued:
+                    raise QueueFullError('Download queue is full, please retry shortly')
+            self._jobs[job['id']] = dict(job)
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def claim(self, job_id: str, platform: str, limit: Optional[int] = None) -> str:
+        """Start a queued job unless ``platform`` already runs ``limit`` jobs.
+
+        Returns the job's state afterwards: RUNNING when claimed, QUEUED when
+        the platform is at its cap, anything else when it is no longer queued.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return CANCELLED
+            if job['state'] != QUEUED:
+                return job['state']
+            running = sum(
+                1 for record in self._jobs.values()
+                if record['platform'] == platform and record['state'] in SLOT_STATES
+            )
+            if limit and running >= limit:
+                return QUEUED
+            job.update(state=RUNNING, started_at=time.time())
+            return RUNNING
+
+    def counts(self) -> Dict[str, Any]:
+        with self._lock:
+            running: Dict[str, int] = {}
+            queued = 0
+            for job in self._jobs.values():
+                if job['state'] == QUEUED:
+                    queued += 1
+                elif job['state'] in SLOT_STATES:
+                    running[job['platform']] = running.get(job['platform'], 0) + 1
+        return {'queued': queued, 'running': running}
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a queued job, or mark a running one CANCELLING. Returns the new state."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['state'] in FINISHED_STATES:
+                return None
+            if job['state'] == QUEUED:
+                job.update(state=CANCELLED, finished_at=time.time())
+            else:
+                job['state'] = CANCELLING
+            return job['state']
+
+    def queued_ahead(self, created_at: float) -> int:
+        with self._lock:
+            return sum(
+                1 for job in self._jobs.values()
+                if job['state'] == QUEUED and job['created_at'] < created_at
+            )
+
+    def find_active(self, dedupe_key: str, newer_than: float) -> Optional[str]:
+        with self._lock:
+            for job in self._jobs.values():
+                if (
+                    job.get('dedupe_key') == dedupe_key
+                    and job['state'] in ACTIVE_STATES
+                    and job['created_at'] >= newer_than
+                ):
+                    return job['id']
+        return None
+
+    def prune(self, older_than: float) -> None:
+        with self._lock:
+            for job_id in [
+                job_id for job_id, job in self._jobs.items()
+                if job['state'] in FINISHED_STATES and (job.get('finished_at') or 0) < older_than
+            ]:
+                del self._jobs[job_id]
+
+
+class SQLiteJobStore:
+    """Job records shared by every worker process, so any worker can answer a poll.
+
+    The queue depth limit and per-platform caps are checked against these
+    records inside one write transaction, so they hold for the whole host.
+    Active jobs whose worker process has died are marked failed on the next
+    admission check.
+    """
+
+    _COLUMNS = (
+        'id', 'platform', 'state', 'created_at', 'started_at', 'finished_at',
+        'result', 'error', 'progress', 'dedupe_key', 'pid',
+    )
+    _JSON_COLUMNS = ('result', 'progress')
+    _ADDED_COLUMNS = {'progress': 'TEXT', 'dedupe_key': 'TEXT', 'pid': 'INTEGER'}
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, platform TEXT, state TEXT NOT NULL, '
+                'created_at REAL, started_at REAL, finished_at REAL, '
+                'result TEXT, error TEXT, progress TEXT, dedupe_key TEXT, pid INTEGER)'
+            )
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+            for column, column_type in self._ADDED_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {column_type}')
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_dedupe_key ON jobs (dedupe_key)')
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, platform)')
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction taken up front, so counts and the write that follows agree."""
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _reap(self, conn: sqlite3.Connection) -> None:
+        for (pid,) in conn.execute(
+            'SELECT DISTINCT pid FROM jobs WHERE state IN (?, ?, ?) AND pid IS NOT NULL',
+            tuple(sorted(LIVE_STATES)),
+        ).fetchall():
+            if not pid_alive(pid):
+                conn.execute(
+                    'UPDATE jobs SET state = ?, error = ?, finished_at = ? WHERE pid = ? AND state IN (?, ?, ?)',
+                    (FAILED, 'Worker exited before the job finished', time.time(), pid, *sorted(LIVE_STATES)),
+                )
+
+    def create(self, job: Dict[str, Any], max_queued: Optional[int] = None) -> None:
+        """Add ``job``; a queued job is refused once ``max_queued`` jobs are waiting."""
+        row = dict(job, **{column: json.dumps(job.get(column)) for column in self._JSON_COLUMNS})
+        with self._transaction() as conn:
+            if max_queued is not None and job['state'] == QUEUED:
+                self._reap(conn)
+                queued = conn.execute('SELECT COUNT(*) FROM jobs WHERE state = ?', (QUEUED,)).fetchone()[0]
+                if queued >= max_queued:
+                    raise QueueFullError('Download queue is full, please retry shortly')
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(self._COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in self._COLUMNS)})",
+                tuple(row.get(column) for column in self._COLUMNS),
+            )
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        for column in self._JSON_COLUMNS:
+            if column in fields:
+                fields[column] = json.dumps(fields[column])
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+        with self._connect() as conn:
+            conn.execute(
+                f'UPDATE jobs SET {assignments} WHERE id = ?',
+                (*fields.values(), job_id),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(self._COLUMNS, row))
+        for column in self._JSON_COLUMNS:
+            job[column] = json.loads(job[column]) if job[column] else None
+        return job
+
+    def claim(self, job_id: str, platform: str, limit: Optional[int] = None) -> str:
+        """Start a queued job unless ``platform`` already runs ``limit`` jobs on this host.
+
+        Returns the job's state afterwards: RUNNING when claimed, QUEUED when
+        the platform is at its cap, anything else when it is no longer queued.
+        """
+        if limit and self._at_limit(platform, limit):
+            return QUEUED
+        with self._transaction() as conn:
+            self._reap(conn)
+            row = conn.execute('SELECT state FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None:
+                return CANCELLED
+            if row[0] != QUEUED:
+                return row[0]
+            if limit:
+                running = conn.execute(
+                    'SELECT COUNT(*) FROM jobs WHERE platform = ? AND state IN (?, ?)',
+                    (platform, *sorted(SLOT_STATES)),
+                ).fetchone()[0]
+                if running >= limit:
+                    return QUEUED
+            conn.execute(
+                'UPDATE jobs SET state = ?, started_at = ?, pid = ? WHERE id = ?',
+                (RUNNING, time.time(), os.getpid(), job_id),
+            )
+            return RUNNING
+
+    def _at_limit(self, platform: str, limit: int) -> bool:
+        """Read-only check that live processes already run ``limit`` ``platform`` jobs.
+
+        Lets a blocked job be turned away without taking the write lock;
+        jobs of dead processes are not counted, so they never block a claim.
+        """
+        with self._connect() as conn:
+            pids = conn.execute(
+                'SELECT pid FROM jobs WHERE platform = ? AND state IN (?, ?)', (platform, *sorted(SLOT_STATES))
+            ).fetchall()
+        return sum(1 for (pid,) in pids if pid is None or pid_alive(pid)) >= limit
+
+    def counts(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT state, platform, COUNT(*) FROM jobs WHERE state IN (?, ?, ?) GROUP BY state, platform',
+                tuple(sorted(LIVE_STATES)),
+            ).fetchall()
+        running: Dict[str, int] = {}
+        for state, platform, count in rows:
+            if state in SLOT_STATES:
+                running[platform] = running.get(platform, 0) + count
+        return {'queued': sum(count for state, _, count in rows if state == QUEUED), 'running': running}
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a queued job, or mark a running one CANCELLING. Returns the new state."""
+        with self._transaction() as conn:
+            row = conn.execute('SELECT state FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None or row[0] in FINISHED_STATES:
+                return None
+            if row[0] == QUEUED:
+                conn.execute(
+                    'UPDATE jobs SET state = ?, finished_at = ? WHERE id = ?', (CANCELLED, time.time(), job_id)
+                )
+                return CANCELLED
+            conn.execute('UPDATE jobs SET state = ? WHERE id = ?', (CANCELLING, job_id))
+            return CANCELLING
+
+    def queued_ahead(self, created_at: float) -> int:
+        with self._connect() as conn:
+            return conn.execute(
+                'SELECT COUNT(*) FROM jobs WHERE state = ? AND created_at < ?', (QUEUED, created_at)
+            ).fetchone()[0]
+
+    def find_active(self, dedupe_key: str, newer_than: float) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT id FROM jobs WHERE dedupe_key = ? AND state IN (?, ?) AND created_at >= ? '
+                'ORDER BY created_at DESC LIMIT 1',
+                (dedupe_key, *sorted(ACTIVE_STATES), newer_than),
+            ).fetchone()
+        return row[0] if row else None
+
+    def prune(self, older_than: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                'DELETE FROM jobs WHERE state IN (?, ?, ?) AND finished_at < ?',
+                (*sorted(FINISHED_STATES), older_than),
+            )
+
+
+class _ProgressSink:
+    """Merge the progress reports of one job and write them to the store.
+
+    Writes are throttled to one per PROGRESS_INTERVAL, except that a new
+    stage is written at once. Byte counters restart with every stage. Each
+    write also checks the job's state and raises JobCancelled once it has
+    been cancelled, which stops a yt-dlp download from its progress hook.
+    """
+
+    TRANSIENT_FIELDS = ('downloaded_bytes', 'total_bytes', 'speed', 'eta', 'postprocessor')
+
+    def __init__(self, store: Any, job_id: str) -> None:
+        self.store = store
+        self.job_id = job_id
+        self.state: Dict[str, Any] = {}
+        self._written_at = 0.0
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __call__(self, fields: Dict[str, Any]) -> None:
+        with self._lock:
+            stage = fields.get('stage')
+            new_stage = stage is not None and stage != self.state.get('stage')
+            if new_stage:
+                for key in self.TRANSIENT_FIELDS:
+                    self.state.pop(key, None)
+            self.state.update((key, value) for key, value in fields.items() if value is not None)
+            self._dirty = True
+            now = time.monotonic()
+            if not new_stage and now - self._written_at < PROGRESS_INTERVAL:
+                return
+            self._written_at = now
+            self._dirty = False
+            snapshot = dict(self.state)
+        self.store.update(self.job_id, progress=snapshot)
+        record = self.store.get(self.job_id)
+        if record and record['state'] == CANCELLING:
+            raise JobCancelled(self.job_id)
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            snapshot = dict(self.state)
+        self.store.update(self.job_id, progress=snapshot)
+
+
+class JobQueue:
+    """Bounded worker pool for long-running download jobs.
+
+    Each process runs the jobs submitted to it, FIFO, skipping jobs whose
+    platform is already at its concurrency cap. ``max_queue`` and the
+    platform caps are enforced by the store, so with a shared store they
+    hold across every worker on the host. Claims run outside the queue's
+    lock; a platform found at its cap is retried after ``poll_interval``
+    seconds, doubling up to MAX_POLL_INTERVAL, or as soon as a job of this
+    process finishes. Worker threads start
+    lazily so the pool is created after gunicorn forks. Jobs report progress
+    through ``services.progress``; a job submitted with the ``dedupe_key``
+    of an active job joins that job.
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        max_workers: int = 2,
+        max_queue: int = 32,
+        platform_limits: Optional[Dict[str, int]] = None,
+        retention: int = DEFAULT_RETENTION,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ) -> None:
+        self.store = store
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max_queue
+        self.platform_limits = platform_limits or {}
+        self.retention = retention
+        self.poll_interval = poll_interval
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._running: Dict[str, int] = {}
+        self._claiming: set = set()
+        # platform -> (retry at, current backoff) while it is at its cap
+        self._blocked: Dict[str, Tuple[float, float]] = {}
+        self._condition = threading.Condition()
+        self._threads: list = []
+
+    def _ensure_workers(self) -> None:
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(target=self._worker, name='download-job', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _candidate(self, now: float) -> Optional[Dict[str, Any]]:
+        """First pending job worth claiming; call with ``_condition`` held."""
+        for job in self._pending:
+            platform = job['platform']
+            if job['id'] in self._claiming or self._blocked.get(platform, (0.0, 0.0))[0] > now:
+                continue
+            limit = self.platform_limits.get(platform)
+            if limit and self._running.get(platform, 0) >= limit:
+                continue  # this process alone fills the cap; its jobs notify when done
+            return job
+        return None
+
+    def _wake_timeout(self, now: float) -> Optional[float]:
+        retry_at = [
+            self._blocked[job['platform']][0] for job in self._pending
+            if job['platform'] in self._blocked
+        ]
+        return max(0.0, min(retry_at) - now) if retry_at else None
+
+    def _next_job(self) -> Dict[str, Any]:
+        while True:
+            with self._condition:
+                job = self._candidate(time.monotonic())
+                while job is None:
+                    self._condition.wait(self._wake_timeout(time.monotonic()))
+                    job = self._candidate(time.monotonic())
+                self._claiming.add(job['id'])
+
+            platform = job['platform']
+            # May take the store's write lock; submit/cancel/stats are not held up by it
+            state = self.store.claim(job['id'], platform, self.platform_limits.get(platform))
+
+            with self._condition:
+                self._claiming.discard(job['id'])
+                if state == QUEUED:
+                    # At the cap on another worker: back off instead of re-polling the write lock
+                    backoff = self._blocked.get(platform, (0.0, self.poll_interval / 2))[1]
+                    backoff = min(backoff * 2, MAX_POLL_INTERVAL)
+                    self._blocked[platform] = (time.monotonic() + backoff, backoff)
+                    continue
+                self._blocked.pop(platform, None)
+                # Claimed, or cancelled through another worker
+                if job in self._pending:
+                    self._pending.remove(job)
+                if state == RUNNING:
+                    self._running[platform] = self._running.get(platform, 0) + 1
+                    return job
+
+    def _worker(self) -> None:
+        while True:
+            job = self._next_job()
+            try:
+                self._run(job)
+            finally:
+                with self._condition:
+                    self._running[job['platform']] -= 1
+                    # A slot just freed here; retry the platform right away
+                    self._blocked.pop(job['platform'], None)
+                    self._condition.notify_all()
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job['id']
+        record = self.store.get(job_id)
+        if record is None or record['state'] == CANCELLED:
+            return
+
+        self._execute(job_id, job['func'], job['args'], job['kwargs'], started=True)
+
+    def _execute(
+        self,
+        job_id: str,
+        func: Callable[..., Any],
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        started: bool = False,
+    ) -> Tuple[Any, Optional[Exception]]:
+        """Run one job on this thread and record its outcome. Returns ``(result, error)``."""
+        if not started:
+            self.store.update(job_id, state=RUNNING, started_at=time.time())
+        sink = _ProgressSink(self.store, job_id)
+        result, error = None, None
+        try:
+            with progress.reporting(sink):
+                result = func(*args, **kwargs)
+        except JobCancelled:
+            error = RuntimeError('Download was cancelled')
+            state, fields = CANCELLED, {}
+        except Exception as exc:
+            error = exc
+            state, fields = FAILED, {'error': str(exc)}
+        else:
+            state, fields = SUCCEEDED, {'result': result}
+        sink.flush()
+
+        record = self.store.get(job_id)
+        if record and record['state'] in (CANCELLING, CANCELLED):
+            # Cancelled while running: keep the cancellation, drop the result,
+            # and only now give the platform slot back.
+            if record['state'] == CANCELLING:
+                self.store.update(job_id, state=CANCELLED, finished_at=time.time())
+            return result, error
+        self.store.update(job_id, state=state, finished_at=time.time(), **fields)
+        return result, error
+
+    def _create(
+        self,
+        job_id: str,
+        platform: str,
+        state: str,
+        dedupe_key: Optional[str],
+        max_queued: Optional[int] = None,
+    ) -> None:
+        now = time.time()
+        self.store.prune(now - self.retention)
+        self.store.create({
+            'id': job_id,
+            'platform': platform,
+            'state': state,
+            'created_at': now,
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None,
+            'progress': None,
+            'dedupe_key': dedupe_key,
+            'pid': os.getpid(),
+        }, max_queued=max_queued)
+
+    def find_active(self, dedupe_key: str) -> Optional[str]:
+        """Return the id of a queued or running job with ``dedupe_key``, if any."""
+        return self.store.find_active(dedupe_key, time.time() - ACTIVE_JOB_MAX_AGE)
+
+    def submit(
+        self,
+        platform: str,
+        func: Callable[..., Any],
+        *args: Any,
+        dedupe_key: Optional[str] = None,
+        **kwargs: Any,
+    ) -> str:
+        """Queue ``func(*args, **kwargs)`` and return the job id.
+
+        With ``dedupe_key`` an active job with the same key is returned
+        instead of queueing a duplicate.
+        """
+        with self._condition:
+            if dedupe_key:
+                existing = self.find_active(dedupe_key)
+                if existing:
+                    return existing
+
+            job_id = uuid.uuid4().hex
+            # Raises QueueFullError once max_queue jobs wait (host-wide with a shared store)
+            self._create(job_id, platform, QUEUED, dedupe_key, max_queued=self.max_queue)
+            self._pending.append({
+                'id': job_id,
+                'platform': platform,
+                'func': func,
+                'args': args,
+                'kwargs': kwargs,
+            })
+            self._ensure_workers()
+            self._condition.notify_all()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.store.get(job_id)
+        if job and job['state'] == QUEUED:
+            job['position'] = self.store.queued_ahead(job['created_at']) + 1
+        return job
+
+    def run_inline(
+        self,
+        platform: str,
+        func: Callable[..., Any],
+        *args: Any,
+        dedupe_key: Optional[str] = None,
+        job_id: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Run ``func`` on the calling thread as a tracked job and return its result.
+
+        The job gets a record like a queued one (so its progress can be
+        followed under ``job_id``) and counts towards the platform caps, but
+        is not held back by them or by the queue limit.
+        Exceptions propagate after being recorded.
+        """
+        if not job_id or self.store.get(job_id) is not None:
+            job_id = uuid.uuid4().hex
+        self._create(job_id, platform, RUNNING, dedupe_key)
+        result, error = self._execute(job_id, func, args, kwargs)
+        if error is not None:
+            raise error
+        return result
+
+    def wait(self, job_id: str, timeout: float, interval: float = 0.25) -> Optional[Dict[str, Any]]:
+        """Poll until the job finishes or ``timeout`` passes; return its last record."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.store.get(job_id)
+            if job is None or job['state'] in FINISHED_STATES or time.monotonic() >= deadline:
+                return job
+            time.sleep(interval)
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a job. Returns its new state, or None if it does not exist or already finished.
+
+        Queued jobs are dropped (CANCELLED). A running job becomes CANCELLING:
+        its next progress report raises JobCancelled, and it keeps its
+        platform slot until its thread returns, when it becomes CANCELLED and
+        its result is discarded.
+        """
+        state = self.store.cancel(job_id)
+        if state == CANCELLED:
+            with self._condition:
+                for pending in self._pending:
+                    if pending['id'] == job_id:
+                        self._pending.remove(pending)
+                        break
+        return state
+
+    def stats(self) -> Dict[str, Any]:
+        """Jobs queued and running in this process, plus the store-wide totals under ``host``."""
+        with self._condition:
+            stats = {
+                'queued': len(self._pending),
+                'running': dict(self._running),
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'platform_limits': self.platform_limits,
+            }
+        stats['host'] = self.store.counts()
+        return stats
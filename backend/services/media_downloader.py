@@ -1,8 +1,12 @@
+import copy
 import os
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-import yt_dlp
+from . import progress, remux
+from .ffmpeg_governor import FFmpegSession, governor
+from .metrics import span
+from .ydl_pool import base_options, get_ydl_pool
 
 
 def _collect_formats(info: Dict[str, Any]) -> Dict[str, Any]:
@@ -34,8 +38,9 @@ def _has_audio(info: Optional[Dict[str, Any]]) -> bool:
     if not info:
         return False
 
-    requested = info.get('requested_formats') or info.get('requested_downloads')
-    entries = requested if requested else [info]
+    # requested_downloads only records file paths, so read codecs from the
+    # merged formats or the selected format itself
+    entries = info.get('requested_formats') or [info]
 
     for fmt in entries:
         acodec = (fmt.get('acodec') or '').lower()
@@ -45,6 +50,128 @@ def _has_audio(info: Optional[Dict[str, Any]]) -> bool:
     return False
 
 
+def _audio_state(fmt: Dict[str, Any]) -> str:
+    """'yes', 'no' or 'unknown' for whether ``fmt`` carries an audio track."""
+    acodec = (fmt.get('acodec') or '').lower()
+    if acodec == 'none':
+        return 'no'
+    if acodec in {'', 'n/a'}:
+        return 'unknown'
+    return 'yes'
+
+
+def _is_audio_only(fmt: Dict[str, Any]) -> bool:
+    return (fmt.get('vcodec') or '').lower() == 'none' and _audio_state(fmt) == 'yes'
+
+
+def _merge_selector(format_id: str, formats: Dict[str, Any]) -> str:
+    selectors: List[str] = []
+    if format_id != 'best' and format_id in formats:
+        selectors.append(f'{format_id}+bestaudio/best')
+    selectors.extend([
+        'bestvideo[ext=mp4]+bestaudio[ext=m4a]',
+        'bestvideo+bestaudio',
+        'best'
+    ])
+    return '/'.join(selectors)
+
+
+def plan_formats(format_id: str, formats: Dict[str, Any]) -> Dict[str, Any]:
+    """Decide from the metadata formats how to get a video with audio.
+
+    Returns ``{'strategy', 'selector', 'verify_audio', 'trace'}`` where
+    ``strategy`` is ``direct`` (one download of ``selector``), ``merge``
+    (video and audio streams merged by ffmpeg) or ``progressive`` (the best
+    single file with audio). ``verify_audio`` is set when the codecs are
+    unknown, so a direct result still has to be checked for audio; that is
+    the only case where a stream may be fetched and then discarded.
+    ``trace`` lists the reasons behind the decision.
+    """
+    trace: List[str] = []
+
+    def decide(strategy: str, selector: str, verify_audio: bool = False) -> Dict[str, Any]:
+        trace.append(f'{strategy}: {selector}')
+        return {'strategy': strategy, 'selector': selector, 'verify_audio': verify_audio, 'trace': trace}
+
+    if not formats:
+        trace.append('no format metadata; checking the direct download for audio')
+        return decide('direct', format_id, verify_audio=True)
+
+    progressive = _progressive_formats(formats)
+    has_audio_stream = any(_is_audio_only(fmt) for fmt in formats.values())
+
+    if format_id == 'best':
+        if progressive:
+            trace.append(f'{len(progressive)} formats carry video and audio')
+            return decide('direct', 'best')
+        if any(_audio_state(fmt) == 'unknown' for fmt in formats.values()):
+            trace.append('audio codecs unknown; checking the direct download for audio')
+            return decide('direct', 'best', verify_audio=True)
+        if has_audio_stream:
+            trace.append('no format carries both video and audio')
+            return decide('merge', _merge_selector(format_id, formats))
+        trace.append('no format carries audio; delivering video only')
+        return decide('direct', 'best')
+
+    if format_id not in formats:
+        trace.append(f'format {format_id} is not offered')
+        if has_audio_stream or not progressive:
+            return decide('merge', _merge_selector(format_id, formats))
+        return decide('progressive', progressive[-1]['format_id'])
+
+    fmt = formats[format_id]
+    audio = _audio_state(fmt)
+    if audio == 'yes' or (fmt.get('vcodec') or '').lower() == 'none':
+        trace.append(f'format {format_id} has audio ({fmt.get("acodec")})')
+        return decide('direct', format_id)
+    if audio == 'unknown':
+        trace.append(f'format {format_id} has unknown audio codec; checking the direct download for audio')
+        return decide('direct', format_id, verify_audio=True)
+
+    trace.append(f'format {format_id} is video-only')
+    if has_audio_stream:
+        return decide('merge', _merge_selector(format_id, formats))
+    if progressive:
+        trace.append('no separate audio stream offered')
+        return decide('progressive', progressive[-1]['format_id'])
+    trace.append('no format carries audio; delivering video only')
+    return decide('direct', format_id)
+
+
+def select_format(info: Dict[str, Any], selector: str) -> Optional[str]:
+    """Return the format id yt-dlp picks for ``selector`` from ``info``'s formats.
+
+    Merged selections come back as ``<video>+<audio>``. Returns None when
+    nothing matches or the selector is invalid.
+    """
+    formats = info.get('formats') or []
+    if not formats:
+        return info.get('format_id')
+    ctx = {
+        'formats': formats,
+        'has_merged_format': any('none' not in (f.get('acodec'), f.get('vcodec')) for f in formats),
+        'incomplete_formats': (
+            all(f.get('vcodec') == 'none' for f in formats)
+            or all(f.get('acodec') == 'none' for f in formats)
+        ),
+    }
+    try:
+        with get_ydl_pool().checkout('metadata') as ydl:
+            chosen = next(iter(ydl.build_format_selector(selector)(ctx)), None)
+    except Exception:
+        return None
+    return chosen.get('format_id') if chosen else None
+
+
+def resolve_format(info: Dict[str, Any], format_id: str) -> Optional[str]:
+    """Format id ``download_with_audio_merge`` would deliver for ``format_id``.
+
+    Requests that resolve to the same streams (``best`` and the id it picks,
+    say) get the same answer, so they can share one cached download.
+    """
+    return select_format(info, plan_formats(format_id, _collect_formats(info))['selector'])
+
+
 def _cleanup_outputs(download_folder: str, filename_prefix: str, timestamp: str) -> None:
     prefix = f'{filename_prefix}_{timestamp}'
     try:
@@ -58,23 +185,86 @@ def _cleanup_outputs(download_folder: str, filename_prefix: str, timestamp: str)
         pass
 
 
+def extract_video_info(url: str, raise_errors: bool = False) -> Optional[Dict[str, Any]]:
+    """Run the yt-dlp extractor once and return a JSON-safe info dict.
+
+    Returns None on failure unless ``raise_errors`` is set. A pooled
+    ``YoutubeDL`` instance is used so extractors stay initialised.
+    """
+    try:
+        with get_ydl_pool().checkout('metadata') as ydl_metadata:
+            info = ydl_metadata.extract_info(url, download=False)
+            return ydl_metadata.sanitize_info(info) if info else None
+    except Exception:
+        if raise_errors:
+            raise
+        return None
+
+
+def run_download(
+    ydl_opts: Dict[str, Any],
+    url: str,
+    source_info: Optional[Dict[str, Any]],
+    ffmpeg: Optional[FFmpegSession] = None,
+) -> Tuple[Dict[str, Any], str]:
+    """Download using ``ydl_opts``, reusing ``source_info`` when available.
+
+    With a cached info dict the format selection and download are driven by
+    ``process_ie_result`` (the same path as ``--load-info-json``), so the
+    extractor page is not fetched again. ffmpeg postprocessors wait for a
+    governor slot; pass ``ffmpeg`` to account the waits to a caller's session.
+    """
+    import yt_dlp
+
+    session = ffmpeg or governor.session()
+    hooks = progress.ydl_hooks(progress.current())
+    try:
+        with yt_dlp.YoutubeDL(session.apply({**base_options(), **hooks, **ydl_opts})) as ydl:
+            if source_info:
+                info = ydl.sanitize_info(copy.deepcopy(source_info), remove_private_keys=True)
+                download_info = ydl.process_ie_result(info, download=True)
+            else:
+                download_info = ydl.extract_info(url, download=True)
+            return download_info, ydl.prepare_filename(download_info)
+    finally:
+        session.close()
+
+
 def download_with_audio_merge(
     url: str,
     format_id: str,
     filename_prefix: str,
     download_folder: str,
+    info: Optional[Dict[str, Any]] = None,
+    reuse_info: bool = True,
+    ydl_options: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """Download a video with audio ensured using yt-dlp.
 
-    Strategy:
-    1. Try the requested format (or "best") directly. If the file already
-       contains audio, return it immediately.
-    2. If audio is missing or the format isn't available, fall back to merging
-       best video and audio streams with FFmpeg.
-    3. If FFmpeg fails, deliver the best progressive stream with audio.
+    ``plan_formats`` picks the strategy up front from the metadata formats,
+    so a video-only stream is not downloaded just to be thrown away:
+
+    1. ``direct``: download the requested format (or "best"), which has audio.
+    2. ``merge``: merge the requested (or best) video with the best audio
+       stream with FFmpeg. The remux engine picks the merge container: mp4
+       when yt-dlp knows the codecs fit, else mkv, which it then brings to
+       mp4 by stream copy, re-encoding only when it has to. The path taken
+       is returned as ``remux``.
+    3. ``progressive``: deliver the best single stream with audio. This is
+       also the fallback when the merge fails.
+
+    A direct download is only checked for audio afterwards (and replaced by a
+    merge) when the metadata lacks codec information. A failed direct
+    download falls back to the merge. Every step taken is appended to the
+    plan's trace, returned as ``format_plan``. Every ffmpeg run queues for a
+    slot of the host-wide governor; the queueing is returned as ``ffmpeg``.
+
+    The extractor runs at most once: ``info`` (or the metadata pass) is reused
+    for every attempt. Pass ``reuse_info=False`` to re-extract per attempt.
+    ``ydl_options`` (a platform download profile) is applied to every attempt.
     """
 
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
     output_template = os.path.join(
         download_folder,
         f'{filename_prefix}_{timestamp}.%(ext)s'
@@ -84,81 +274,66 @@ def download_with_audio_merge(
     warning_message: Optional[str] = None
     downloaded_file: Optional[str] = None
     download_info: Optional[Dict[str, Any]] = None
+    remux_report: Optional[Dict[str, Any]] = None
+    ffmpeg = governor.session()
 
-    metadata_info: Optional[Dict[str, Any]] = None
-    formats: Dict[str, Any] = {}
-    progressive_formats: List[Dict[str, Any]] = []
-
-    metadata_opts = {
-        'quiet': True,
-        'no_warnings': True,
-        'noplaylist': True,
-    }
+    metadata_info = info if info is not None else extract_video_info(url)
+    formats: Dict[str, Any] = _collect_formats(metadata_info) if metadata_info else {}
+    progressive_formats: List[Dict[str, Any]] = _progressive_formats(formats)
+    source_info = metadata_info if reuse_info else None
 
-    try:
-        with yt_dlp.YoutubeDL(metadata_opts) as ydl_metadata:
-            metadata_info = ydl_metadata.extract_info(url, download=False)
-            formats = _collect_formats(metadata_info)
-            progressive_formats = _progressive_formats(formats)
-    except Exception:
-        metadata_info = None
-        formats = {}
-        progressive_formats = []
-
-    direct_format = 'best' if format_id == 'best' else format_id
-    direct_opts = {
-        'format': direct_format,
-        'outtmpl': output_template,
-        'quiet': False,
-        'no_warnings': False,
-        'noplaylist': True,
-    }
+    plan = plan_formats(format_id, formats)
+    trace: List[str] = plan['trace']
+    strategy = plan['strategy']
 
-    direct_info: Optional[Dict[str, Any]] = None
     direct_error: Optional[Exception] = None
+    if format_id != 'best' and formats and format_id not in formats:
+        direct_error = ValueError(f'Requested format {format_id} is not available')
 
-    try:
-        with yt_dlp.YoutubeDL(direct_opts) as ydl_direct:
-            direct_info = ydl_direct.extract_info(url, download=True)
-            downloaded_file = ydl_direct.prepare_filename(direct_info)
-        download_info = direct_info
-    except Exception as exc:
-        direct_error = exc
-        downloaded_file = None
-
-    if download_info and downloaded_file and _has_audio(download_info):
-        audio_merged = True
-    else:
-        if downloaded_file and os.path.exists(downloaded_file):
+    if strategy == 'direct':
+        direct_opts = {
+            **(ydl_options or {}),
+            'format': plan['selector'],
+            'outtmpl': output_template,
+            'quiet': False,
+            'no_warnings': False,
+            'noplaylist': True,
+        }
+        try:
+            download_info, downloaded_file = run_download(direct_opts, url, source_info, ffmpeg)
+        except Exception as exc:
+            direct_error = exc
+            downloaded_file = None
+            trace.append(f'direct download failed ({exc}); merging instead')
+            strategy = 'merge'
+        else:
+            trace.append(f"direct format {download_info.get('format_id')}")
+
+        if strategy == 'direct' and _has_audio(download_info):
+            audio_merged = True
+        elif strategy == 'direct' and plan['verify_audio']:
+            trace.append('direct download has no audio; merging instead')
             warning_message = (
                 'Initial format lacked audio; attempting to merge best audio stream.'
             )
-            try:
-                os.remove(downloaded_file)
-            except OSError:
-                pass
+            if downloaded_file and os.path.exists(downloaded_file):
+                try:
+                    os.remove(downloaded_file)
+                except OSError:
+                    pass
             downloaded_file = None
+            strategy = 'merge'
+        elif strategy == 'direct':
+            warning_message = 'Source offers no audio track; delivered video only.'
 
-        merge_selectors: List[str] = []
-        if format_id != 'best' and format_id in formats:
-            merge_selectors.append(f'{format_id}+bestaudio/best')
-        merge_selectors.extend([
-            'bestvideo[ext=mp4]+bestaudio[ext=m4a]',
-            'bestvideo+bestaudio',
-            'best'
-        ])
-        merge_selector = '/'.join(merge_selectors)
-
+    if strategy == 'merge':
         merge_opts = {
-            'format': merge_selector,
+            **(ydl_options or {}),
+            'format': _merge_selector(format_id, formats),
             'outtmpl': output_template,
             'quiet': False,
             'no_warnings': False,
-            'merge_output_format': 'mp4',
-            'postprocessors': [{
-                'key': 'FFmpegVideoConvertor',
-                'preferedformat': 'mp4',
-            }],
+            'merge_output_format': remux.MERGE_OUTPUT_FORMAT,
             'prefer_ffmpeg': True,
             'keepvideo': False,
             'noplaylist': True,
@@ -167,50 +342,63 @@ def download_with_audio_merge(
         _cleanup_outputs(download_folder, filename_prefix, timestamp)
 
         try:
-            with yt_dlp.YoutubeDL(merge_opts) as ydl_merge:
-                download_info = ydl_merge.extract_info(url, download=True)
-                downloaded_file = ydl_merge.prepare_filename(download_info)
+            with span('merge', filename_prefix):
+                download_info, downloaded_file = run_download(merge_opts, url, source_info, ffmpeg)
+            if downloaded_file and not os.path.exists(downloaded_file):
+                base = os.path.splitext(downloaded_file)[0]
+                downloaded_file = next(
+                    (base + ext for ext in ('.mp4', '.mkv') if os.path.exists(base + ext)),
+                    downloaded_file,
+                )
+            downloaded_file, remux_report = remux.to_mp4(download_info, downloaded_file, ffmpeg)
             audio_merged = _has_audio(download_info)
+            trace.append(f"merged format {download_info.get('format_id')}")
             if not audio_merged:
                 warning_message = (
                     warning_message
                     or 'FFmpeg merge completed but audio track could not be verified.'
                 )
-        except Exception:
-            fallback_warning = (
+        except Exception as exc:
+            trace.append(f'merge failed ({exc}); delivering progressive stream')
+            warning_message = warning_message or (
                 'Preferred format unavailable; delivering best available progressive stream with audio.'
             )
-            warning_message = warning_message or fallback_warning
-
             _cleanup_outputs(download_folder, filename_prefix, timestamp)
+            remux_report = None
+            strategy = 'progressive'
 
-            fallback_format_id: Optional[str] = None
-            if progressive_formats:
-                fallback_format_id = progressive_formats[-1].get('format_id')
-
-            fallback_format = fallback_format_id or 'best[ext=mp4]/best'
-
-            fallback_opts = {
-                'format': fallback_format,
-                'outtmpl': output_template,
-                'quiet': False,
-                'no_warnings': False,
-                'noplaylist': True,
-            }
+    if strategy == 'progressive':
+        if plan['strategy'] == 'progressive':
+            fallback_format = plan['selector']
+            warning_message = warning_message or (
+                'Preferred format unavailable; delivering best available progressive stream with audio.'
+            )
+        elif progressive_formats:
+            fallback_format = progressive_formats[-1].get('format_id') or 'best[ext=mp4]/best'
+        else:
+            fallback_format = 'best[ext=mp4]/best'
+
+        fallback_opts = {
+            **(ydl_options or {}),
+            'format': fallback_format,
+            'outtmpl': output_template,
+            'quiet': False,
+            'no_warnings': False,
+            'noplaylist': True,
+        }
 
-            try:
-                with yt_dlp.YoutubeDL(fallback_opts) as ydl_fallback:
-                    download_info = ydl_fallback.extract_info(url, download=True)
-                    downloaded_file = ydl_fallback.prepare_filename(download_info)
-            except Exception as fallback_error:
-                raise FileNotFoundError(f'Download failed - no compatible formats available: {str(fallback_error)}')
+        try:
+            download_info, downloaded_file = run_download(fallback_opts, url, source_info, ffmpeg)
+        except Exception as fallback_error:
+            raise FileNotFoundError(f'Download failed - no compatible formats available: {str(fallback_error)}')
 
-            audio_merged = _has_audio(download_info)
-            if not audio_merged:
-                warning_message = (
-                    (warning_message + ' ' if warning_message else '')
-                    + 'Final download may still lack audio due to source limitations.'
-                )
+        audio_merged = _has_audio(download_info)
+        trace.append(f"progressive format {download_info.get('format_id')}")
+        if not audio_merged:
+            warning_message = (
+                (warning_message + ' ' if warning_message else '')
+                + 'Final download may still lack audio due to source limitations.'
+            )
 
     if downloaded_file and not os.path.exists(downloaded_file):
         base = os.path.splitext(downloaded_file)[0]
@@ -237,4 +425,7 @@ def download_with_audio_merge(
         'warning': warning_message,
         'info': download_info or metadata_info,
         'direct_error': str(direct_error) if direct_error else None,
+        'remux': remux_report,
+        'ffmpeg': ffmpeg.report(),
+        'format_plan': {'strategy': plan['strategy'], 'selector': plan['selector'], 'trace': trace},
     }
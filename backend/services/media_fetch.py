@@ -0,0 +1,133 @@
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import IO, TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+from .batch import HostRateLimiter, abandon
+from .http_session import RETRY_STATUSES, get_session
+
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_SPOOL_SIZE = 4 * 1024 * 1024
+FETCH_CHUNK_SIZE = 64 * 1024
+
+Item = TypeVar('Item')
+Result = TypeVar('Result')
+
+
+class MediaFetcher:
+    """Concurrent downloader for the media URLs of a bulk Pinterest request.
+
+    ``imap`` runs a fetch function over many items on a bounded thread pool
+    and hands results back as they complete. ``fetch`` downloads one URL
+    into a spooled temporary file (in memory up to ``spool_size``, then on
+    disk), so a finished download releases its connection instead of waiting
+    for the zip writer. At most ``per_host`` downloads hit one host at a
+    time across all requests sharing the fetcher.
+
+    The shared session already retries connection errors and 429/5xx
+    statuses; ``fetch`` additionally retries a body that breaks off mid
+    transfer, up to ``retries`` times with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        per_host: int = 8,
+        retries: int = 2,
+        backoff: float = 0.5,
+        timeout: float = 30,
+        spool_size: int = DEFAULT_SPOOL_SIZE,
+        session_factory: Callable[[], 'requests.Session'] = get_session,
+    ) -> None:
+        self.max_workers = max(1, max_workers)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.spool_size = spool_size
+        self.session_factory = session_factory
+        self.limiter = HostRateLimiter(default_concurrency=per_host, default_interval=0)
+
+    def _download(self, url: str, staging_folder: Optional[str]) -> Tuple[IO[bytes], int]:
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_size, dir=staging_folder)
+        try:
+            with self.session_factory().get(url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=FETCH_CHUNK_SIZE):
+                    spool.write(chunk)
+            size = spool.tell()
+            spool.seek(0)
+            return spool, size
+        except BaseException:
+            spool.close()
+            raise
+
+    def fetch(self, url: str, staging_folder: Optional[str] = None) -> Tuple[IO[bytes], int]:
+        """Download ``url`` and return ``(file, size)``; the caller closes the file."""
+        import requests
+
+        host = urlsplit(url).hostname or ''
+        attempt = 0
+        while True:
+            try:
+                return self.limiter.run(host, self._download, url, staging_folder)
+            except requests.RequestException as exc:
+                response = getattr(exc, 'response', None)
+                retryable = response is None or response.status_code in RETRY_STATUSES
+                if attempt >= self.retries or not retryable:
+                    raise
+            time.sleep(self.backoff * (2 ** attempt))
+            attempt += 1
+
+    def imap(
+        self,
+        func: Callable[[Item], Result],
+        items: Iterable[Item],
+        discard: Optional[Callable[[Result], Any]] = None,
+    ) -> Iterator[Tuple[Item, Optional[Result], Optional[BaseException]]]:
+        """Yield ``(item, result, error)`` for every item, in completion order.
+
+        No more than ``2 * max_workers`` items are in flight or finished but
+        not yet consumed, which bounds the spooled data. If the consumer stops
+        early it is not held until running fetches finish; results that were
+        never yielded are passed to ``discard`` (e.g. to close their files)
+        as they complete.
+        """
+        window = self.max_workers * 2
+        iterator = iter(items)
+        pending: Dict[Future, Item] = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='media-fetch')
+
+        def fill() -> None:
+            while len(pending) < window:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                pending[executor.submit(func, item)] = item
+
+        try:
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    fill()
+                    error = future.exception()
+                    yield item, None if error else future.result(), error
+        finally:
+            abandon(executor, pending, discard)
+
+
+def iter_fileobj(fileobj: IO[bytes], chunk_size: int = FETCH_CHUNK_SIZE) -> Iterator[bytes]:
+    """Read ``fileobj`` in chunks and close it afterwards."""
+    try:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
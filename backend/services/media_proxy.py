@@ -0,0 +1,110 @@
+import os
+import uuid
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, Mapping, Optional
+
+from .http_session import get_session
+from .metrics import count_bytes
+
+if TYPE_CHECKING:
+    import requests
+
+PROXY_CHUNK_SIZE = 1024 * 1024
+
+# Client request headers forwarded upstream so ranges and revalidation work end to end
+FORWARD_REQUEST_HEADERS = ('Range', 'If-Range', 'If-None-Match', 'If-Modified-Since')
+# Upstream response headers passed back to the client unchanged
+PASSTHROUGH_HEADERS = (
+    'Content-Length',
+    'Content-Range',
+    'Accept-Ranges',
+    'ETag',
+    'Last-Modified',
+    'Cache-Control',
+)
+
+
+def open_upstream(
+    url: str,
+    client_headers: Optional[Mapping[str, str]] = None,
+    timeout: float = 30,
+    session: Optional['requests.Session'] = None,
+) -> 'requests.Response':
+    """Start a streamed GET for ``url``, forwarding range/conditional headers."""
+    # Media is already compressed; identity keeps Content-Length and ranges byte-exact
+    headers = {'Accept-Encoding': 'identity'}
+    for name in FORWARD_REQUEST_HEADERS:
+        value = (client_headers or {}).get(name)
+        if value:
+            headers[name] = value
+
+    import requests
+
+    response = (session or get_session()).get(url, headers=headers, stream=True, timeout=timeout)
+    try:
+        response.raise_for_status()
+    except requests.HTTPError:
+        response.close()
+        raise
+    return response
+
+
+def passthrough_headers(upstream: 'requests.Response') -> Dict[str, str]:
+    headers = {
+        name: upstream.headers[name]
+        for name in PASSTHROUGH_HEADERS
+        if name in upstream.headers
+    }
+    if upstream.headers.get('Content-Encoding', 'identity') != 'identity':
+        # requests decodes the body, so the upstream length no longer applies
+        headers.pop('Content-Length', None)
+    return headers
+
+
+def iter_upstream(
+    upstream: 'requests.Response',
+    chunk_size: int = PROXY_CHUNK_SIZE,
+    tee_dir: Optional[str] = None,
+    tee_suffix: str = '',
+    on_complete: Optional[Callable[[str], None]] = None,
+) -> Iterator[bytes]:
+    """Yield the upstream body, optionally copying it to a temp file in ``tee_dir``.
+
+    ``on_complete(path)`` is called with the temp file only when the whole
+    body arrived; the temp file is always removed afterwards.
+    """
+    tee_path = None
+    tee_file = None
+    if tee_dir and on_complete and upstream.status_code == 200:
+        os.makedirs(tee_dir, exist_ok=True)
+        tee_path = os.path.join(tee_dir, f'.proxy_{uuid.uuid4().hex}{tee_suffix}')
+        tee_file = open(tee_path, 'wb')
+
+    received = 0
+    try:
+        for chunk in upstream.iter_content(chunk_size=chunk_size):
+            if not chunk:
+                continue
+            received += len(chunk)
+            if tee_file is not None:
+                tee_file.write(chunk)
+            yield chunk
+
+        if tee_file is not None:
+            tee_file.close()
+            tee_file = None
+            expected = upstream.headers.get('Content-Length')
+            if not expected or 'Content-Encoding' in upstream.headers or int(expected) == received:
+                try:
+                    on_complete(tee_path)
+                except Exception:
+                    pass  # caching is best effort; the client already has the bytes
+    finally:
+        count_bytes('proxied', received)
+        upstream.close()
+        if tee_file is not None:
+            tee_file.close()
+        if tee_path is not None:
+            try:
+                os.remove(tee_path)
+            except OSError:
+                pass
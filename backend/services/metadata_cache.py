@@ -0,0 +1,277 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+# Signed media URLs inside extractor results expire, so keep TTLs short.
+DEFAULT_TTLS: Dict[str, int] = {
+    'pinterest': 900,
+    'twitter': 600,
+    'tiktok': 300,
+}
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 512
+# A hit refreshes its LRU timestamp at most this often, so reads rarely write
+ACCESS_UPDATE_INTERVAL = 60
+
+
+class MemoryBackend:
+    """In-process LRU store. Each gunicorn worker keeps its own copy."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """On-disk store shared by every worker process on the same host.
+
+    A hit is a plain read; its ``accessed_at`` is refreshed (a write) only
+    when older than ACCESS_UPDATE_INTERVAL, which is precise enough for LRU.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS metadata_cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS metadata_cache_accessed '
+                'ON metadata_cache (accessed_at)'
+            )
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """A connection that commits (or rolls back) and is closed when the block ends."""
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute(
+                'SELECT value, expires_at, accessed_at FROM metadata_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at, accessed_at = row
+            if expires_at <= now:
+                conn.execute('DELETE FROM metadata_cache WHERE key = ?', (key,))
+                return None
+            if now - accessed_at >= ACCESS_UPDATE_INTERVAL:
+                conn.execute(
+                    'UPDATE metadata_cache SET accessed_at = ? WHERE key = ?', (now, key)
+                )
+            return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO metadata_cache (key, value, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?)',
+                (key, value, now + ttl, now),
+            )
+            conn.execute('DELETE FROM metadata_cache WHERE expires_at <= ?', (now,))
+            conn.execute(
+                'DELETE FROM metadata_cache WHERE key IN ('
+                'SELECT key FROM metadata_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._connection() as conn:
+            conn.execute('DELETE FROM metadata_cache WHERE key = ?', (key,))
+
+    def clear(self) -> None:
+        with self._connection() as conn:
+            conn.execute('DELETE FROM metadata_cache')
+
+
+class RedisBackend:
+    """Store backed by any Redis-compatible client (``get``/``set``/``delete``).
+
+    Size bounding and LRU eviction are delegated to the server's
+    ``maxmemory-policy allkeys-lru``; TTLs are set per key.
+    """
+
+    def __init__(self, client: Any, prefix: str = 'metadata:') -> None:
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = 'metadata:') -> 'RedisBackend':
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError('redis package is required for the redis metadata cache') from exc
+        return cls(redis.Redis.from_url(url), prefix=prefix)
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def clear(self) -> None:
+        keys = getattr(self.client, 'scan_iter', None)
+        if keys is None:
+            return
+        for key in keys(match=self.prefix + '*'):
+            self.client.delete(key)
+
+
+class MetadataCache:
+    """Platform-aware TTL cache for extractor results keyed by normalized URL."""
+
+    def __init__(self, backend: Any, ttls: Optional[Dict[str, int]] = None) -> None:
+        self.backend = backend
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(platform: str, url: str, variant: str = '') -> str:
+        return f'{platform}|{variant}|{url}'
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, platform: str, url: str, variant: str = '') -> Optional[Any]:
+        key = self.make_key(platform, url, variant)
+        try:
+            raw = self.backend.get(key)
+        except Exception:
+            raw = None
+        if raw is None:
+            self._count(False)
+            return None
+        self._count(True)
+        return json.loads(raw)
+
+    def set(
+        self,
+        platform: str,
+        url: str,
+        value: Any,
+        variant: str = '',
+        ttl: Optional[int] = None,
+    ) -> None:
+        if value is None:
+            return
+        if ttl is None:
+            ttl = self.ttls.get(platform, DEFAULT_TTL)
+        if ttl <= 0:
+            return
+        key = self.make_key(platform, url, variant)
+        try:
+            self.backend.set(key, json.dumps(value, default=str), ttl)
+        except Exception:
+            pass
+
+    def get_or_set(
+        self,
+        platform: str,
+        url: str,
+        loader: Callable[[], Any],
+        variant: str = '',
+    ) -> Any:
+        """Return the cached value or call ``loader`` and cache its result."""
+        value = self.get(platform, url, variant)
+        if value is None:
+            value = loader()
+            self.set(platform, url, value, variant)
+        return value
+
+    def invalidate(self, platform: str, url: str, variant: str = '') -> None:
+        self.backend.delete(self.make_key(platform, url, variant))
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            'ttls': self.ttls,
+        }
+
+
+def build_metadata_cache(
+    backend: str = 'memory',
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+    sqlite_path: str = os.path.join('downloads', '.metadata_cache.sqlite3'),
+    redis_url: Optional[str] = None,
+    ttls: Optional[Dict[str, int]] = None,
+) -> MetadataCache:
+    """Create a ``MetadataCache`` for the named backend (memory, sqlite or redis)."""
+    backend = (backend or 'memory').lower()
+    if backend == 'sqlite':
+        store: Any = SQLiteBackend(sqlite_path, max_entries=max_entries)
+    elif backend == 'redis':
+        if not redis_url:
+            raise ValueError('redis_url is required for the redis metadata cache')
+        store = RedisBackend.from_url(redis_url)
+    else:
+        store = MemoryBackend(max_entries=max_entries)
+    return MetadataCache(store, ttls=ttls)
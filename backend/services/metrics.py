@@ -0,0 +1,320 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import progress
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+DEFAULT_FLUSH_INTERVAL = 5.0
+DEFAULT_RETENTION = 86400
+
+LabelKey = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, str, LabelKey, float]  # (family, sample name, labels, value)
+Collector = Callable[[], Iterable[Tuple[str, Dict[str, Any], float]]]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((str(key), str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        escaped = value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms shared by every gunicorn worker.
+
+    Each process accumulates samples in memory and a background thread
+    writes its cumulative values to a SQLite file (one row set per process
+    instance) every ``flush_interval`` seconds. ``render()`` sums the rows
+    of all instances, so any worker can answer a scrape for the whole
+    host. Gauges only count instances that flushed recently, so workers
+    that exited drop out of them; counters and histograms keep their
+    contribution. Without ``path`` the registry reports this process only.
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> None:
+        self.path: Optional[str] = None
+        self.flush_interval = flush_interval
+        self._families: Dict[str, Dict[str, Any]] = {}
+        self._values: Dict[Tuple[str, str, LabelKey], float] = {}
+        self._collectors: List[Collector] = []
+        self._ratios: List[Tuple[str, str, str, str]] = []
+        self._lock = threading.Lock()
+        self._instance: Optional[str] = None
+        self._instance_pid: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        if path:
+            self.configure(path, flush_interval)
+
+    def configure(
+        self,
+        path: str,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        retention: float = DEFAULT_RETENTION,
+    ) -> None:
+        """Start sharing samples through the SQLite file at ``path``.
+
+        Rows of instances that have not flushed for ``retention`` seconds are
+        dropped so recycled workers do not accumulate forever.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.flush_interval = flush_interval
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS samples ('
+                'instance TEXT NOT NULL, family TEXT NOT NULL, name TEXT NOT NULL, '
+                'labels TEXT NOT NULL, value REAL NOT NULL, updated_at REAL NOT NULL, '
+                'PRIMARY KEY (instance, name, labels))'
+            )
+            conn.execute('DELETE FROM samples WHERE updated_at < ?', (time.time() - retention,))
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    # Registration
+
+    def _register(self, name: str, kind: str, documentation: str, **extra: Any) -> None:
+        self._families.setdefault(name, dict(kind=kind, help=documentation, **extra))
+
+    def counter(self, name: str, documentation: str) -> None:
+        self._register(name, 'counter', documentation)
+
+    def gauge(self, name: str, documentation: str) -> None:
+        self._register(name, 'gauge', documentation)
+
+    def histogram(self, name: str, documentation: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        self._register(name, 'histogram', documentation, buckets=tuple(sorted(buckets)) + (float('inf'),))
+
+    def register_collector(self, collector: Collector) -> None:
+        """Call ``collector()`` on every flush; it yields ``(name, labels, value)``
+        samples for registered counters or gauges, read from existing stats."""
+        self._collectors.append(collector)
+
+    def register_ratio(self, name: str, documentation: str, source: str, label: str, hit_value: str) -> None:
+        """Derive ``name`` at render time as hits / total of counter ``source``.
+
+        Samples of ``source`` are grouped by every label except ``label``;
+        the ratio is computed from the summed counts, not averaged per worker.
+        """
+        self.gauge(name, documentation)
+        self._ratios.append((name, source, label, hit_value))
+
+    # Recording
+
+    def _ensure_thread(self) -> None:
+        # Started lazily so each gunicorn worker gets its own flusher after fork
+        if not self.path:
+            return
+        if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run, name='metrics-flusher', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = (name, name, _label_key(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+        self._ensure_thread()
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[(name, name, _label_key(labels))] = value
+        self._ensure_thread()
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        buckets = self._families[name]['buckets']
+        label_key = _label_key(labels)
+        with self._lock:
+            for bound in buckets:
+                if value <= bound:
+                    bucket_key = (name, f'{name}_bucket', label_key + (('le', _format_value(bound)),))
+                    self._values[bucket_key] = self._values.get(bucket_key, 0.0) + 1
+            for suffix, amount in (('_sum', value), ('_count', 1)):
+                key = (name, name + suffix, label_key)
+                self._values[key] = self._values.get(key, 0.0) + amount
+        self._ensure_thread()
+
+    @contextmanager
+    def time(self, name: str, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    # Export
+
+    def _local_samples(self) -> List[Sample]:
+        collected: List[Sample] = []
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    collected.append((name, name, _label_key(labels), float(value)))
+            except Exception:
+                continue
+        with self._lock:
+            samples = [(family, name, labels, value) for (family, name, labels), value in self._values.items()]
+        return samples + collected
+
+    def _instance_id(self) -> str:
+        if self._instance is None or self._instance_pid != os.getpid():
+            self._instance = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+            self._instance_pid = os.getpid()
+        return self._instance
+
+    def flush(self) -> None:
+        if not self.path:
+            return
+        now = time.time()
+        instance = self._instance_id()
+        rows = [
+            (instance, family, name, json.dumps(labels), value, now)
+            for family, name, labels, value in self._local_samples()
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO samples (instance, family, name, labels, value, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                rows,
+            )
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def _aggregate(self) -> List[Sample]:
+        if not self.path:
+            totals: Dict[Tuple[str, str, LabelKey], float] = {}
+            for family, name, labels, value in self._local_samples():
+                totals[(family, name, labels)] = totals.get((family, name, labels), 0.0) + value
+            return [(family, name, labels, value) for (family, name, labels), value in totals.items()]
+
+        self.flush()
+        gauges = [name for name, meta in self._families.items() if meta['kind'] == 'gauge']
+        placeholders = ', '.join('?' for _ in gauges) or "''"
+        stale_before = time.time() - 3 * self.flush_interval
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT family, name, labels, SUM(value) FROM samples '
+                f'WHERE family NOT IN ({placeholders}) OR updated_at >= ? '
+                'GROUP BY family, name, labels',
+                (*gauges, stale_before),
+            ).fetchall()
+        return [
+            (family, name, tuple(tuple(pair) for pair in json.loads(labels)), value)
+            for family, name, labels, value in rows
+        ]
+
+    def _derive_ratios(self, samples: List[Sample]) -> List[Sample]:
+        derived: List[Sample] = []
+        for name, source, label, hit_value in self._ratios:
+            hits: Dict[LabelKey, float] = {}
+            totals: Dict[LabelKey, float] = {}
+            for family, _, labels, value in samples:
+                if family != source:
+                    continue
+                group = tuple(pair for pair in labels if pair[0] != label)
+                totals[group] = totals.get(group, 0.0) + value
+                if (label, hit_value) in labels:
+                    hits[group] = hits.get(group, 0.0) + value
+            for group, total in totals.items():
+                if total:
+                    derived.append((name, name, group, round(hits.get(group, 0.0) / total, 4)))
+        return derived
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        samples = self._aggregate()
+        by_family: Dict[str, List[Tuple[str, LabelKey, float]]] = {}
+        for family, name, labels, value in samples + self._derive_ratios(samples):
+            by_family.setdefault(family, []).append((name, labels, value))
+
+        lines: List[str] = []
+        for family in sorted(by_family):
+            meta = self._families.get(family, {'kind': 'untyped', 'help': ''})
+            lines.append(f'# HELP {family} {meta["help"]}')
+            lines.append(f'# TYPE {family} {meta["kind"]}')
+            for name, labels, value in sorted(by_family[family], key=_sample_order):
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _sample_order(sample: Tuple[str, LabelKey, float]) -> Tuple[Any, ...]:
+    name, labels, _ = sample
+    plain = tuple(pair for pair in labels if pair[0] != 'le')
+    le = next((value for key, value in labels if key == 'le'), None)
+    bound = float('inf') if le == '+Inf' else float(le) if le is not None else -1.0
+    return plain, name.endswith('_count'), name.endswith('_sum'), bound
+
+
+metrics = MetricsRegistry()
+
+metrics.histogram('app_request_duration_seconds', 'Time to build the response per endpoint.')
+metrics.histogram('app_stage_duration_seconds', 'Time spent per processing stage.')
+metrics.counter('app_stage_errors_total', 'Stages that raised an exception.')
+metrics.counter('app_bytes_total', 'Bytes moved per direction (downloaded, served, proxied, zipped).')
+
+
+@contextmanager
+def span(stage: str, platform: str = '') -> Iterator[None]:
+    """Time one processing stage into ``app_stage_duration_seconds``.
+
+    The stage is also reported as the current stage of a running job.
+    """
+    progress.report(stage=stage)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        metrics.inc('app_stage_errors_total', stage=stage, platform=platform)
+        raise
+    finally:
+        metrics.observe('app_stage_duration_seconds', time.perf_counter() - started, stage=stage, platform=platform)
+
+
+def count_bytes(direction: str, amount: int, platform: str = '') -> None:
+    if amount:
+        metrics.inc('app_bytes_total', amount, direction=direction, platform=platform)
+
+
+def count_stream(chunks: Iterable[bytes], direction: str, platform: str = '') -> Iterator[bytes]:
+    """Pass ``chunks`` through, adding their size to ``app_bytes_total`` when done."""
+    total = 0
+    try:
+        for chunk in chunks:
+            total += len(chunk)
+            yield chunk
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+        count_bytes(direction, total, platform)
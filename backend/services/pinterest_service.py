@@ -1,11 +1,69 @@
+import json
 import os
+import re
+import shutil
+import tempfile
+import time
 from datetime import datetime
-from typing import Dict, Optional
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
 
-import yt_dlp
+from . import progress
+from .media_downloader import run_download, select_format
+from .media_fetch import MediaFetcher, iter_fileobj
 
+PIN_PATH_PATTERN = re.compile(r'^/pin/(\d+)(?:/|$)')
 
-def download_pinterest_video(url: str, format_id: str, download_folder: str) -> Dict:
+
+def _key_path(*keys: str) -> Callable[[Any], Optional[str]]:
+    """Build a getter that follows ``keys`` through nested dicts to an http(s) URL."""
+    def get(data: Any) -> Optional[str]:
+        for key in keys:
+            if not isinstance(data, dict):
+                return None
+            data = data.get(key)
+        return data if isinstance(data, str) and data.startswith('http') else None
+    return get
+
+
+# Original-resolution media in a scraped pin (PinterestDL's to_dict()) or a
+# raw pin API object, in order of preference.
+PIN_VIDEO_PATHS = (
+    _key_path('media_stream', 'video', 'url'),
+    _key_path('videos', 'video_list', 'V_720P', 'url'),
+)
+PIN_IMAGE_PATHS = (
+    _key_path('src'),
+    _key_path('images', 'orig', 'url'),
+)
+
+
+def _pinterest_selectors(format_id: str) -> List[str]:
+    """Format selectors tried in order for ``format_id``; the first is the requested one."""
+    primary_format = 'best[ext=mp4]/best' if format_id == 'best' else format_id
+    fallback_selector = 'bestvideo[ext=mp4]/bestvideo/best[ext=mp4]/best'
+    if primary_format == fallback_selector:
+        return [primary_format]
+    return [primary_format, fallback_selector]
+
+
+def resolve_pinterest_format(info: Dict[str, Any], format_id: str) -> Optional[str]:
+    """Format id ``download_pinterest_video`` would deliver for ``format_id``."""
+    for selector in _pinterest_selectors(format_id):
+        resolved = select_format(info, selector)
+        if resolved:
+            return resolved
+    return None
+
+
+def download_pinterest_video(
+    url: str,
+    format_id: str,
+    download_folder: str,
+    info: Optional[Dict[str, Any]] = None,
+    ydl_options: Optional[Dict[str, Any]] = None,
+) -> Dict:
     """Download ONLY the Pinterest video stream (no audio merge attempt).
 
     Behaviour:
@@ -14,29 +72,25 @@ def download_pinterest_video(url: str, format_id: str, download_folder: str) ->
     - We do NOT attempt to merge separate audio. If the selected format is video-only,
       the resulting file may have no audio (user explicitly requested video only).
     - Returns metadata similar to other services for consistency.
+    - A cached extractor ``info`` dict is reused for every attempt when given.
+    - ``ydl_options`` (the platform download profile) is merged into every attempt.
     """
 
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
     base_template = os.path.join(download_folder, f'pinterest_video_{timestamp}.%(ext)s')
 
-    # Build primary format selector
-    if format_id == 'best':
-        primary_format = 'best[ext=mp4]/best'
-    else:
-        primary_format = format_id
-
-    attempted_formats = [primary_format]
-    fallback_selector = 'bestvideo[ext=mp4]/bestvideo/best[ext=mp4]/best'
-    if primary_format != fallback_selector:
-        attempted_formats.append(fallback_selector)
+    attempted_formats = _pinterest_selectors(format_id)
+    primary_format = attempted_formats[0]
 
     last_error: Optional[str] = None
+    source_info = info
     info = None
     downloaded_file: Optional[str] = None
     used_selector: Optional[str] = None
 
     for selector in attempted_formats:
         ydl_opts = {
+            **(ydl_options or {}),
             'format': selector,
             'outtmpl': base_template,
             'quiet': False,
@@ -44,9 +98,7 @@ def download_pinterest_video(url: str, format_id: str, download_folder: str) ->
             'noplaylist': True,
         }
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                downloaded_file = ydl.prepare_filename(info)
+            info, downloaded_file = run_download(ydl_opts, url, source_info)
             used_selector = selector
             break
         except Exception as e:  # capture and try fallback
@@ -83,3 +135,132 @@ def download_pinterest_video(url: str, format_id: str, download_folder: str) ->
         'info': info,
         'format_used': used_selector,
     }
+
+
+def canonical_pin_url(url: str) -> Optional[str]:
+    """Reduce a pin URL to ``<scheme>://<host>/pin/<id>/``, or None for other URLs.
+
+    Query strings and tracking suffixes are dropped, so every link to the
+    same pin shares one scrape cache entry.
+    """
+    parts = urlsplit(url)
+    match = PIN_PATH_PATTERN.match(parts.path)
+    if not match or not parts.netloc:
+        return None
+    return f'{parts.scheme or "https"}://{parts.netloc}/pin/{match.group(1)}/'
+
+
+def resolve_pin_media(media: Dict[str, Any], prefer_video: bool = False) -> Optional[str]:
+    """Return the original-resolution media URL of a scraped pin.
+
+    Only the fixed key paths above are read. A video is returned when
+    ``prefer_video`` is set and the pin has a progressive MP4; HLS playlists
+    cannot be handed out as a single file, so the image is used for those.
+    Returns None if the dict has none of the known shapes.
+
+    This only chooses the URL from a pin that was already scraped; it does
+    not replace or speed up the scrape itself.
+    """
+    if prefer_video:
+        for path in PIN_VIDEO_PATHS:
+            url = path(media)
+            if url and _media_extension(url, '') == '.mp4':
+                return url
+    for path in PIN_IMAGE_PATHS:
+        url = path(media)
+        if url:
+            return url
+    return None
+
+
+def _media_extension(url: str, default: str) -> str:
+    ext = os.path.splitext(url.split('?', 1)[0])[1].lower()
+    return ext or default
+
+
+def _fetch_hls_stream(stream_url: str, media_id: Any, staging_folder: str) -> Tuple[IO[bytes], int]:
+    """Download and remux one HLS stream with PinterestDL and return ``(file, size)``.
+
+    The temporary file is unlinked right after opening; the open handle keeps
+    it readable until the caller closes it.
+    """
+    from pinterest_dl.download import USER_AGENT
+    from pinterest_dl.download.downloader import MediaDownloader
+
+    tmp_dir = tempfile.mkdtemp(dir=staging_folder)
+    try:
+        target_path = MediaDownloader(user_agent=USER_AGENT).http_client.download_streams(
+            stream_url, Path(tmp_dir) / f'{media_id}.mp4', False
+        )
+        return open(target_path, 'rb'), os.path.getsize(target_path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def iter_pin_entries(
+    medias: List[Dict[str, Any]],
+    download_video: bool,
+    caption: str,
+    staging_folder: str,
+    stats: Dict[str, int],
+    chunk_size: int = 64 * 1024,
+    fetcher: Optional[MediaFetcher] = None,
+) -> Iterator[Tuple[str, Iterable[bytes]]]:
+    """Yield ``(arcname, chunks)`` zip entries for scraped pins.
+
+    Pins are downloaded concurrently by ``fetcher`` (one at a time without
+    it) and handed to the archive writer in completion order, using the same
+    ``<id>.<ext>`` names as PinterestDL. Bodies are spooled in memory or in
+    ``staging_folder``. Pins that cannot be fetched are skipped and counted
+    in ``stats['failed']``. Counts, bytes, speed and ETA are reported as job
+    progress after every pin.
+    """
+    fetcher = fetcher or MediaFetcher(max_workers=1)
+    stats.setdefault('count', 0)
+    stats.setdefault('failed', 0)
+    stats.setdefault('bytes', 0)
+    stats['total'] = len(medias)
+    started = time.monotonic()
+
+    def fetch(media: Dict[str, Any]) -> Tuple[str, IO[bytes], int]:
+        media_id = media.get('id')
+        stream_url = ((media.get('media_stream') or {}).get('video') or {}).get('url')
+
+        if download_video and stream_url:
+            if _media_extension(stream_url, '') == '.mp4':
+                fileobj, size = fetcher.fetch(stream_url, staging_folder)
+            else:
+                fileobj, size = _fetch_hls_stream(stream_url, media_id, staging_folder)
+            return f'{media_id}.mp4', fileobj, size
+
+        image_url = media.get('src')
+        if not image_url:
+            raise ValueError(f'Pin {media_id} has no image URL')
+        fileobj, size = fetcher.fetch(image_url, staging_folder)
+        return f'{media_id}{_media_extension(image_url, ".jpg")}', fileobj, size
+
+    for media, result, error in fetcher.imap(fetch, medias, discard=lambda result: result[1].close()):
+        if error is not None or result is None:
+            stats['failed'] += 1
+        else:
+            arcname, fileobj, size = result
+            yield arcname, iter_fileobj(fileobj, chunk_size)
+            stats['count'] += 1
+            stats['bytes'] += size
+
+            media_id = media.get('id')
+            if caption == 'txt' and media.get('alt'):
+                yield f'{media_id}.txt', [media['alt'].encode('utf-8')]
+            elif caption == 'json':
+                yield f'{media_id}.json', [json.dumps(media, indent=4).encode('utf-8')]
+
+        done = stats['count'] + stats['failed']
+        elapsed = max(time.monotonic() - started, 1e-6)
+        progress.report(
+            count=stats['count'],
+            failed=stats['failed'],
+            total=stats['total'],
+            downloaded_bytes=stats['bytes'],
+            speed=stats['bytes'] / elapsed,
+            eta=(stats['total'] - done) * elapsed / done,
+        )
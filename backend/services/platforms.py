@@ -0,0 +1,147 @@
+from typing import Any, Callable, Dict, List, Optional
+
+from .media_downloader import extract_video_info, resolve_format
+from .pinterest_service import download_pinterest_video, resolve_pinterest_format
+from .tiktok_service import download_tiktok_video
+from .twitter_service import download_twitter_video
+
+BEST_FORMAT = {
+    'format_id': 'best',
+    'ext': 'mp4',
+    'width': 0,
+    'height': 0,
+    'filesize': 0,
+    'resolution': 'Best Available',
+    'quality': 'Best Quality (with audio)',
+}
+
+
+class Platform:
+    """One supported video platform.
+
+    ``download`` is the service function used for /api/download-* requests,
+    ``resolve_format`` predicts the format id it will deliver for an info
+    dict and requested format, ``file_prefix`` names the produced files, and
+    the remaining fields tune how ``normalize_formats`` presents the
+    extractor's format list.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        title: str,
+        download: Callable[..., Dict[str, Any]],
+        file_prefix: str,
+        min_height: int = 0,
+        dedupe_resolutions: bool = False,
+        include_best: bool = False,
+        quality_from_height: bool = False,
+        resolve_format: Callable[[Dict[str, Any], str], Optional[str]] = resolve_format,
+    ) -> None:
+        self.name = name
+        self.title = title
+        self.download = download
+        self.file_prefix = file_prefix
+        self.min_height = min_height
+        self.dedupe_resolutions = dedupe_resolutions
+        self.include_best = include_best
+        self.quality_from_height = quality_from_height
+        self.resolve_format = resolve_format
+
+
+PLATFORMS: Dict[str, Platform] = {
+    'pinterest': Platform(
+        'pinterest',
+        title='Pinterest Video',
+        download=download_pinterest_video,
+        file_prefix='pinterest_video',
+        min_height=144,
+        dedupe_resolutions=True,
+        include_best=True,
+        quality_from_height=True,
+        resolve_format=resolve_pinterest_format,
+    ),
+    'twitter': Platform(
+        'twitter',
+        title='Twitter Video',
+        download=download_twitter_video,
+        file_prefix='twitter',
+    ),
+    'tiktok': Platform(
+        'tiktok',
+        title='TikTok Video',
+        download=download_tiktok_video,
+        file_prefix='tiktok',
+    ),
+}
+
+
+def normalize_formats(info: Dict[str, Any], platform: Platform) -> List[Dict[str, Any]]:
+    """Return the video formats of ``info`` as the frontend expects them, best first."""
+    formats: List[Dict[str, Any]] = []
+    seen_resolutions = set()
+
+    for fmt in info.get('formats', []) or []:
+        if fmt.get('vcodec', 'none') == 'none':
+            continue
+
+        width = fmt.get('width', 0)
+        height = fmt.get('height', 0)
+        if platform.min_height and not (width and height and height >= platform.min_height):
+            continue
+
+        resolution = f'{width}x{height}' if width and height else None
+        if platform.dedupe_resolutions:
+            if resolution in seen_resolutions:
+                continue
+            seen_resolutions.add(resolution)
+
+        formats.append({
+            'format_id': fmt.get('format_id', ''),
+            'ext': fmt.get('ext', 'mp4'),
+            'width': width,
+            'height': height,
+            'filesize': fmt.get('filesize', 0),
+            'resolution': resolution,
+            'quality': f'{height}p' if platform.quality_from_height else fmt.get('format_note', 'unknown'),
+        })
+
+    formats.sort(key=lambda x: x['height'] or 0, reverse=True)
+
+    if platform.include_best and formats:
+        formats.insert(0, dict(BEST_FORMAT))
+
+    return formats
+
+
+def describe_video(info: Dict[str, Any], platform: Platform, url: str) -> Dict[str, Any]:
+    return {
+        'id': info.get('id', ''),
+        'title': info.get('title', platform.title),
+        'description': info.get('description', ''),
+        'thumbnail': info.get('thumbnail', ''),
+        'duration': info.get('duration', 0),
+        'url': url,
+        'formats': normalize_formats(info, platform),
+    }
+
+
+def scrape_metadata(
+    name: str,
+    url: str,
+    info: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Describe the video at ``url`` for the scrape endpoints.
+
+    ``info`` is a cached extractor result; without it the extractor runs now
+    and its errors propagate.
+    """
+    platform = PLATFORMS[name]
+    if info is None:
+        info = extract_video_info(url, raise_errors=True)
+
+    media = [describe_video(info, platform, url)] if info else []
+    return {
+        'count': len(media),
+        'media': media,
+    }
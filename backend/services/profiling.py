@@ -0,0 +1,218 @@
+import cProfile
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import parse_qs
+
+TOKEN_HEADER = 'HTTP_X_PROFILE_TOKEN'
+MODE_HEADER = 'HTTP_X_PROFILE_MODE'
+TOKEN_PARAM = '__profile'
+MODE_PARAM = '__profile_mode'
+MODES = ('cprofile', 'sample')
+DEFAULT_KEEP = 50
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+def token_matches(expected: Optional[str], supplied: Optional[str]) -> bool:
+    return bool(expected and supplied) and hmac.compare_digest(expected, supplied)
+
+
+class _StackSampler:
+    """Wall-clock sampler for one thread, producing collapsed (folded) stacks."""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path: str) -> None:
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class _CProfiler:
+    def __init__(self) -> None:
+        self.profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+
+    def dump(self, path: str) -> None:
+        self.profile.dump_stats(path)
+
+
+class ProfilingMiddleware:
+    """WSGI middleware that profiles single requests on demand.
+
+    A request is profiled when it carries ``X-Profile-Token`` (or the
+    ``__profile`` query parameter) matching ``token``. ``X-Profile-Mode`` /
+    ``__profile_mode`` picks ``cprofile`` (default, writes ``.pstats``) or
+    ``sample`` (wall-clock stack sampling, writes flamegraph-ready
+    ``.folded`` stacks). Profiling covers the view and the streaming of
+    the response body. The profile id is returned in ``X-Profile-Id``; only
+    the newest ``keep`` profiles are kept.
+
+    Install it only when a token is configured, so unprofiled deployments
+    do not pay for the extra WSGI layer.
+    """
+
+    def __init__(
+        self,
+        app: Callable[..., Iterable[bytes]],
+        token: str,
+        directory: str,
+        keep: int = DEFAULT_KEEP,
+        sample_interval: float = DEFAULT_SAMPLE_INTERVAL,
+    ) -> None:
+        self.app = app
+        self.token = token
+        self.directory = directory
+        self.keep = keep
+        self.sample_interval = sample_interval
+        os.makedirs(directory, exist_ok=True)
+
+    def _requested_mode(self, environ: Dict[str, Any]) -> Optional[str]:
+        supplied = environ.get(TOKEN_HEADER)
+        mode = environ.get(MODE_HEADER)
+        if not supplied and TOKEN_PARAM in environ.get('QUERY_STRING', ''):
+            params = parse_qs(environ['QUERY_STRING'])
+            supplied = (params.get(TOKEN_PARAM) or [None])[0]
+            mode = mode or (params.get(MODE_PARAM) or [None])[0]
+        if not token_matches(self.token, supplied):
+            return None
+        return mode if mode in MODES else 'cprofile'
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable[..., Any]) -> Iterable[bytes]:
+        mode = self._requested_mode(environ)
+        if mode is None:
+            return self.app(environ, start_response)
+
+        profile_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        record: Dict[str, Any] = {
+            'id': profile_id,
+            'mode': mode,
+            'method': environ.get('REQUEST_METHOD'),
+            'path': environ.get('PATH_INFO'),
+            'created_at': time.time(),
+        }
+
+        def start(status: str, headers: List[Any], exc_info: Any = None) -> Any:
+            record['status'] = int(status.split(' ', 1)[0])
+            headers.append(('X-Profile-Id', profile_id))
+            return start_response(status, headers, exc_info)
+
+        profiler: Any = _CProfiler() if mode == 'cprofile' else None
+        if profiler is not None:
+            try:
+                profiler.start()
+            except RuntimeError:
+                # Only one cProfile can be active per interpreter; sample instead
+                profiler, record['mode'] = None, 'sample'
+        if profiler is None:
+            profiler = _StackSampler(threading.get_ident(), self.sample_interval)
+            profiler.start()
+        started = time.perf_counter()
+        try:
+            body = self.app(environ, start)
+        except Exception:
+            self._finish(profiler, record, started)
+            raise
+        return _ProfiledBody(body, lambda: self._finish(profiler, record, started))
+
+    def _finish(self, profiler: Any, record: Dict[str, Any], started: float) -> None:
+        profiler.stop()
+        record['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        extension = '.folded' if record['mode'] == 'sample' else '.pstats'
+        record['file'] = record['id'] + extension
+        try:
+            profiler.dump(os.path.join(self.directory, record['file']))
+            with open(os.path.join(self.directory, record['id'] + '.json'), 'w') as f:
+                json.dump(record, f)
+            self._prune()
+        except OSError:
+            pass
+
+    def _prune(self) -> None:
+        records = list_profiles(self.directory, limit=None)
+        for stale in records[self.keep:]:
+            for name in (stale['id'] + '.json', stale.get('file')):
+                if name:
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+
+class _ProfiledBody:
+    """Response iterable that finishes the profile once the body is sent or closed."""
+
+    def __init__(self, body: Iterable[bytes], on_close: Callable[[], None]) -> None:
+        self.body = body
+        self.on_close = on_close
+        self._finished = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self.body
+        self._finish()
+
+    def _finish(self) -> None:
+        if not self._finished:
+            self._finished = True
+            self.on_close()
+
+    def close(self) -> None:
+        try:
+            close = getattr(self.body, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self._finish()
+
+
+def list_profiles(directory: str, limit: Optional[int] = 20) -> List[Dict[str, Any]]:
+    """Return stored profile records, newest first."""
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith('.json')]
+    except FileNotFoundError:
+        return []
+
+    records = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name), 'r') as f:
+                records.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    records.sort(key=lambda record: record.get('created_at', 0), reverse=True)
+    return records if limit is None else records[:limit]
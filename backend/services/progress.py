@@ -0,0 +1,59 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+MERGE_POSTPROCESSORS = ('Merger', 'VideoConvertor')
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+_local = threading.local()
+
+
+@contextmanager
+def reporting(callback: ProgressCallback) -> Iterator[None]:
+    """Send ``report()`` calls made on this thread to ``callback`` while active."""
+    previous = getattr(_local, 'callback', None)
+    _local.callback = callback
+    try:
+        yield
+    finally:
+        _local.callback = previous
+
+
+def current() -> Optional[ProgressCallback]:
+    """Return this thread's progress callback, e.g. to hand it to worker threads."""
+    return getattr(_local, 'callback', None)
+
+
+def report(**fields: Any) -> None:
+    """Report progress for the job running on this thread; a no-op outside jobs."""
+    callback = current()
+    if callback is not None:
+        callback(fields)
+
+
+def ydl_hooks(callback: Optional[ProgressCallback]) -> Dict[str, Any]:
+    """yt-dlp ``progress_hooks``/``postprocessor_hooks`` forwarding to ``callback``.
+
+    yt-dlp calls the hooks from its fragment threads, so the callback is
+    bound here instead of being looked up per call.
+    """
+    if callback is None:
+        return {}
+
+    def on_progress(status: Dict[str, Any]) -> None:
+        if status.get('status') != 'downloading':
+            return
+        callback({
+            'downloaded_bytes': status.get('downloaded_bytes'),
+            'total_bytes': status.get('total_bytes') or status.get('total_bytes_estimate'),
+            'speed': status.get('speed'),
+            'eta': status.get('eta'),
+        })
+
+    def on_postprocess(status: Dict[str, Any]) -> None:
+        if status.get('status') == 'started':
+            name = status.get('postprocessor')
+            callback({'stage': 'merge' if name in MERGE_POSTPROCESSORS else 'postprocess', 'postprocessor': name})
+
+    return {'progress_hooks': [on_progress], 'postprocessor_hooks': [on_postprocess]}
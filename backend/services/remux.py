@@ -0,0 +1,117 @@
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from .ffmpeg_governor import FFmpegSession, governor
+from .metrics import metrics, span
+
+TARGET_EXT = 'mp4'
+
+# Container yt-dlp merges separate video and audio streams into: mp4 when it
+# knows both codecs fit, otherwise mkv, which accepts anything. ``to_mp4``
+# then takes an mkv to mp4 by stream copy or, failing that, a re-encode.
+MERGE_OUTPUT_FORMAT = f'{TARGET_EXT}/mkv'
+
+# Codec families that MP4 can carry as-is, so a container change is a
+# stream copy (-c copy) instead of a re-encode.
+MP4_VIDEO_CODECS = ('avc1', 'avc3', 'h264', 'hev1', 'hvc1', 'h265', 'hevc', 'av01', 'vp09', 'vp9', 'mp4v')
+MP4_AUDIO_CODECS = ('mp4a', 'aac', 'mp3', 'opus', 'flac', 'alac', 'ac-3', 'ac3', 'ec-3', 'eac3')
+
+metrics.counter('app_remux_total', 'Container conversions to mp4 per path (none, copy, transcode).')
+
+
+def _pick_codec(formats: Any, field: str) -> str:
+    """Return the first real codec for ``field``, 'none' if absent, '' if unknown."""
+    absent = False
+    for fmt in formats:
+        codec = (fmt.get(field) or '').lower().strip()
+        if codec == 'none':
+            absent = True
+        elif codec:
+            return codec
+    return 'none' if absent else ''
+
+
+def stream_codecs(info: Dict[str, Any]) -> Tuple[str, str]:
+    """Return ``(vcodec, acodec)`` of the streams yt-dlp selected for ``info``."""
+    formats = info.get('requested_formats') or [info]
+    return _pick_codec(formats, 'vcodec'), _pick_codec(formats, 'acodec')
+
+
+def _mp4_compatible(codec: str, families: Tuple[str, ...]) -> bool:
+    return codec == 'none' or codec.split('.', 1)[0] in families
+
+
+def plan(info: Dict[str, Any], filepath: str) -> Tuple[str, str]:
+    """Choose how ``filepath`` becomes an mp4: ``none``, ``copy`` or ``transcode``.
+
+    Returns ``(path, reason)``. Unknown codecs are tried with a stream copy
+    first; ``to_mp4`` falls back to transcoding if ffmpeg rejects it.
+    """
+    ext = os.path.splitext(filepath)[1].lstrip('.').lower()
+    vcodec, acodec = stream_codecs(info)
+    if ext == TARGET_EXT:
+        if len(info.get('requested_formats') or ()) > 1:
+            return 'none', 'streams merged into mp4 by stream copy'
+        return 'none', 'already mp4'
+    if not vcodec or not acodec:
+        return 'copy', 'codecs unknown; trying stream copy'
+    if _mp4_compatible(vcodec, MP4_VIDEO_CODECS) and _mp4_compatible(acodec, MP4_AUDIO_CODECS):
+        return 'copy', f'{vcodec}/{acodec} fit mp4'
+    return 'transcode', f'{vcodec}/{acodec} need re-encoding for mp4'
+
+
+def to_mp4(
+    info: Dict[str, Any],
+    filepath: str,
+    ffmpeg: Optional[FFmpegSession] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """Make ``filepath`` an mp4, re-encoding only when a stream copy cannot work.
+
+    Returns ``(new_path, report)``; ``report`` holds the path taken, the
+    reason and the stream codecs. The source file is removed once replaced.
+    ffmpeg runs inside a governor slot of ``ffmpeg`` (a new session if not
+    given). Raises ``yt_dlp.utils.PostProcessingError`` if ffmpeg fails outright.
+    """
+    import yt_dlp
+    from yt_dlp.postprocessor import FFmpegVideoConvertorPP, FFmpegVideoRemuxerPP
+    from yt_dlp.utils import PostProcessingError
+
+    path, reason = plan(info, filepath)
+    vcodec, acodec = stream_codecs(info)
+    report: Dict[str, Any] = {'path': path, 'reason': reason, 'vcodec': vcodec or None, 'acodec': acodec or None}
+    if path == 'none':
+        metrics.inc('app_remux_total', path=path)
+        return filepath, report
+
+    pp_info = {
+        'filepath': filepath,
+        'ext': os.path.splitext(filepath)[1].lstrip('.').lower(),
+        'vcodec': vcodec or None,
+        'acodec': acodec or None,
+    }
+    session = ffmpeg or governor.session()
+    # Carries the governor's -threads limit to the postprocessors
+    downloader = yt_dlp.YoutubeDL({
+        'quiet': True,
+        'no_warnings': True,
+        'postprocessor_args': {'default': session.governor.ffmpeg_args()},
+    }, auto_init=False)
+    result = None
+    if path == 'copy':
+        try:
+            with span('remux'), session.slot('remux'):
+                _, result = FFmpegVideoRemuxerPP(downloader, TARGET_EXT).run(dict(pp_info))
+        except PostProcessingError as exc:
+            report.update(path='transcode', reason=f'stream copy failed: {exc}')
+    if result is None:
+        with span('transcode'), session.slot('transcode'):
+            _, result = FFmpegVideoConvertorPP(downloader, TARGET_EXT).run(dict(pp_info))
+
+    metrics.inc('app_remux_total', path=report['path'])
+    new_path = result['filepath']
+    if new_path != filepath:
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
+    return new_path, report
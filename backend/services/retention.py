@@ -0,0 +1,293 @@
+import heapq
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .ffmpeg_governor import pid_alive
+
+DEFAULT_TTL = 3600
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+DEFAULT_INTERVAL = 60
+
+# Outputs still being written: yt-dlp partials, fragments, per-format streams
+# awaiting a merge and postprocessor temp files, plus our own '.part' files
+IN_PROGRESS_PATTERN = re.compile(r'\.(part|ytdl|tmp)$|\.part-Frag\d+|\.temp\.\w+$|\.f\d+\.\w+$')
+
+
+def _in_progress(name: str) -> bool:
+    return bool(IN_PROGRESS_PATTERN.search(name))
+
+
+def _tree_usage(path: str, stat: os.stat_result) -> Tuple[int, float]:
+    """Return ``(bytes, newest mtime)`` for ``path``, walking directories."""
+    if not os.path.isdir(path):
+        return stat.st_size, stat.st_mtime
+    size, mtime = 0, stat.st_mtime
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                entry = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            size += entry.st_size
+            mtime = max(mtime, entry.st_mtime)
+    return size, mtime
+
+
+class RetentionManager:
+    """Single background sweeper for produced files in the downloads folder.
+
+    - Served files are put on a heap-ordered expiry index and removed
+      ``served_ttl`` seconds (``ttl`` by default) after their last response
+      closed. The server cannot tell a finished download from one the
+      client dropped, nor see the ranges a proxy serves after an
+      X-Accel-Redirect/X-Sendfile hand-off, so a shorter ``served_ttl``
+      can turn a Range resume into a 404.
+    - A periodic scan removes anything older than ``ttl`` (files that were
+      never fetched, files produced by other workers, stale staging dirs)
+      and evicts the oldest files while the folder exceeds ``max_bytes``.
+    - Files with an open reference (a response still streaming) are never
+      removed; their expiry is pushed back instead. With ``refs_path`` the
+      references live in a SQLite file, so a file one gunicorn worker is
+      streaming is also safe from every other worker's sweeper; rows left
+      by a process that died are dropped on the next sweep.
+    - Outputs that may still be written (partials, fragments, anything
+      changed within the last ``interval``) are never evicted for the
+      quota; the TTL only removes them once they stop changing.
+
+    Directories count with the size and newest mtime of their contents.
+    Names starting with '.' (caches, SQLite stores) are left alone.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        ttl: int = DEFAULT_TTL,
+        served_ttl: Optional[int] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        interval: int = DEFAULT_INTERVAL,
+        refs_path: Optional[str] = None,
+    ) -> None:
+        self.folder = folder
+        self.refs_path = refs_path
+        self.ttl = ttl
+        self.served_ttl = ttl if served_ttl is None else served_ttl
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.removed = 0
+        self.removed_bytes = 0
+        self._heap: List[Tuple[float, str]] = []
+        self._expiry: Dict[str, float] = {}
+        self._refs: Dict[str, int] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._next_scan = 0.0
+        if refs_path:
+            os.makedirs(os.path.dirname(refs_path) or '.', exist_ok=True)
+            with self._connect() as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS refs ('
+                    'path TEXT NOT NULL, pid INTEGER NOT NULL, PRIMARY KEY (path, pid))'
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.refs_path, timeout=10, isolation_level=None)
+
+    def _ensure_thread(self) -> None:
+        # Started lazily so each gunicorn worker gets its own sweeper after fork
+        if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+            return
+        self._thread = threading.Thread(target=self._run, name='retention-sweeper', daemon=True)
+        self._thread_pid = os.getpid()
+        self._thread.start()
+
+    def start(self) -> None:
+        with self._condition:
+            self._ensure_thread()
+
+    def schedule(self, path: str, delay: Optional[float] = None) -> None:
+        """Expire ``path`` after ``delay`` seconds (``served_ttl`` by default)."""
+        path = os.path.abspath(path)
+        expires_at = time.time() + (self.served_ttl if delay is None else delay)
+        with self._condition:
+            self._expiry[path] = expires_at
+            heapq.heappush(self._heap, (expires_at, path))
+            self._ensure_thread()
+            self._condition.notify()
+
+    def acquire(self, path: str) -> None:
+        path = os.path.abspath(path)
+        with self._condition:
+            count = self._refs.get(path, 0) + 1
+            self._refs[path] = count
+        if count == 1 and self.refs_path:
+            with self._connect() as conn:
+                conn.execute('INSERT OR IGNORE INTO refs (path, pid) VALUES (?, ?)', (path, os.getpid()))
+
+    def release(self, path: str, delay: Optional[float] = None) -> None:
+        """Drop a reference and schedule expiry once no response is using the file."""
+        path = os.path.abspath(path)
+        with self._condition:
+            remaining = self._refs.get(path, 0) - 1
+            if remaining > 0:
+                self._refs[path] = remaining
+                return
+            self._refs.pop(path, None)
+        if self.refs_path:
+            with self._connect() as conn:
+                conn.execute('DELETE FROM refs WHERE path = ? AND pid = ?', (path, os.getpid()))
+        self.schedule(path, delay)
+
+    def track_response(self, response: Any, path: str, delay: Optional[float] = None) -> Any:
+        """Hold a reference on ``path`` until ``response`` has been fully sent.
+
+        ``delay`` overrides ``served_ttl`` for the expiry scheduled afterwards.
+        """
+        self.acquire(path)
+        released = threading.Event()
+
+        def release_once() -> None:
+            if not released.is_set():
+                released.set()
+                self.release(path, delay)
+
+        response.call_on_close(release_once)
+
+        # send_file responses are passed straight through to the server (keeping
+        # its sendfile path), which closes the file wrapper, not the response.
+        body = response.response
+        original_close = getattr(body, 'close', None)
+        if response.direct_passthrough and original_close is not None:
+            def close() -> None:
+                try:
+                    original_close()
+                finally:
+                    release_once()
+
+            try:
+                body.close = close
+            except AttributeError:
+                pass
+        return response
+
+    def _shared_refs(self) -> Set[str]:
+        """Paths another process holds a reference on; rows of dead processes are dropped."""
+        if not self.refs_path:
+            return set()
+        pid = os.getpid()
+        with self._connect() as conn:
+            rows = conn.execute('SELECT path, pid FROM refs WHERE pid != ?', (pid,)).fetchall()
+            dead = {owner for _, owner in rows if not pid_alive(owner)}
+            for owner in dead:
+                conn.execute('DELETE FROM refs WHERE pid = ?', (owner,))
+        return {path for path, owner in rows if owner not in dead}
+
+    def _remove(self, path: str, size: Optional[int] = None) -> None:
+        try:
+            if os.path.isdir(path):
+                if size is None:
+                    size = _tree_usage(path, os.stat(path))[0]
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                size = os.path.getsize(path)
+                os.remove(path)
+        except OSError:
+            return
+        self.removed += 1
+        self.removed_bytes += size
+
+    def _pop_expired(self, now: float, shared: Set[str]) -> List[str]:
+        expired: List[str] = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, path = heapq.heappop(self._heap)
+                if self._expiry.get(path) != expires_at:
+                    continue  # superseded by a later schedule()
+                if self._refs.get(path):
+                    continue  # release() will reschedule it
+                if path in shared:
+                    # Still streaming from another worker; check again later
+                    retry_at = now + self.interval
+                    self._expiry[path] = retry_at
+                    heapq.heappush(self._heap, (retry_at, path))
+                    continue
+                del self._expiry[path]
+                expired.append(path)
+        return expired
+
+    def _scan(self, now: float, shared: Set[str]) -> None:
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return
+
+        candidates: List[Tuple[float, int, str]] = []
+        total = 0
+        for name in names:
+            if name.startswith('.'):
+                continue
+            path = os.path.abspath(os.path.join(self.folder, name))
+            try:
+                size, mtime = _tree_usage(path, os.stat(path))
+            except OSError:
+                continue
+            with self._condition:
+                in_use = bool(self._refs.get(path)) or path in shared
+            if in_use:
+                total += size
+                continue
+            if mtime + self.ttl <= now:
+                self._remove(path, size)
+                continue
+            total += size
+            if _in_progress(name) or mtime + self.interval > now:
+                continue  # still being written
+            candidates.append((mtime, size, path))
+
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(candidates):
+            self._remove(path, size)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def sweep(self) -> None:
+        """Remove expired files now, and run the folder scan if it is due."""
+        now = time.time()
+        shared = self._shared_refs()
+        for path in self._pop_expired(now, shared):
+            self._remove(path)
+        if now >= self._next_scan:
+            self._scan(now, shared)
+            self._next_scan = now + self.interval
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.sweep()
+            except Exception:
+                pass
+            with self._condition:
+                wake_at = self._next_scan
+                if self._heap:
+                    wake_at = min(wake_at, self._heap[0][0])
+                self._condition.wait(timeout=max(0.1, wake_at - time.time()))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'scheduled': len(self._expiry),
+                'in_use': sum(1 for count in self._refs.values() if count),
+                'removed': self.removed,
+                'removed_bytes': self.removed_bytes,
+                'ttl': self.ttl,
+                'served_ttl': self.served_ttl,
+                'max_bytes': self.max_bytes,
+            }
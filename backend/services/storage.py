@@ -0,0 +1,291 @@
+import hashlib
+import hmac
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+from urllib.parse import quote, urlsplit
+
+from .http_session import get_session
+from .metrics import count_bytes, span
+
+if TYPE_CHECKING:
+    import requests
+
+BACKENDS = ('local', 'shared', 's3')
+DEFAULT_PRESIGN_TTL = 3600
+SIGV4_ALGORITHM = 'AWS4-HMAC-SHA256'
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+
+
+def _atomic_copy(source: str, destination: str) -> None:
+    """Copy ``source`` so readers of ``destination`` never see a partial file."""
+    directory = os.path.dirname(destination)
+    partial = os.path.join(directory, f'.{os.path.basename(destination)}.{uuid.uuid4().hex[:8]}.part')
+    try:
+        shutil.copyfile(source, partial)
+        os.replace(partial, destination)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+
+
+class LocalStorage:
+    """Produced files stay in this replica's downloads folder.
+
+    Only the replica that produced a file can serve it, so this backend
+    needs sticky routing (or a single replica).
+    """
+
+    kind = 'local'
+
+    def __init__(self, working_folder: str) -> None:
+        self.working_folder = working_folder
+        # Folder that servable files live in on this replica
+        self.root = working_folder
+        self.published = 0
+        self.uploaded_bytes = 0
+        self._lock = threading.Lock()
+
+    def _published(self, size: int = 0) -> None:
+        with self._lock:
+            self.published += 1
+            self.uploaded_bytes += size
+
+    def publish(self, path: str) -> str:
+        """Make the file at ``path`` (in the working folder) servable; return its name."""
+        self._published()
+        return os.path.basename(path)
+
+    def find(self, name: str) -> Optional[str]:
+        """Path of a published file this replica can read from disk, or None."""
+        path = os.path.join(self.root, name)
+        return path if os.path.isfile(path) else None
+
+    def remote_url(self, name: str, download_name: Optional[str] = None, mimetype: Optional[str] = None) -> Optional[str]:
+        """URL a client can fetch ``name`` from when it is not on disk here."""
+        return None
+
+    def exists(self, name: str) -> bool:
+        return self.find(name) is not None
+
+    def delete(self, name: str) -> None:
+        try:
+            os.remove(os.path.join(self.root, name))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'backend': self.kind, 'published': self.published}
+
+
+class SharedVolumeStorage(LocalStorage):
+    """Produced files are moved onto a volume every replica mounts (NFS, EFS, ...).
+
+    Files are built in the local working folder, copied to ``root`` under a
+    temporary name and renamed, so another replica never serves a partial
+    file. Expiry on the volume is left to a ``RetentionManager`` over ``root``.
+    """
+
+    kind = 'shared'
+
+    def __init__(self, root: str, working_folder: str) -> None:
+        super().__init__(working_folder)
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def publish(self, path: str) -> str:
+        name = os.path.basename(path)
+        with span('publish'):
+            _atomic_copy(path, os.path.join(self.root, name))
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        self._published()
+        return name
+
+
+class S3Storage(LocalStorage):
+    """Produced files are uploaded to an S3-compatible bucket (AWS S3, MinIO, ...).
+
+    Every request is authorised with a SigV4 presigned URL, so no SDK is
+    needed and the same URLs can be handed to clients. Objects use
+    path-style addressing (``<endpoint>/<bucket>/<prefix><name>``). The
+    local copy is kept, so this replica serves it from disk until retention
+    removes it; other replicas redirect to or stream the object. Expiring
+    objects is left to a bucket lifecycle rule.
+    """
+
+    kind = 's3'
+
+    def __init__(
+        self,
+        working_folder: str,
+        endpoint: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = 'us-east-1',
+        prefix: str = '',
+        presign_ttl: int = DEFAULT_PRESIGN_TTL,
+        timeout: float = 60,
+        session_factory: Callable[[], 'requests.Session'] = get_session,
+    ) -> None:
+        super().__init__(working_folder)
+        if not (endpoint and bucket and access_key and secret_key):
+            raise ValueError('endpoint, bucket, access_key and secret_key are required for S3 storage')
+        self.endpoint = endpoint.rstrip('/')
+        self.host = urlsplit(self.endpoint).netloc
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.prefix = prefix
+        self.presign_ttl = presign_ttl
+        self.timeout = timeout
+        self.session_factory = session_factory
+
+    def presign(
+        self,
+        method: str,
+        name: str,
+        params: Optional[Dict[str, str]] = None,
+        expires: Optional[int] = None,
+        now: Optional[datetime] = None,
+    ) -> str:
+        """Return a SigV4 query-string signed URL for ``method`` on object ``name``."""
+        now = now or datetime.now(timezone.utc)
+        path = quote(f'/{self.bucket}/{self.prefix}{name}', safe='/-_.~')
+        query = presigned_query(
+            method, self.host, path, self.access_key, self.secret_key, self.region,
+            expires or self.presign_ttl, now, params,
+        )
+        return f'{self.endpoint}{path}?{query}'
+
+    def publish(self, path: str) -> str:
+        name = os.path.basename(path)
+        size = os.path.getsize(path)
+        with span('publish'), open(path, 'rb') as f:
+            response = self.session_factory().put(
+                self.presign('PUT', name),
+                data=f,
+                headers={'Content-Length': str(size)},
+                timeout=self.timeout,
+            )
+        response.raise_for_status()
+        count_bytes('uploaded', size)
+        self._published(size)
+        return name
+
+    def remote_url(self, name: str, download_name: Optional[str] = None, mimetype: Optional[str] = None) -> Optional[str]:
+        params = {}
+        if download_name:
+            params['response-content-disposition'] = f'attachment; filename="{download_name}"'
+        if mimetype:
+            params['response-content-type'] = mimetype
+        return self.presign('GET', name, params)
+
+    def exists(self, name: str) -> bool:
+        response = self.session_factory().head(self.presign('HEAD', name), timeout=self.timeout)
+        return response.status_code == 200
+
+    def delete(self, name: str) -> None:
+        super().delete(name)
+        self.session_factory().delete(self.presign('DELETE', name), timeout=self.timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'backend': self.kind,
+                'endpoint': self.endpoint,
+                'bucket': self.bucket,
+                'published': self.published,
+                'uploaded_bytes': self.uploaded_bytes,
+            }
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode('utf-8'), hashlib.sha256).digest()
+
+
+def presigned_query(
+    method: str,
+    host: str,
+    path: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    expires: int,
+    now: datetime,
+    params: Optional[Dict[str, str]] = None,
+) -> str:
+    """Build the SigV4 presigned query string (signature last) for an S3 request.
+
+    ``path`` must already be URI-encoded. Only the Host header is signed and
+    the payload is unsigned, as for any presigned S3 URL.
+    """
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    datestamp = now.strftime('%Y%m%d')
+    scope = f'{datestamp}/{region}/s3/aws4_request'
+    query = {
+        'X-Amz-Algorithm': SIGV4_ALGORITHM,
+        'X-Amz-Credential': f'{access_key}/{scope}',
+        'X-Amz-Date': amz_date,
+        'X-Amz-Expires': str(expires),
+        'X-Amz-SignedHeaders': 'host',
+        **(params or {}),
+    }
+    canonical_query = '&'.join(
+        f"{quote(key, safe='-_.~')}={quote(value, safe='-_.~')}" for key, value in sorted(query.items())
+    )
+    signature = sigv4_signature(method, host, path, canonical_query, secret_key, region, amz_date)
+    return f'{canonical_query}&X-Amz-Signature={signature}'
+
+
+def sigv4_signature(
+    method: str,
+    host: str,
+    path: str,
+    canonical_query: str,
+    secret_key: str,
+    region: str,
+    amz_date: str,
+) -> str:
+    canonical_request = '\n'.join([method, path, canonical_query, f'host:{host}\n', 'host', UNSIGNED_PAYLOAD])
+    scope = f'{amz_date[:8]}/{region}/s3/aws4_request'
+    string_to_sign = '\n'.join([
+        SIGV4_ALGORITHM,
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode('utf-8')).hexdigest(),
+    ])
+    key = _hmac(('AWS4' + secret_key).encode('utf-8'), amz_date[:8])
+    for part in (region, 's3', 'aws4_request'):
+        key = _hmac(key, part)
+    return hmac.new(key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def build_storage(
+    backend: str = 'local',
+    working_folder: str = 'downloads',
+    shared_path: Optional[str] = None,
+    s3_options: Optional[Dict[str, Any]] = None,
+) -> LocalStorage:
+    """Create the storage backend for produced files (local, shared or s3)."""
+    backend = (backend or 'local').lower()
+    if backend == 'shared':
+        if not shared_path:
+            raise ValueError('shared_path is required for shared-volume storage')
+        return SharedVolumeStorage(shared_path, working_folder)
+    if backend == 's3':
+        return S3Storage(working_folder, **(s3_options or {}))
+    if backend != 'local':
+        raise ValueError(f'Unknown storage backend: {backend} (expected one of {", ".join(BACKENDS)})')
+    return LocalStorage(working_folder)
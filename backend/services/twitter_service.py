@@ -1,48 +1,16 @@
-from typing import Dict, List
-
-import yt_dlp
+from typing import Any, Dict, Optional
 
 from .media_downloader import download_with_audio_merge
 
 
-def scrape_twitter_metadata(url: str) -> Dict[str, List[Dict]]:
-    """Scrape Twitter video metadata using yt-dlp."""
-    ydl_opts = {
-        'quiet': True,
-        'no_warnings': True,
-        'extract_flat': False,
-    }
-
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url, download=False)
-
-    formats: List[Dict] = []
-    for fmt in info.get('formats', []):
-        if fmt.get('vcodec') != 'none':
-            formats.append({
-                'format_id': fmt.get('format_id', ''),
-                'quality': fmt.get('format_note', 'unknown'),
-                'width': fmt.get('width', 0),
-                'height': fmt.get('height', 0),
-                'filesize': fmt.get('filesize', 0),
-                'ext': fmt.get('ext', 'mp4'),
-            })
-
-    formats.sort(key=lambda x: x['height'], reverse=True)
-
-    media = [{
-        'title': info.get('title', 'Twitter Video'),
-        'thumbnail': info.get('thumbnail', ''),
-        'duration': info.get('duration', 0),
-        'formats': formats,
-    }]
-
-    return {
-        'count': 1,
-        'media': media,
-    }
-
-
-def download_twitter_video(url: str, format_id: str, download_folder: str) -> Dict:
+def download_twitter_video(
+    url: str,
+    format_id: str,
+    download_folder: str,
+    info: Optional[Dict[str, Any]] = None,
+    ydl_options: Optional[Dict[str, Any]] = None,
+) -> Dict:
     """Download a Twitter video, merging audio when available."""
-    return download_with_audio_merge(url, format_id, 'twitter', download_folder)
+    return download_with_audio_merge(
+        url, format_id, 'twitter', download_folder, info=info, ydl_options=ydl_options,
+    )
@@ -0,0 +1,134 @@
+import re
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from .http_session import get_session
+from .metadata_cache import MetadataCache
+
+if TYPE_CHECKING:
+    import requests
+
+# Hosts whose URLs are already canonical and never need a network round-trip.
+CANONICAL_HOST_SUFFIXES = (
+    'pinterest.com',
+    'pinimg.com',
+    'twitter.com',
+    'x.com',
+    'twimg.com',
+)
+CANONICAL_HOSTS = {
+    'tiktok.com',
+    'www.tiktok.com',
+    'm.tiktok.com',
+}
+# Pinterest also serves country domains such as pinterest.co.uk or pinterest.de.
+PINTEREST_COUNTRY_HOST = re.compile(r'(^|\.)pinterest\.[a-z]{2,3}(\.[a-z]{2})?$')
+
+SHORTLINK_TTL = 86400
+FAILURE_TTL = 60
+
+
+def _host(url: str) -> str:
+    host = urlsplit(url).hostname or ''
+    return host.lower().rstrip('.')
+
+
+def is_canonical_url(url: str) -> bool:
+    """Return True for pinterest/twitter/tiktok URLs that need no redirect resolution."""
+    host = _host(url)
+    if not host:
+        return False
+    if host in CANONICAL_HOSTS:
+        return True
+    for suffix in CANONICAL_HOST_SUFFIXES:
+        if host == suffix or host.endswith('.' + suffix):
+            return True
+    return bool(PINTEREST_COUNTRY_HOST.search(host))
+
+
+class UrlResolver:
+    """Resolve short links (pin.it, t.co, vm.tiktok.com, ...) to canonical URLs.
+
+    Resolution order: a local check for already-canonical URLs, then the
+    shared cache of earlier resolutions (including recent failures), then a
+    network HEAD falling back to GET.
+    """
+
+    def __init__(
+        self,
+        cache: MetadataCache,
+        timeout: float = 10,
+        shortlink_ttl: int = SHORTLINK_TTL,
+        failure_ttl: int = FAILURE_TTL,
+        session_factory: Callable[[], 'requests.Session'] = get_session,
+    ) -> None:
+        self.cache = cache
+        self.timeout = timeout
+        self.shortlink_ttl = shortlink_ttl
+        self.failure_ttl = failure_ttl
+        self.session_factory = session_factory
+        self.local_hits = 0
+        self.network_lookups = 0
+        self._lock = threading.Lock()
+
+    def _count(self, attribute: str) -> None:
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def _fetch(self, url: str) -> Optional[str]:
+        import requests
+
+        self._count('network_lookups')
+        session = self.session_factory()
+        try:
+            response = session.head(url, allow_redirects=True, timeout=self.timeout)
+            if response.url:
+                return response.url
+        except requests.RequestException:
+            try:
+                # Only the final URL is needed; close so the socket returns to the pool
+                with session.get(url, allow_redirects=True, timeout=self.timeout, stream=True) as response:
+                    if response.url:
+                        return response.url
+            except requests.RequestException:
+                pass
+        return None
+
+    def resolve(self, raw_url: Optional[str]) -> Optional[str]:
+        if not raw_url:
+            return raw_url
+
+        url = raw_url.strip()
+        if not url:
+            return url
+
+        if not url.startswith(('http://', 'https://')):
+            url = f'https://{url}'
+
+        if is_canonical_url(url):
+            self._count('local_hits')
+            return url
+
+        cached = self.cache.get('shortlink', url)
+        if cached is not None:
+            return cached.get('url') or url
+
+        resolved = self._fetch(url)
+        if resolved:
+            self.cache.set('shortlink', url, {'url': resolved}, ttl=self.shortlink_ttl)
+            return resolved
+
+        # Negative entry: skip the network for a while and use the URL as given
+        self.cache.set('shortlink', url, {'url': None}, ttl=self.failure_ttl)
+        return url
+
+    def stats(self) -> Dict[str, Any]:
+        cache_stats = self.cache.stats()
+        return {
+            'local_hits': self.local_hits,
+            'cache_hits': cache_stats['hits'],
+            'cache_misses': cache_stats['misses'],
+            'network_lookups': self.network_lookups,
+            'backend': cache_stats['backend'],
+        }
@@ -0,0 +1,26 @@
+import importlib
+import time
+from typing import Dict, Iterable
+
+# Modules the routes import on first use. Loading them before gunicorn forks
+# lets every worker (including ones recycled by --max-requests) inherit them.
+HEAVY_MODULES = (
+    'requests',
+    'yt_dlp',
+    'yt_dlp.extractor.lazy_extractors',
+    'pinterest_dl',
+    'pinterest_dl.download.downloader',
+)
+
+
+def preload_modules(names: Iterable[str] = HEAVY_MODULES) -> Dict[str, float]:
+    """Import ``names`` now and return the seconds each import took."""
+    timings: Dict[str, float] = {}
+    for name in names:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        timings[name] = round(time.perf_counter() - started, 4)
+    return timings
@@ -0,0 +1,165 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import yt_dlp
+
+# Only these extractors are instantiated per YoutubeDL (about 15 instead of
+# ~1800), which keeps instance construction in the low milliseconds.
+# YTDLP_ALLOWED_EXTRACTORS overrides the list; 'all' lifts the restriction.
+DEFAULT_ALLOWED_EXTRACTORS = (
+    'pinterest',
+    'pinterest:.*',
+    'twitter',
+    'twitter:.*',
+    'tiktok',
+    'tiktok:.*',
+    'vm.tiktok',
+)
+
+# Option profiles for pooled YoutubeDL instances. Downloads build their own
+# instance because the output template changes per call.
+YDL_PROFILES: Dict[str, Dict[str, Any]] = {
+    'metadata': {
+        'quiet': True,
+        'no_warnings': True,
+        'noplaylist': True,
+    },
+}
+
+_pool: Optional['YoutubeDLPool'] = None
+_pool_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def allowed_extractors() -> Optional[List[str]]:
+    value = os.environ.get('YTDLP_ALLOWED_EXTRACTORS')
+    if value is None:
+        return list(DEFAULT_ALLOWED_EXTRACTORS)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if not names or 'all' in names:
+        return None
+    return names
+
+
+def base_options() -> Dict[str, Any]:
+    """YoutubeDL params shared by every instance this app builds."""
+    allowed = allowed_extractors()
+    return {'allowed_extractors': allowed} if allowed else {}
+
+
+class YoutubeDLPool:
+    """Pre-initialised ``YoutubeDL`` instances per option profile.
+
+    ``checkout(profile)`` hands an instance to one thread at a time. Up to
+    ``size`` instances per profile are kept warm (extractor objects, cookie
+    jar and HTTP handlers survive between calls); when all are busy an extra
+    instance is built for the caller and closed afterwards instead of
+    blocking. Instances are recycled after ``max_uses`` checkouts.
+    """
+
+    def __init__(
+        self,
+        profiles: Optional[Dict[str, Dict[str, Any]]] = None,
+        size: int = 4,
+        max_uses: int = 200,
+    ) -> None:
+        self.profiles = dict(profiles or YDL_PROFILES)
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self.created = 0
+        self.reused = 0
+        self.overflow = 0
+        self._idle: Dict[str, 'queue.LifoQueue[Tuple[yt_dlp.YoutubeDL, int]]'] = {
+            name: queue.LifoQueue() for name in self.profiles
+        }
+        self._live: Dict[str, int] = {name: 0 for name in self.profiles}
+        self._lock = threading.Lock()
+
+    def _build(self, profile: str) -> 'yt_dlp.YoutubeDL':
+        import yt_dlp
+
+        return yt_dlp.YoutubeDL(dict(self.profiles[profile]))
+
+    @staticmethod
+    def _close(ydl: 'yt_dlp.YoutubeDL') -> None:
+        try:
+            ydl.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def checkout(self, profile: str = 'metadata') -> Iterator['yt_dlp.YoutubeDL']:
+        if profile not in self.profiles:
+            raise KeyError(f'Unknown YoutubeDL profile: {profile}')
+
+        pooled = True
+        try:
+            ydl, uses = self._idle[profile].get_nowait()
+            with self._lock:
+                self.reused += 1
+        except queue.Empty:
+            with self._lock:
+                pooled = self._live[profile] < self.size
+                if pooled:
+                    self._live[profile] += 1
+                    self.created += 1
+                else:
+                    self.overflow += 1
+            try:
+                ydl, uses = self._build(profile), 0
+            except Exception:
+                if pooled:
+                    with self._lock:
+                        self._live[profile] -= 1
+                raise
+
+        try:
+            yield ydl
+        finally:
+            uses += 1
+            if pooled and uses < self.max_uses:
+                self._idle[profile].put((ydl, uses))
+            else:
+                self._close(ydl)
+                if pooled:
+                    with self._lock:
+                        self._live[profile] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'size': self.size,
+                'created': self.created,
+                'reused': self.reused,
+                'overflow': self.overflow,
+                'idle': {name: idle.qsize() for name, idle in self._idle.items()},
+            }
+
+
+def get_ydl_pool() -> YoutubeDLPool:
+    """Return the process-wide YoutubeDL pool, rebuilding it after a fork."""
+    global _pool, _pool_pid
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _lock:
+        if _pool is None or _pool_pid != pid:
+            try:
+                size = int(os.environ.get('YTDLP_POOL_SIZE', 4))
+            except ValueError:
+                size = 4
+            profiles = {name: {**base_options(), **options} for name, options in YDL_PROFILES.items()}
+            _pool = YoutubeDLPool(profiles, size=size)
+            _pool_pid = pid
+    return _pool
+
+
+def ydl_pool_stats() -> Dict[str, Any]:
+    pool = _pool if _pool_pid == os.getpid() else None
+    return pool.stats() if pool is not None else {}
@@ -0,0 +1,114 @@
+import os
+import time
+import zipfile
+from typing import BinaryIO, Iterable, Iterator, Tuple
+
+# Media formats that are already compressed; deflating them only burns CPU.
+STORED_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.heic',
+    '.mp4', '.m4v', '.mov', '.webm', '.mkv', '.avi', '.ts', '.m4a', '.mp3',
+    '.zip', '.gz',
+}
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+ZipEntry = Tuple[str, Iterable[bytes]]
+
+
+def compression_for(arcname: str) -> int:
+    """Pick ZIP_STORED for already-compressed media and ZIP_DEFLATED otherwise."""
+    ext = os.path.splitext(arcname)[1].lower()
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+class _ChunkBuffer:
+    """Write-only, non-seekable sink that hands written bytes back to a generator."""
+
+    def __init__(self) -> None:
+        self._chunks: list = []
+        self._size = 0
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+            self._size += len(data)
+            self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def pending(self) -> int:
+        return self._size
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self._size = 0
+        return data
+
+
+def iter_file(path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Read a file lazily in ``chunk_size`` pieces."""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _write_entry(zf: zipfile.ZipFile, arcname: str, chunks: Iterable[bytes]) -> Iterator[None]:
+    """Write one entry, yielding after every chunk so callers can drain output."""
+    info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+    info.compress_type = compression_for(arcname)
+    info.external_attr = 0o644 << 16
+    with zf.open(info, 'w', force_zip64=True) as dest:
+        for chunk in chunks:
+            if chunk:
+                dest.write(chunk)
+                yield
+
+
+def write_archive(entries: Iterable[ZipEntry], fileobj: BinaryIO) -> int:
+    """Write ``entries`` into ``fileobj`` as they are produced. Returns the entry count.
+
+    Each entry is an ``(arcname, chunks)`` pair; ``chunks`` is consumed lazily,
+    so nothing is staged on disk besides the archive itself.
+    """
+    count = 0
+    with zipfile.ZipFile(fileobj, 'w') as zf:
+        for arcname, chunks in entries:
+            for _ in _write_entry(zf, arcname, chunks):
+                pass
+            count += 1
+    return count
+
+
+def stream_archive(
+    entries: Iterable[ZipEntry],
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Yield a ZIP archive of ``entries`` as bytes, suitable for a chunked HTTP response.
+
+    Entries use data descriptors, so the archive never needs to seek back and
+    the first bytes go out as soon as the first media chunk arrives.
+    """
+    buffer = _ChunkBuffer()
+    zf = zipfile.ZipFile(buffer, 'w')
+    try:
+        for arcname, chunks in entries:
+            for _ in _write_entry(zf, arcname, chunks):
+                if buffer.pending() >= chunk_size:
+                    yield buffer.drain()
+            if buffer.pending():
+                yield buffer.drain()
+    finally:
+        zf.close()
+    tail = buffer.drain()
+    if tail:
+        yield tail
@@ -29,7 +29,9 @@ echo "🐳 Step 2: Building Docker containers..."
 docker compose build --no-cache
 
 echo "🚀 Starting containers..."
-docker compose up -d
+# nginx serves produced files itself via X-Accel-Redirect (see the
+# /_protected_downloads/ location below)
+FILE_HANDOFF=x-accel docker compose up -d
 
 # Wait a moment for containers to start
 sleep 5
@@ -78,6 +80,16 @@ server {
         root /var/www/html;
     }
 
+    # Produced downloads, served by nginx when the backend answers with
+    # X-Accel-Redirect (range requests and sendfile handled here)
+    location /_protected_downloads/ {
+        internal;
+        alias __DOWNLOADS_DIR__/;
+        sendfile on;
+        tcp_nopush on;
+        max_ranges 16;
+    }
+
     # Proxy to Docker container
     location / {
         proxy_pass http://127.0.0.1:8080;
@@ -98,6 +110,9 @@ server {
 }
 EOF
 
+# Point the internal downloads location at the backend's mounted volume
+sed -i "s|__DOWNLOADS_DIR__|$PROJECT_DIR/backend/downloads|" /etc/nginx/sites-available/yttmp3.com
+
 # Enable site
 ln -sf /etc/nginx/sites-available/yttmp3.com /etc/nginx/sites-enabled/
 
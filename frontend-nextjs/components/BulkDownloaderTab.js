@@ -2,6 +2,7 @@
 
 import { useState } from 'react'
 import apiClient from '@/utils/apiClient'
+import { runDownloadJob } from '@/utils/downloadJobs'
 import styles from './BulkDownloaderTab.module.css'
 import MediaTable from './MediaTable'
 
@@ -67,7 +68,7 @@ export default function BulkDownloaderTab() {
     setBulkDownloadResult(null)
 
     try {
-      const response = await apiClient.post('/api/download', {
+      const data = await runDownloadJob('/api/download', {
         url: bulkUrl.trim(),
         num: bulkNumImages,
         min_resolution: bulkMinResolution.trim() || null,
@@ -75,7 +76,7 @@ export default function BulkDownloaderTab() {
         caption: bulkCaption,
       })
 
-      setBulkDownloadResult(response.data)
+      setBulkDownloadResult(data)
     } catch (error) {
       setBulkError(error.response?.data?.error || 'Unable to prepare the download package.')
     } finally {
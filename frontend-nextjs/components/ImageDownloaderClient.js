@@ -3,6 +3,7 @@
 import { useState } from 'react'
 import styles from '../app/image-downloader/page.module.css'
 import apiClient from '@/utils/apiClient'
+import { runDownloadJob } from '@/utils/downloadJobs'
 
 export default function ImageDownloaderClient() {
   const [url, setUrl] = useState('')
@@ -53,16 +54,16 @@ export default function ImageDownloaderClient() {
 
     try {
       const count = parseInt(bulkCount) || 10
-      const response = await apiClient.post('/api/download', {
+      const data = await runDownloadJob('/api/download', {
         url: url.trim(),
         num: count,
         download_video: false,
         caption: 'none',
       })
 
-      if (response.data.success && response.data.download_url) {
+      if (data.success && data.download_url) {
         // Trigger download by navigating to the URL
-        const downloadUrl = response.data.download_url
+        const downloadUrl = data.download_url
         window.location.href = downloadUrl
       }
     } catch (error) {
@@ -3,6 +3,7 @@
 import { useState } from 'react'
 import styles from './../app/page.module.css'
 import apiClient from '@/utils/apiClient'
+import { runDownloadJob } from '@/utils/downloadJobs'
 
 export default function VideoDownloaderClient() {
   const [url, setUrl] = useState('')
@@ -52,16 +53,16 @@ export default function VideoDownloaderClient() {
     try {
       setLoading(true)
       setWarning(null)
-      const response = await apiClient.post('/api/download-video', {
+      const data = await runDownloadJob('/api/download-video', {
         url: url.trim(),
         format_id: selectedFormat,
       })
 
-      if (response.data.success && response.data.download_url) {
-        if (response.data.warning) {
-          setWarning(response.data.warning)
+      if (data.success && data.download_url) {
+        if (data.warning) {
+          setWarning(data.warning)
         }
-        window.location.href = response.data.download_url
+        window.location.href = data.download_url
       }
     } catch (error) {
       setError(error.response?.data?.error || 'Unable to download video.')
@@ -0,0 +1,36 @@
+/**
+ * Download jobs
+ * The download routes queue the work and answer 202 with a job id; this
+ * polls the job until it finishes and returns its payload (success,
+ * download_url, ...) as if the route had answered directly.
+ */
+
+import apiClient from './apiClient'
+
+const POLL_INTERVAL = 1000 // 1 second
+const JOB_TIMEOUT = 15 * 60 * 1000 // 15 minutes
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms))
+
+// Shaped like an axios error so callers can keep reading error.response.data.error
+const jobError = (message) => Object.assign(new Error(message), { response: { data: { error: message } } })
+
+export async function runDownloadJob(path, payload) {
+  const response = await apiClient.post(path, payload)
+  if (response.status !== 202 || !response.data.status_url) {
+    return response.data
+  }
+
+  const deadline = Date.now() + JOB_TIMEOUT
+  while (Date.now() < deadline) {
+    await sleep(POLL_INTERVAL)
+    const { data: job } = await apiClient.get(response.data.status_url)
+    if (job.state === 'succeeded') {
+      return job
+    }
+    if (job.state === 'failed' || job.state === 'cancelled') {
+      throw jobError(job.error || `Download ${job.state}.`)
+    }
+  }
+  throw jobError('Download is taking too long, please try again later.')
+}